@@ -0,0 +1,228 @@
+﻿# Micro-benchmarks for the Graph primitives, run against the headless (null) backend
+# Usage: python benchmarks/bench_graph.py [--sizes 100 1000] [--shapes sparse star] [--ops add_node adjacent] [--save-baseline]
+import gc
+import os
+import sys
+import json
+import time
+import random
+import argparse
+import statistics
+import tracemalloc
+from typing import List, Dict, Any, Callable, Optional, Tuple
+
+SRC_DIR = os.path.normpath(os.path.join(os.path.dirname(os.path.abspath(__file__)), "..", "src"))
+sys.path.insert(0, SRC_DIR)
+
+import pynode_headless
+from pynode_graphlib import graph, Graph, Node, Edge
+
+SIZES = [100, 1000, 10000]
+SHAPES = ["sparse", "dense", "star", "multigraph"]
+DEFAULT_BASELINE = os.path.join(os.path.dirname(os.path.abspath(__file__)), "baseline_graph.json")
+
+# Operations that don't change the graph, which are set up once and timed in loops of at least MIN_SAMPLE_TIME seconds,
+# since a single pass over count elements is too short to time reliably
+READ_ONLY = {"adjacent", "edges_between", "adjacency_matrix", "node_properties"}
+MIN_SAMPLE_TIME = 0.01
+
+# Larger graphs are skipped for these, since the number of edges (or matrix entries) grows with the square of the order
+DENSE_MAX_ORDER = 300
+ADJACENCY_MATRIX_MAX_ORDER = 1000
+
+def build(shape: str, order: int) -> List[Any]:
+    if shape == "sparse": return Graph.random(order, order * 2)
+    if shape == "dense": return Graph.random(order, order * (order - 1) // 4)
+    if shape == "multigraph": return Graph.random(order, order * 3, multigraph=True)
+    if shape == "star":
+        nodes = [Node(i) for i in range(order)]
+        return nodes + [Edge(nodes[0], n) for n in nodes[1:]]
+    raise Exception(f"Unknown shape '{shape}'")
+
+def setup(shape: str, order: int) -> Tuple[List[Node], List[Edge]]:
+    pynode_headless.reset(record=False)
+    graph.add_all(build(shape, order))
+    return graph.nodes(), graph.edges()
+
+# Each benchmark sets up a graph, and returns a function that performs the operations being timed along with how many there are
+def bench_add_node(shape: str, order: int, count: int):
+    setup(shape, order)
+    new_nodes = [Node(("new", i)) for i in range(count)]
+    def run():
+        for n in new_nodes: graph.add_node(n)
+    return run, count
+
+def bench_add_edge(shape: str, order: int, count: int):
+    nodes, edges = setup(shape, order)
+    new_edges = [Edge(random.choice(nodes), random.choice(nodes)) for i in range(count)]
+    def run():
+        for e in new_edges: graph.add_edge(e)
+    return run, count
+
+def removal_count(count: int, order: int) -> int:
+    # Each removal scans the graph's edge list, so fewer elements are removed from larger graphs to keep the repeats short
+    return max(50, count * 100 // order)
+
+def bench_remove_edge(shape: str, order: int, count: int):
+    nodes, edges = setup(shape, order)
+    targets = random.sample(edges, min(removal_count(count, order), len(edges)))
+    def run():
+        for e in targets: graph.remove_edge(e)
+    return run, len(targets)
+
+def bench_remove_node(shape: str, order: int, count: int):
+    nodes, edges = setup(shape, order)
+    targets = random.sample(nodes, min(removal_count(count, order), len(nodes)))
+    def run():
+        for n in targets: graph.remove_node(n)
+    return run, len(targets)
+
+def bench_adjacent(shape: str, order: int, count: int):
+    nodes, edges = setup(shape, order)
+    pairs = [(random.choice(nodes), random.choice(nodes)) for i in range(count)]
+    def run():
+        for u, v in pairs: graph.adjacent(u, v)
+    return run, count
+
+def bench_edges_between(shape: str, order: int, count: int):
+    nodes, edges = setup(shape, order)
+    pairs = [(random.choice(nodes), random.choice(nodes)) for i in range(count)]
+    def run():
+        for u, v in pairs: graph.edges_between(u, v)
+    return run, count
+
+def bench_adjacency_matrix(shape: str, order: int, count: int):
+    if order > ADJACENCY_MATRIX_MAX_ORDER: return None
+    setup(shape, order)
+    def run(): graph.adjacency_matrix()
+    return run, 1
+
+def bench_add_all(shape: str, order: int, count: int):
+    pynode_headless.reset(record=False)
+    elements = build(shape, order)
+    def run(): graph.add_all(elements)
+    return run, 1
+
+def bench_random(shape: str, order: int, count: int):
+    pynode_headless.reset(record=False)
+    def run(): build(shape, order)
+    return run, 1
+
+def bench_node_properties(shape: str, order: int, count: int):
+    nodes, edges = setup(shape, order)
+    targets = [random.choice(nodes) for i in range(count)]
+    def run():
+        for n in targets:
+            n.value; n.priority; n.size; n.color; n.incident_edges; n.incoming_edges; n.outgoing_edges; n.position
+    return run, count * 8
+
+OPERATIONS: Dict[str, Callable] = {
+    "add_node": bench_add_node, "add_edge": bench_add_edge, "remove_edge": bench_remove_edge, "remove_node": bench_remove_node,
+    "adjacent": bench_adjacent, "edges_between": bench_edges_between, "adjacency_matrix": bench_adjacency_matrix,
+    "add_all": bench_add_all, "random": bench_random, "node_properties": bench_node_properties
+}
+
+def sample(op: str, shape: str, order: int, count: int, seed: int, loops: Optional[int]) -> Optional[Tuple[float, int, int]]:
+    # Times one run of an operation on a freshly set up graph, and returns the seconds per run, the number of operations and the loops used
+    random.seed(seed)
+    prepared = OPERATIONS[op](shape, order, count)
+    if prepared is None: return None
+    run, ops = prepared
+    if loops is None:
+        loops = 1
+        if op in READ_ONLY:
+            start = time.perf_counter()
+            run()
+            loops = int(MIN_SAMPLE_TIME / max(time.perf_counter() - start, 1e-9)) + 1
+    gc.collect()
+    start = time.perf_counter()
+    for i in range(loops): run()
+    return (time.perf_counter() - start) / loops, ops, loops
+
+def allocations(op: str, shape: str, order: int, count: int, seed: int) -> Tuple[int, int]:
+    # Allocations are measured in a separate pass, since tracing slows everything down
+    random.seed(seed)
+    run, ops = OPERATIONS[op](shape, order, count)
+    gc.collect()
+    tracemalloc.start()
+    try:
+        run()
+        current, peak = tracemalloc.get_traced_memory()
+    finally:
+        tracemalloc.stop()
+    return current, peak
+
+def measure(keys: List[Tuple[str, str, int]], count: int, repeat: int, seed: int) -> Dict[Tuple[str, str, int], Dict[str, Any]]:
+    # Every operation is timed once per pass over all of them, and the median of the passes is reported. A slow spell of the machine
+    # then only affects one of an operation's repeats, which the median (unlike the fastest or the mean) leaves out
+    times: Dict[Tuple[str, str, int], List[float]] = {}
+    loops: Dict[Tuple[str, str, int], int] = {}
+    ops: Dict[Tuple[str, str, int], int] = {}
+    for i in range(repeat):
+        for key in keys:
+            if i > 0 and key not in times: continue
+            result = sample(key[0], key[1], key[2], count, seed, loops.get(key))
+            if result is None: continue
+            elapsed, ops[key], loops[key] = result
+            times.setdefault(key, []).append(elapsed)
+
+    results = {}
+    for key in keys:
+        if key not in times: continue
+        median = statistics.median(times[key])
+        current, peak = allocations(key[0], key[1], key[2], count, seed)
+        results[key] = {
+            "ops": ops[key], "ops_per_sec": round(ops[key] / median, 1) if median > 0 else float("inf"), "us_per_op": round(median * 1e6 / ops[key], 3),
+            "alloc_bytes_per_op": round(current / ops[key], 1), "peak_kb": round(peak / 1024, 1)
+        }
+    return results
+
+def main(argv: List[str] = None) -> int:
+    parser = argparse.ArgumentParser(description="Benchmark individual Graph operations without a browser.")
+    parser.add_argument("--ops", nargs="+", default=list(OPERATIONS.keys()), choices=list(OPERATIONS.keys()))
+    parser.add_argument("--shapes", nargs="+", default=SHAPES, choices=SHAPES)
+    parser.add_argument("--sizes", nargs="+", type=int, default=SIZES, help="graph orders to benchmark")
+    parser.add_argument("--count", type=int, default=2000, help="operations per measurement, for operations on single elements")
+    parser.add_argument("--repeat", type=int, default=5, help="passes over all of the operations, the median of which is reported and compared to the baseline")
+    parser.add_argument("--seed", type=int, default=0)
+    parser.add_argument("--baseline", default=DEFAULT_BASELINE)
+    parser.add_argument("--save-baseline", action="store_true", help="write the results to the baseline file instead of comparing")
+    parser.add_argument("--max-slowdown", type=float, default=1.5, help="fail if an operation's median is this many times slower than the baseline")
+    parser.add_argument("--json", help="also write the results to this file ('-' for stdout, which replaces the table)")
+    args = parser.parse_args(argv)
+
+    baseline = {}
+    if not args.save_baseline and os.path.exists(args.baseline):
+        with open(args.baseline, encoding="utf-8") as f: baseline = json.load(f)["results"]
+
+    table = args.json != "-"
+    results = {}
+    regressions = []
+    if table: print(f"{'operation':<36}{'ops/sec':>14}{'us/op':>11}{'B/op':>10}{'peak KB':>11}{'vs baseline':>13}")
+    keys = [(op, shape, order) for op in args.ops for shape in args.shapes for order in args.sizes if shape != "dense" or order <= DENSE_MAX_ORDER]
+    for (op, shape, order), result in measure(keys, args.count, args.repeat, args.seed).items():
+        key = f"{op}/{shape}@{order}"
+        results[key] = result
+        slowdown = None
+        if key in baseline and result["ops_per_sec"] > 0:
+            slowdown = baseline[key]["ops_per_sec"] / result["ops_per_sec"]
+            if slowdown > args.max_slowdown: regressions.append(key)
+        if table:
+            print(f"{key:<36}{result['ops_per_sec']:>14.1f}{result['us_per_op']:>11.2f}{result['alloc_bytes_per_op']:>10.1f}{result['peak_kb']:>11.1f}"
+                  + (f"{slowdown:>12.2f}x" if slowdown is not None else "") + ("  REGRESSION" if key in regressions else ""))
+
+    output = {"python": sys.version.split()[0], "seed": args.seed, "count": args.count, "repeat": args.repeat, "results": results, "regressions": regressions}
+    if args.save_baseline:
+        with open(args.baseline, "w", encoding="utf-8") as f: json.dump(output, f, indent=2)
+        if table: print(f"Saved baseline to {args.baseline}")
+    if args.json == "-":
+        json.dump(output, sys.stdout, indent=2)
+        print()
+    elif args.json:
+        with open(args.json, "w", encoding="utf-8") as f: json.dump(output, f, indent=2)
+    if table and len(baseline) > 0:
+        print(f"{len(regressions)} operation(s) more than {args.max_slowdown}x slower than {args.baseline}")
+    return 1 if len(regressions) > 0 else 0
+
+if __name__ == "__main__":
+    sys.exit(main())
@@ -0,0 +1,199 @@
+﻿# Runs the example projects headlessly at increasing graph sizes and compares the results against a stored baseline
+# Usage: python benchmarks/bench_projects.py [--sizes 10 100 1000] [--projects dijkstra prims] [--save-baseline]
+import gc
+import os
+import re
+import sys
+import json
+import time
+import random
+import argparse
+import statistics
+import tracemalloc
+from typing import List, Dict, Any, Optional
+
+SRC_DIR = os.path.normpath(os.path.join(os.path.dirname(os.path.abspath(__file__)), "..", "src"))
+sys.path.insert(0, SRC_DIR)
+
+import pynode_headless
+import pynode_graphlib
+
+PROJECTS = ["dijkstra", "prims", "cannibals", "tictactoe", "greek_islands"]
+SIZES = [10, 100, 1000, 10000, 100000]
+DEFAULT_BASELINE = os.path.join(os.path.dirname(os.path.abspath(__file__)), "baseline_projects.json")
+GRAPHLIB_FILE = pynode_graphlib.Graph.add_node.__code__.co_filename
+
+# Metrics where a higher value is a regression, along with the smallest absolute change that counts (to ignore timer noise).
+# For the timed ones, a change also has to exceed NOISE_SPREADS times the spread of the repeats (see compare)
+COMPARED_METRICS = {"exec_ms": 2.0, "api_us_per_call": 2.0, "peak_kb": 64.0}
+TIMED_METRICS = ["exec_ms", "api_us_per_call"]
+NOISE_SPREADS = 3.0
+# Runs that take at least this long are only timed once, since they're long enough not to be moved much by noise
+LONG_RUN_MS = 1000.0
+
+def load_source(project: str) -> str:
+    with open(os.path.join(SRC_DIR, "pynode_projects", project + ".py"), encoding="utf-8-sig") as f:
+        return f.read()
+
+def scale_source(src: str, size: int) -> Optional[str]:
+    # Rewrites NUM_NODES/NUM_EDGES, keeping the original ratio of edges to nodes. Returns None for projects that can't be scaled
+    nodes = re.search(r"^NUM_NODES\s*=\s*(\d+)", src, re.MULTILINE)
+    edges = re.search(r"^NUM_EDGES\s*=\s*(\d+)", src, re.MULTILINE)
+    if nodes is None: return None
+    values = {"NUM_NODES": size}
+    if edges is not None: values["NUM_EDGES"] = max(size - 1, round(size * int(edges.group(1)) / int(nodes.group(1))))
+    return pynode_headless.set_constants(src, values)
+
+def interact(project: str, namespace: Dict[str, Any]):
+    # Projects that wait for the user are played through with random clicks
+    if project == "tictactoe":
+        game = namespace["GameData"]
+        for i in range(9):
+            if game.turn == 3: break
+            free = [n for n in pynode_graphlib.graph.nodes() if n.attribute("valid") and game.grid[n.id()[0]][n.id()[1]] == 0]
+            if len(free) == 0: break
+            pynode_headless.click(random.choice(free))
+
+def prepare(record: bool):
+    # Garbage from the previous run is collected up front so it isn't counted against the next one
+    pynode_headless.reset(record)
+    gc.collect()
+
+def execute(project: str, src: str, seed: int, record: bool):
+    random.seed(seed)
+    namespace = pynode_headless.run(src, record)
+    interact(project, namespace)
+
+def count_api_calls(project: str, src: str, seed: int):
+    # Counts graph API calls made directly by the project (including property access), and the time spent in them.
+    # This runs separately since the profiler hook slows everything down
+    calls = [0]
+    elapsed = [0.0]
+    active = [None]
+    started = [0.0]
+
+    def profile(frame, event, arg):
+        if event == "call":
+            if active[0] is None and frame.f_back is not None and frame.f_back.f_code.co_filename == pynode_headless.PROJECT_FILENAME \
+                    and frame.f_code.co_filename == GRAPHLIB_FILE:
+                active[0] = frame
+                calls[0] += 1
+                started[0] = time.perf_counter()
+        elif event == "return" and frame is active[0]:
+            elapsed[0] += time.perf_counter() - started[0]
+            active[0] = None
+
+    prepare(False)
+    sys.setprofile(profile)
+    try:
+        execute(project, src, seed, False)
+    finally:
+        sys.setprofile(None)
+    return calls[0], elapsed[0]
+
+def sample(project: str, src: str, seed: int, record: bool) -> Dict[str, Any]:
+    # One timed run, and one under the profiler for the API calls
+    prepare(record)
+    start = time.perf_counter()
+    execute(project, src, seed, record)
+    exec_ms = (time.perf_counter() - start) * 1000
+    events = pynode_headless.event_count()
+    nodes, edges = pynode_graphlib.graph.order(), pynode_graphlib.graph.size()
+    calls, api_time = count_api_calls(project, src, seed)
+    return {"nodes": nodes, "edges": edges, "exec_ms": exec_ms, "events": events, "api_calls": calls,
+            "api_us_per_call": api_time * 1e6 / calls if calls > 0 else 0.0}
+
+def peak_kb(project: str, src: str, seed: int, record: bool) -> float:
+    # Memory is measured in a separate run, since tracing slows everything down
+    prepare(record)
+    tracemalloc.start()
+    try:
+        execute(project, src, seed, record)
+        peak = tracemalloc.get_traced_memory()[1]
+    finally:
+        tracemalloc.stop()
+    return round(peak / 1024, 1)
+
+def summarize(samples: List[Dict[str, Any]], peak: float) -> Dict[str, Any]:
+    # The median of the repeats, along with each timed metric's spread (the median distance of the repeats from their median)
+    result = {"nodes": samples[0]["nodes"], "edges": samples[0]["edges"], "events": samples[0]["events"], "api_calls": samples[0]["api_calls"], "repeats": len(samples)}
+    for metric in TIMED_METRICS:
+        values = [s[metric] for s in samples]
+        median = statistics.median(values)
+        result[metric] = round(median, 3)
+        result[metric + "_spread"] = round(statistics.median(abs(v - median) for v in values), 3)
+    result["peak_kb"] = peak
+    return result
+
+def compare(key: str, result: Dict[str, Any], baseline: Dict[str, Any], tolerance: float) -> List[str]:
+    problems = []
+    if key not in baseline: return problems
+    old = baseline[key]
+    for metric, floor in COMPARED_METRICS.items():
+        if metric not in old: continue
+        noise = max(floor, NOISE_SPREADS * (old.get(metric + "_spread", 0.0) + result.get(metric + "_spread", 0.0)))
+        if result[metric] > old[metric] * (1 + tolerance) and result[metric] - old[metric] > noise:
+            problems.append(f"{metric} {old[metric]} -> {result[metric]}")
+    if "events" in old and result["events"] != old["events"]:
+        problems.append(f"events {old['events']} -> {result['events']}")
+    return problems
+
+def main(argv: List[str] = None) -> int:
+    parser = argparse.ArgumentParser(description="Benchmark the example projects without a browser.")
+    parser.add_argument("--projects", nargs="+", default=PROJECTS)
+    parser.add_argument("--sizes", nargs="+", type=int, default=SIZES, help="values for NUM_NODES (NUM_EDGES is scaled to match)")
+    parser.add_argument("--seed", type=int, default=0)
+    parser.add_argument("--null", action="store_true", help="count events without keeping them (null backend)")
+    parser.add_argument("--baseline", default=DEFAULT_BASELINE)
+    parser.add_argument("--save-baseline", action="store_true", help="write the results to the baseline file instead of comparing")
+    parser.add_argument("--repeat", type=int, default=5, help="passes over all of the runs, the median of which is compared (runs over LONG_RUN_MS are timed once)")
+    parser.add_argument("--tolerance", type=float, default=0.25, help="allowed relative slowdown before a result counts as a regression")
+    parser.add_argument("--json", help="also write the results to this file")
+    args = parser.parse_args(argv)
+
+    baseline = {}
+    if not args.save_baseline and os.path.exists(args.baseline):
+        with open(args.baseline, encoding="utf-8") as f: baseline = json.load(f)["results"]
+
+    sys.setrecursionlimit(max(sys.getrecursionlimit(), 10000))
+    results = {}
+    regressions = 0
+    runs = []
+    for project in args.projects:
+        src = load_source(project)
+        project_runs = [(project, f"{project}@{size}", scale_source(src, size)) for size in args.sizes]
+        if project_runs[0][2] is None: project_runs = [(project, project, src)]
+        # Untimed warm-up, so imports and first-call costs aren't counted against the smallest size
+        prepare(False)
+        execute(project, project_runs[0][2], args.seed, False)
+        runs += project_runs
+
+    # Every run is repeated once per pass over all of them, and the median is compared. A slow spell of the machine then only affects one
+    # of a run's repeats, which the median leaves out
+    samples: Dict[str, List[Dict[str, Any]]] = {}
+    for i in range(args.repeat):
+        for project, key, run_src in runs:
+            if i > 0 and samples[key][0]["exec_ms"] >= LONG_RUN_MS: continue
+            samples.setdefault(key, []).append(sample(project, run_src, args.seed, not args.null))
+
+    print(f"{'project':<24}{'nodes':>8}{'edges':>8}{'exec ms':>12}{'events':>10}{'api calls':>11}{'us/call':>9}{'peak KB':>11}")
+    for project, key, run_src in runs:
+        result = summarize(samples[key], peak_kb(project, run_src, args.seed, not args.null))
+        results[key] = result
+        problems = compare(key, result, baseline, args.tolerance)
+        regressions += 1 if len(problems) > 0 else 0
+        print(f"{key:<24}{result['nodes']:>8}{result['edges']:>8}{result['exec_ms']:>12.2f}{result['events']:>10}{result['api_calls']:>11}"
+              f"{result['api_us_per_call']:>9.2f}{result['peak_kb']:>11.1f}" + ("  REGRESSION: " + ", ".join(problems) if problems else ""))
+
+    output = {"python": sys.version.split()[0], "seed": args.seed, "repeat": args.repeat, "results": results}
+    if args.save_baseline:
+        with open(args.baseline, "w", encoding="utf-8") as f: json.dump(output, f, indent=2)
+        print(f"Saved baseline to {args.baseline}")
+    if args.json:
+        with open(args.json, "w", encoding="utf-8") as f: json.dump(output, f, indent=2)
+    if len(baseline) > 0:
+        print(f"{regressions} regression(s) against {args.baseline}")
+    return 1 if regressions > 0 else 0
+
+if __name__ == "__main__":
+    sys.exit(main())
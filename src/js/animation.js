@@ -0,0 +1,273 @@
+// Runs every element animation (highlights, changes of colour/size/width and edge traversals) from one frame loop, instead of a D3
+// transition and timer for each element. Running animations are kept in flat arrays, at most one for each element and property, and
+// traversals borrow an overlay path from a pool rather than every edge having a hidden path of its own
+var PYNODE_NODE_SIZE = 0, PYNODE_NODE_COLOR = 1, PYNODE_NODE_OUTLINE = 2, PYNODE_EDGE_WIDTH = 3, PYNODE_EDGE_COLOR = 4, PYNODE_EDGE_TRAVERSAL = 5;
+var PYNODE_ANIMATED_ATTRIBUTES = ["r", "fill", "stroke", "stroke-width", "stroke", "stroke-dashoffset"];
+var PYNODE_ANIMATED_COLORS = [false, true, true, false, true, false];
+// The value a property goes back to at the end of a highlight, read from the element's data when the highlight turns around
+var PYNODE_RESTING_VALUES = [
+    function (d) { return d.r; },
+    function (d) { return d.color; },
+    function (d) { return d.labelStyle.outline === null ? d.color : d.labelStyle.outline; },
+    function (d) { return d.lineWidth; },
+    function (d) { return d.stroke; },
+    null
+];
+
+function PynodeAnimator() {
+    this.count = 0;
+    this.capacity = 0;
+    // Element (or for traversals, the edge's path) and property -> index of its running animation
+    this.slots = new Map();
+    this.pool = [];
+    this.group = null;
+    this.frame = null;
+    // Timelines of calls that are made at set times (see js_animate), each one as [start time, calls, index of the next call]
+    this.timelines = [];
+    this.grow(64);
+}
+
+PynodeAnimator.prototype.grow = function (capacity) {
+    var self = this;
+    function copy(Type, name) {
+        var array = new Type(capacity);
+        if (self[name] !== undefined) array.set(self[name].subarray(0, self.count));
+        self[name] = array;
+    }
+    copy(Uint8Array, "properties");
+    copy(Float64Array, "starts");
+    copy(Float64Array, "durations");
+    // Where each animation goes back to its resting value afterwards, this is how long that takes (0 if it doesn't)
+    copy(Float64Array, "returns");
+    // Numbers, or colours packed as 0xRRGGBB
+    copy(Float64Array, "from");
+    copy(Float64Array, "to");
+    if (this.keys === undefined) {
+        this.keys = [];
+        this.elements = [];
+        // The exact final value (such as a colour name), which is set once the animation ends
+        this.targets = [];
+    }
+    this.capacity = capacity;
+};
+
+PynodeAnimator.prototype.slot = function (key, property, create) {
+    var slots = this.slots.get(key);
+    if (slots === undefined) {
+        if (!create) return -1;
+        slots = [-1, -1, -1, -1, -1, -1];
+        this.slots.set(key, slots);
+    }
+    if (slots[property] === -1 && create) {
+        if (this.count === this.capacity) this.grow(this.capacity * 2);
+        slots[property] = this.count++;
+    }
+    return slots[property];
+};
+
+PynodeAnimator.prototype.remove = function (i) {
+    // The last animation moves into the free index
+    var last = --this.count;
+    var slots = this.slots.get(this.keys[i]);
+    slots[this.properties[i]] = -1;
+    if (slots.every(function (s) { return s === -1; })) this.slots.delete(this.keys[i]);
+    if (i !== last) {
+        this.keys[i] = this.keys[last];
+        this.elements[i] = this.elements[last];
+        this.targets[i] = this.targets[last];
+        this.properties[i] = this.properties[last];
+        this.starts[i] = this.starts[last];
+        this.durations[i] = this.durations[last];
+        this.returns[i] = this.returns[last];
+        this.from[i] = this.from[last];
+        this.to[i] = this.to[last];
+        this.slots.get(this.keys[i])[this.properties[i]] = i;
+    }
+    this.keys[last] = this.elements[last] = this.targets[last] = null;
+};
+
+PynodeAnimator.prototype.parse = function (property, value) {
+    if (!PYNODE_ANIMATED_COLORS[property]) return parseFloat(value) || 0;
+    var rgb = d3.rgb(value === null ? "#000000" : value);
+    return (rgb.r << 16) | (rgb.g << 8) | rgb.b;
+};
+
+PynodeAnimator.prototype.animate = function (element, property, value, duration, returnDuration) {
+    // Animates one of an element's properties to value, replacing any animation of that property that's still running. If returnDuration
+    // is given, the property then goes back to its resting value (a temporary highlight)
+    if (element === null) return;
+    var i = this.slot(element, property, true);
+    this.keys[i] = this.elements[i] = element;
+    this.targets[i] = value;
+    this.properties[i] = property;
+    this.starts[i] = performance.now();
+    this.durations[i] = duration;
+    this.returns[i] = returnDuration || 0;
+    this.from[i] = this.parse(property, element.getAttribute(PYNODE_ANIMATED_ATTRIBUTES[property]));
+    this.to[i] = this.parse(property, value);
+    this.schedule();
+};
+
+PynodeAnimator.prototype.animateAll = function (selection, property, value, duration, returnDuration) {
+    // The value can be a function of each element's data, as with D3
+    var self = this;
+    selection.each(function (d) {
+        self.animate(this, property, typeof value === "function" ? value(d) : value, duration, returnDuration);
+    });
+};
+
+PynodeAnimator.prototype.cancel = function (element, property) {
+    var i = this.slot(element, property, false);
+    if (i !== -1) this.remove(i);
+};
+
+PynodeAnimator.prototype.cancelAll = function (selection, property) {
+    var self = this;
+    selection.each(function () { self.cancel(this, property); });
+};
+
+PynodeAnimator.prototype.overlay = function () {
+    if (this.group === null || this.group.parentNode === null) {
+        this.group = document.createElementNS("http://www.w3.org/2000/svg", "g");
+        this.group.setAttribute("class", "traversals");
+        this.pool = [];
+    }
+    // Kept above the edges that were added since
+    var edges = greuler_instance.edgeGroup.node();
+    if (this.group !== edges.lastChild) edges.appendChild(this.group);
+    var path = this.pool.pop();
+    if (path === undefined) {
+        path = document.createElementNS("http://www.w3.org/2000/svg", "path");
+        path.setAttribute("fill", "transparent");
+        path.setAttribute("stroke-width", 5);
+        path.setAttribute("pointer-events", "none");
+        this.group.appendChild(path);
+    }
+    path.style.display = "";
+    return path;
+};
+
+PynodeAnimator.prototype.release = function (path) {
+    path.style.display = "none";
+    path.removeAttribute("stroke-dasharray");
+    path.removeAttribute("stroke-dashoffset");
+    path.setAttribute("opacity", 0);
+    if (path.parentNode === this.group) this.pool.push(path);
+};
+
+PynodeAnimator.prototype.traverse = function (base, color, duration, fromTarget) {
+    // Draws a line of the given colour along an edge's path, from its source (or from its target), which fades out as it goes
+    var i = this.slot(base, PYNODE_EDGE_TRAVERSAL, false);
+    var path = i !== -1 ? this.elements[i] : this.overlay();
+    if (i === -1) i = this.slot(base, PYNODE_EDGE_TRAVERSAL, true);
+    var length = base.getTotalLength();
+    path.setAttribute("d", base.getAttribute("d"));
+    path.setAttribute("stroke", color);
+    path.setAttribute("stroke-dasharray", length + " " + length);
+    path.setAttribute("stroke-dashoffset", length);
+    path.setAttribute("opacity", 1);
+    this.keys[i] = base;
+    this.elements[i] = path;
+    this.targets[i] = null;
+    this.properties[i] = PYNODE_EDGE_TRAVERSAL;
+    this.starts[i] = performance.now();
+    this.durations[i] = duration;
+    this.returns[i] = 0;
+    this.from[i] = length;
+    this.to[i] = fromTarget ? length * 2 : 0;
+    this.schedule();
+};
+
+PynodeAnimator.prototype.play = function (calls) {
+    // Makes each call [time, function name, arguments] once that many milliseconds have passed, from the same frame loop as the animations
+    this.timelines.push([performance.now(), calls, 0]);
+    this.tick();
+};
+
+PynodeAnimator.prototype.schedule = function () {
+    var self = this;
+    if (this.frame === null) this.frame = requestAnimationFrame(function () { self.tick(); });
+};
+
+PynodeAnimator.prototype.tick = function () {
+    if (this.frame !== null) cancelAnimationFrame(this.frame);
+    this.frame = null;
+    var now = performance.now();
+    if (this.timelines.length > 0) {
+        var timelines = this.timelines;
+        this.timelines = [];
+        for (var i = 0; i < timelines.length; i++) {
+            var timeline = timelines[i], calls = timeline[1], next = timeline[2];
+            while (next < calls.length && calls[next][0] <= now - timeline[0]) {
+                window[calls[next][1]].apply(null, calls[next][2]);
+                next++;
+            }
+            timeline[2] = next;
+            if (next < calls.length) this.timelines.push(timeline);
+        }
+        now = performance.now();
+    }
+    // Backwards, so the animation that's moved into a removed one's index has already been updated
+    for (var i = this.count - 1; i >= 0; i--) {
+        var property = this.properties[i];
+        var element = this.elements[i];
+        var t = this.durations[i] > 0 ? (now - this.starts[i]) / this.durations[i] : 1;
+        if (property === PYNODE_EDGE_TRAVERSAL) {
+            var base = this.keys[i];
+            if (t >= 1 || base.parentNode === null) {
+                this.release(element);
+                this.remove(i);
+                continue;
+            }
+            // The overlay follows the edge while the layout moves it
+            var d = base.getAttribute("d");
+            if (element.getAttribute("d") !== d) element.setAttribute("d", d);
+            var e = pynode_ease(t);
+            element.setAttribute("stroke-dashoffset", this.from[i] + (this.to[i] - this.from[i]) * e);
+            element.setAttribute("opacity", 1 - e);
+            continue;
+        }
+        var attribute = PYNODE_ANIMATED_ATTRIBUTES[property];
+        if (t >= 1) {
+            element.setAttribute(attribute, this.targets[i]);
+            if (this.returns[i] > 0 && element.__data__ !== undefined) {
+                // Turns around, towards the value the element has now
+                var resting = PYNODE_RESTING_VALUES[property](element.__data__);
+                this.starts[i] += this.durations[i];
+                this.durations[i] = this.returns[i];
+                this.returns[i] = 0;
+                this.from[i] = this.to[i];
+                this.to[i] = this.parse(property, resting);
+                this.targets[i] = resting;
+            }
+            else this.remove(i);
+            continue;
+        }
+        var e = pynode_ease(t), a = this.from[i], b = this.to[i];
+        if (PYNODE_ANIMATED_COLORS[property]) {
+            var r = Math.round(((a >> 16) & 255) + (((b >> 16) & 255) - ((a >> 16) & 255)) * e);
+            var g = Math.round(((a >> 8) & 255) + (((b >> 8) & 255) - ((a >> 8) & 255)) * e);
+            var bl = Math.round((a & 255) + ((b & 255) - (a & 255)) * e);
+            element.setAttribute(attribute, "rgb(" + r + "," + g + "," + bl + ")");
+        }
+        else element.setAttribute(attribute, a + (b - a) * e);
+    }
+    if (this.count > 0 || this.timelines.length > 0) this.schedule();
+};
+
+PynodeAnimator.prototype.clear = function () {
+    for (var i = 0; i < this.count; i++) {
+        if (this.properties[i] === PYNODE_EDGE_TRAVERSAL) this.release(this.elements[i]);
+        this.keys[i] = this.elements[i] = this.targets[i] = null;
+    }
+    this.count = 0;
+    this.slots = new Map();
+    this.timelines = [];
+};
+
+function pynode_ease(t) {
+    // Cubic in-out, the default easing of D3 transitions
+    return t < 0.5 ? 4 * t * t * t : 1 - Math.pow(2 - 2 * t, 3) / 2;
+}
+
+var pynode_animator = new PynodeAnimator();
@@ -0,0 +1,139 @@
+// The console pane. Output is kept as lines in a ring buffer (the oldest lines are dropped once it's full), and only the lines
+// that are scrolled into view have elements, so printing in a loop stays fast however much has been printed
+var PYNODE_CONSOLE_CAPACITY = 10000;
+
+function PynodeConsole(element, capacity) {
+    var self = this;
+    this.element = element;
+    this.capacity = capacity || Number(localStorage.getItem("pynode_console_capacity")) || PYNODE_CONSOLE_CAPACITY;
+    // Each line is a list of [text, color, isHTML] segments
+    this.lines = new Array(this.capacity);
+    this.start = 0;
+    this.count = 0;
+    // Whether the last line is still being written to (it hasn't ended with a line break yet)
+    this.open = false;
+    this.lineHeight = 0;
+    this.pending = false;
+    this.follow = true;
+
+    var initial = element.innerHTML;
+    element.innerHTML = "";
+    element.style.position = "relative";
+    this.spacer = document.createElement("div");
+    this.view = document.createElement("div");
+    this.view.className = "consoleLines";
+    element.appendChild(this.spacer);
+    element.appendChild(this.view);
+    element.addEventListener("scroll", function () {
+        // New output keeps the pane scrolled to the bottom, unless the user has scrolled up
+        self.follow = element.scrollTop + element.clientHeight >= element.scrollHeight - 2;
+        self.schedule();
+    });
+    if (initial !== "") this.writeHTML(initial);
+}
+
+PynodeConsole.prototype.line = function (i) {
+    return this.lines[(this.start + i) % this.capacity];
+};
+
+PynodeConsole.prototype.newLine = function () {
+    if (this.count === this.capacity) this.start = (this.start + 1) % this.capacity;
+    else this.count++;
+    var line = [];
+    this.lines[(this.start + this.count - 1) % this.capacity] = line;
+    return line;
+};
+
+PynodeConsole.prototype.write = function (text, color) {
+    var parts = text.split("\n");
+    for (var i = 0; i < parts.length; i++) {
+        if (i > 0) {
+            // A line break ends the current line, or is an empty line of its own
+            if (!this.open) this.newLine();
+            this.open = false;
+        }
+        if (parts[i] === "") continue;
+        var line = this.open ? this.line(this.count - 1) : this.newLine();
+        this.open = true;
+        var last = line[line.length - 1];
+        if (last !== undefined && last[1] === color && !last[2]) last[0] += parts[i];
+        else line.push([parts[i], color, false]);
+    }
+    this.schedule();
+};
+
+PynodeConsole.prototype.writeHTML = function (html) {
+    this.newLine().push([html, "", true]);
+    this.open = false;
+    this.schedule();
+};
+
+PynodeConsole.prototype.clear = function () {
+    this.lines = new Array(this.capacity);
+    this.start = 0;
+    this.count = 0;
+    this.open = false;
+    this.follow = true;
+    this.schedule();
+};
+
+PynodeConsole.prototype.setCapacity = function (capacity) {
+    var keep = Math.min(this.count, capacity);
+    var lines = new Array(capacity);
+    for (var i = 0; i < keep; i++) lines[i] = this.line(this.count - keep + i);
+    this.lines = lines;
+    this.capacity = capacity;
+    this.start = 0;
+    this.count = keep;
+    this.schedule();
+};
+
+PynodeConsole.prototype.text = function () {
+    var lines = [];
+    for (var i = 0; i < this.count; i++) lines.push(this.line(i).map(function (segment) { return segment[0]; }).join(""));
+    return lines.join("\n");
+};
+
+PynodeConsole.prototype.schedule = function () {
+    if (this.pending) return;
+    this.pending = true;
+    var self = this;
+    window.requestAnimationFrame(function () { self.render(); });
+};
+
+PynodeConsole.prototype.lineElement = function (line) {
+    var div = document.createElement("div");
+    div.className = "consoleLine";
+    div.style.height = this.lineHeight + "px";
+    for (var i = 0; i < line.length; i++) {
+        var span = document.createElement("span");
+        if (line[i][2]) span.innerHTML = line[i][0];
+        else span.textContent = line[i][0];
+        if (line[i][1]) span.style.color = line[i][1];
+        div.appendChild(span);
+    }
+    return div;
+};
+
+PynodeConsole.prototype.render = function () {
+    this.pending = false;
+    var element = this.element;
+    if (this.lineHeight === 0) {
+        var probe = this.lineElement([["M", "", false]]);
+        probe.style.height = "";
+        this.view.appendChild(probe);
+        this.lineHeight = probe.offsetHeight || 16;
+        this.view.removeChild(probe);
+    }
+    var height = this.lineHeight;
+    this.spacer.style.height = this.count * height + "px";
+    if (this.follow) element.scrollTop = element.scrollHeight;
+    // A few lines either side of the visible ones are drawn too, so scrolling doesn't show gaps before the next frame
+    var first = Math.max(0, Math.floor(element.scrollTop / height) - 10);
+    var last = Math.min(this.count, Math.ceil((element.scrollTop + element.clientHeight) / height) + 10);
+    var fragment = document.createDocumentFragment();
+    for (var i = first; i < last; i++) fragment.appendChild(this.lineElement(this.line(i)));
+    this.view.style.top = first * height + "px";
+    this.view.textContent = "";
+    this.view.appendChild(fragment);
+};
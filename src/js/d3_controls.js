@@ -30,18 +30,84 @@ function set_layout_type() {
 		greuler_instance.edgeGroup.transition(500).attr("transform", "translate(0,0) scale(1.0)");
 		if (document.getElementById("layout1On").style.display === "none") { enable_box_layout() }
 		else { enable_drag_layout() }
+		greuler_instance.root.on("mousemove.hover", hover_hit_test).on("mouseleave.hover", hover_leave);
 	}
 }
 
 var clickListener;
 var clickListenerFunc;
+var eventListener;
+var pendingElementEvents = [];
+var pendingElementEventsFrame = null;
 function registerClickListener(func) {
 	clickListener = func;
 }
 
-function clickNode(nodeId) {
-	if (clickListener !== undefined) {
-		clickListener(nodeId);
+function registerEventListener(func) {
+	eventListener = func;
+}
+
+function queueElementEvent(type, elementId) {
+	// Only the latest event of each type is kept, so listeners run at most once per frame
+	for (var i = 0; i < pendingElementEvents.length; i++) {
+		if (pendingElementEvents[i].type === type) {
+			pendingElementEvents[i].id = elementId;
+			return;
+		}
+	}
+	pendingElementEvents.push({type: type, id: elementId});
+	if (pendingElementEventsFrame === null) pendingElementEventsFrame = requestAnimationFrame(flushElementEvents);
+}
+
+function flushElementEvents() {
+	var events = pendingElementEvents;
+	pendingElementEvents = [];
+	pendingElementEventsFrame = null;
+	for (var i = 0; i < events.length; i++) {
+		if (eventListener !== undefined) {
+			eventListener(events[i].type, events[i].id);
+		}
+		else if (events[i].type === "node_click" && clickListener !== undefined) {
+			clickListener(events[i].id);
+		}
 	}
+}
+
+function clickNode(nodeId) {
+	queueElementEvent("node_click", nodeId);
     console.log("pynode:click:" + nodeId);
 }
+
+function clickEdge(edgeId) {
+	queueElementEvent("edge_click", edgeId);
+	console.log("pynode:edge_click:" + edgeId);
+}
+
+function hoverNode(nodeId) {
+	queueElementEvent("node_hover", nodeId);
+}
+
+// Hovering is hit tested against the grid of node positions (see spatial.js), rather than with mouseover/mouseout on every node
+var hoveredNodeId = null;
+function hover_hit_test() {
+	if (js_node_grid === null || greuler_instance.nodeDragging) return;
+	var point = window.d3.mouse(greuler_instance.nodeGroup.node());
+	var node = js_node_grid.hit(point[0], point[1]);
+	set_hovered_node(node !== null && greuler_instance.graph.hasNode({id: node.id}) ? node.id : null);
+}
+
+function hover_leave() {
+	if (!greuler_instance.nodeDragging) set_hovered_node(null);
+}
+
+function set_hovered_node(nodeId) {
+	if (nodeId === hoveredNodeId) return;
+	hoveredNodeId = nodeId;
+	greuler_instance.root.style("cursor", nodeId !== null ? "pointer" : null);
+	hoverNode(nodeId);
+}
+
+function dragEndNode(nodeId) {
+	queueElementEvent("node_drag_end", nodeId);
+	console.log("pynode:drag_end:" + nodeId);
+}
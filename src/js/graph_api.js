@@ -2,6 +2,169 @@ js_update_timer = null;
 js_do_update = true;
 js_positioning_counter = 0;
 js_GLOBAL_ID = 0;
+js_positions = new Float64Array(0);
+js_positions_frame = null;
+js_position_listener = null;
+js_node_grid = null;
+js_styles = {};
+js_loaded_scripts = {};
+js_pending_scripts = 0;
+
+// Loads scripts in order without blocking the page, then calls callback. Scripts that are already loaded aren't loaded again
+function js_load_scripts(sources, callback) {
+    if (sources.length === 0) {
+        if (callback) callback();
+        return;
+    }
+    var src = sources[0];
+    var next = function () { js_load_scripts(sources.slice(1), callback); };
+    if (js_loaded_scripts[src] === true) {
+        next();
+        return;
+    }
+    if (js_loaded_scripts[src] !== undefined) {
+        js_loaded_scripts[src].push(next);
+        return;
+    }
+    js_loaded_scripts[src] = [next];
+    js_pending_scripts++;
+    var script = document.createElement("script");
+    script.src = src;
+    script.onload = function () {
+        var waiting = js_loaded_scripts[src];
+        js_loaded_scripts[src] = true;
+        for (var i = 0; i < waiting.length; i++) waiting[i]();
+        js_pending_scripts--;
+    };
+    script.onerror = function () {
+        js_loaded_scripts[src] = undefined;
+        js_pending_scripts--;
+        console.log("pynode: failed to load " + src);
+    };
+    document.head.appendChild(script);
+}
+
+function js_scripts_ready() {
+    return js_pending_scripts === 0;
+}
+
+// The JS that Brython generates for the programs that were run most recently, kept in local storage by a hash of everything it depends on
+// (the source, the Brython version and options, and the names already in the namespace, which are compiled as globals). Running unchanged code again,
+// even after reloading the page, then skips parsing and transpiling it (see pynode_core.exec_program).
+// This relies on Brython internals, and was written against Brython 3.14.0 (the version of src/js/brython/brython.js, pinned in static.yml).
+// If they change, js_exec_program reports that it didn't run the program, and it's run with exec instead
+js_program_functions = {};
+js_program_cache_size = 8;
+
+function js_exec_supported() {
+    var $B = __BRYTHON__, _b_ = $B.builtins;
+    return !!($B._PyPegen && $B._PyPegen.run_parser && $B.Parser && $B._PySymtable_Build && $B.future_features && $B.js_from_root
+        && $B.enter_frame && $B.set_exc && $B.$getattr && _b_.dict && _b_.dict.$keys_string && _b_.dict.$getitem_string
+        && $B.file_cache && $B.url2name && $B.implementation && $B.get_option);
+}
+
+function js_hash(text) {
+    var h1 = 0xdeadbeef, h2 = 0x41c6ce57;
+    for (var i = 0; i < text.length; i++) {
+        var c = text.charCodeAt(i);
+        h1 = Math.imul(h1 ^ c, 2654435761);
+        h2 = Math.imul(h2 ^ c, 1597334677);
+    }
+    h1 = Math.imul(h1 ^ (h1 >>> 16), 2246822507) ^ Math.imul(h2 ^ (h2 >>> 13), 3266489909);
+    h2 = Math.imul(h2 ^ (h2 >>> 16), 2246822507) ^ Math.imul(h1 ^ (h1 >>> 13), 3266489909);
+    return (h2 >>> 0).toString(16) + (h1 >>> 0).toString(16) + "_" + text.length;
+}
+
+function js_program_key(src, filename, local_name, global_name, exec_globals) {
+    var $B = __BRYTHON__;
+    var names = Object.keys(exec_globals).filter(function (name) { return name[0] !== "$"; }).sort();
+    return "pynode_js:" + js_hash([$B.implementation.join("."), $B.get_option("debug"), filename, local_name, global_name, names.join(","), src].join("\n"));
+}
+
+function js_forget_program(key) {
+    delete js_program_functions[key];
+    try { localStorage.removeItem(key); } catch (err) {}
+}
+
+function js_program_function(key, src, filename, local_name, global_name, exec_globals) {
+    var $B = __BRYTHON__;
+    if (js_program_functions[key] !== undefined) return js_program_functions[key];
+    var js = null;
+    try { js = localStorage.getItem(key); } catch (err) {}
+    if (js === null) {
+        var ast = $B._PyPegen.run_parser(new $B.Parser(src, filename, "file"));
+        var symtable = $B._PySymtable_Build(ast, filename, $B.future_features(ast, filename));
+        js = $B.js_from_root({ast: ast, symtable: symtable, filename: filename, src: src,
+            namespaces: {local_name: local_name, exec_locals: exec_globals, global_name: global_name, exec_globals: exec_globals}}).js;
+        try {
+            var keys = JSON.parse(localStorage.getItem("pynode_js_keys") || "[]").filter(function (k) { return k !== key; });
+            while (keys.length >= js_program_cache_size) localStorage.removeItem(keys.shift());
+            keys.push(key);
+            localStorage.setItem(key, js);
+            localStorage.setItem("pynode_js_keys", JSON.stringify(keys));
+        } catch (err) {
+            // Local storage is full or unavailable, the program is still run
+        }
+    }
+    var keys_in_page = Object.keys(js_program_functions);
+    if (keys_in_page.length >= js_program_cache_size) delete js_program_functions[keys_in_page[0]];
+    js_program_functions[key] = new Function("$B", "_b_", "locals", local_name, global_name, "frame", "_frame_obj", js);
+    return js_program_functions[key];
+}
+
+// Runs a program the way Brython's exec(src, namespace) does, but with its generated JS cached. program is a Python object
+// (which Brython passes through without converting it) whose namespace attribute is the dict the program runs in.
+// Returns false if the program wasn't run (the Brython internals are missing, or compiling it or setting it up failed), so the caller can exec it instead
+function js_exec_program(src, program) {
+    if (!js_exec_supported()) return false;
+    var $B = __BRYTHON__, _b_ = $B.builtins;
+    var globals = $B.$getattr(program, "namespace");
+    var exec_globals = globals.$jsobj;
+    if (!exec_globals) {
+        exec_globals = globals.$jsobj = {};
+        for (var key of _b_.dict.$keys_string(globals)) exec_globals[key] = _b_.dict.$getitem_string(globals, key);
+        globals.$all_str = false;
+    }
+    if (exec_globals.__builtins__ === undefined) exec_globals.__builtins__ = _b_.__builtins__;
+    src = src.replace(/\r\n/g, "\n").replace(/\r/g, "\n");
+    var filename = "<string>", name = exec_globals.__name__;
+    var local_name = ("locals_" + name).replace(/\./g, "_"), global_name = ("globals_" + name).replace(/\./g, "_");
+    $B.url2name[filename] = name;
+    $B.file_cache[filename] = src;
+    $B.exec_scope = $B.exec_scope || {};
+
+    var save_frame_obj = $B.frame_obj;
+    var frame = [name, exec_globals, name, exec_globals];
+    frame.is_exec_top = true;
+    $B.enter_frame(frame, filename, 1);
+    var _frame_obj = $B.frame_obj;
+    var program_key, func;
+    try {
+        program_key = js_program_key(src, filename, local_name, global_name, exec_globals);
+        func = js_program_function(program_key, src, filename, local_name, global_name, exec_globals);
+    } catch (err) {
+        // Including syntax errors, which exec then reports the usual way
+        $B.frame_obj = save_frame_obj;
+        if (program_key !== undefined) js_forget_program(program_key);
+        return false;
+    }
+    // The generated code sets the line number before each statement, so it's still 0 if it failed before running any of the program
+    frame.$lineno = 0;
+    try {
+        func($B, _b_, exec_globals, exec_globals, exec_globals, frame, _frame_obj);
+    } catch (err) {
+        if (frame.$lineno === 0) {
+            $B.frame_obj = save_frame_obj;
+            js_forget_program(program_key);
+            return false;
+        }
+        $B.set_exc(err, frame);
+        $B.frame_obj = save_frame_obj;
+        throw err;
+    }
+    $B.frame_obj = save_frame_obj;
+    return true;
+}
 
 function enable_update(enable) {
     js_do_update = enable;
@@ -40,8 +203,17 @@ function js_update(layout) {
     }
 }
 
+function js_register_style(style_id, size, color, outline) {
+    // outline is null when the text outline follows the element's own color
+    js_styles[style_id] = {size: size, color: color, outline: outline};
+}
+
 function js_add_node(data) {
-    if (!data.static) {
+    data.labelStyle = js_styles[data.labelStyle];
+    data.topRightLabelStyle = js_styles[data.topRightLabelStyle];
+    data.topLeftLabelStyle = js_styles[data.topLeftLabelStyle];
+    // Nodes restored from a snapshot come with the position they had when it was saved
+    if (!data.static && data.x === undefined) {
         var x = 0; var y = 0;
         var size = Math.floor(Math.sqrt(js_positioning_counter));
         if (Math.pow(size, 2) !== js_positioning_counter) size += 1;
@@ -66,6 +238,7 @@ function js_remove_node(node_id) {
 }
 
 function js_add_edge(data) {
+    data.weightStyle = js_styles[data.weightStyle];
     greuler_instance.graph.addEdge(data);
     if (greuler_instance.graph.edges.length >= greuler_instance.graph.nodes.length - 3 && (greuler_instance.graph.nodes.length - 2) % 9 === 0) js_positioning_counter = 0;
     js_update(true);
@@ -98,6 +271,24 @@ function js_remove_all(element_data) {
     js_update(true);
 }
 
+function js_batch(clear, removed, added, events) {
+    if (clear) js_clear();
+    enable_update(false);
+    for (var i = 0; i < removed.length; i++) {
+        if (removed[i][0] === 0) js_remove_node(removed[i][1]);
+        else if (removed[i][0] === 1) js_remove_edge(removed[i][1]);
+    }
+    for (var i = 0; i < added.length; i++) {
+        if (added[i][0] === 0) js_add_node(added[i][1]);
+        else if (added[i][0] === 1) js_add_edge(added[i][1]);
+    }
+    for (var i = 0; i < events.length; i++) {
+        window[events[i][0]].apply(null, events[i][1]);
+    }
+    enable_update(true);
+    js_update(true);
+}
+
 function js_set_spread(spread) {
     greuler_instance.graph.linkDistance = spread;
     greuler_instance.options.data.linkDistance = spread;
@@ -110,6 +301,8 @@ function js_clear() {
     js_update_timer = null;
     js_do_update = true;
     js_positioning_counter = 0;
+    pynode_animator.clear();
+    if (js_node_grid !== null) js_node_grid.clear();
     js_update(true);
 }
 
@@ -148,6 +341,38 @@ function js_node_get_position(node_id) {
     return data;
 }
 
+function js_push_positions() {
+    // Sends a flat [x0, y0, x1, y1, ...] snapshot to the Python side, indexed by each node's slot (which count up from 0 in every run, unlike ids)
+    js_positions_frame = null;
+    var nodes = greuler_instance.graph.nodes;
+    var max_slot = -1;
+    for (var i = 0; i < nodes.length; i++) {
+        if (nodes[i].slot !== undefined && nodes[i].slot > max_slot) max_slot = nodes[i].slot;
+    }
+    var count = (max_slot + 1) * 2;
+    if (js_positions.length < count) js_positions = new Float64Array(Math.max(count, js_positions.length * 2));
+    js_positions.fill(NaN, 0, count);
+    for (var i = 0; i < nodes.length; i++) {
+        if (nodes[i].slot === undefined) continue;
+        js_positions[nodes[i].slot * 2] = nodes[i].x;
+        js_positions[nodes[i].slot * 2 + 1] = nodes[i].y;
+    }
+    if (js_node_grid === null) js_node_grid = new PynodeSpatialGrid();
+    js_node_grid.build(nodes, function (node) { return node.id === tlBoundary.id || node.id === brBoundary.id; });
+    if (js_position_listener !== null) js_position_listener(js_positions, count, greuler_instance.options.data.size[0], greuler_instance.options.data.size[1]);
+    if (typeof js_server_positions === "function") js_server_positions(js_positions, count, greuler_instance.options.data.size[0], greuler_instance.options.data.size[1]);
+}
+
+function js_schedule_positions() {
+    if (js_positions_frame === null) js_positions_frame = requestAnimationFrame(js_push_positions);
+}
+
+function registerPositionListener(func) {
+    if (js_position_listener === null) greuler_instance.layout.on("tick.positions", js_schedule_positions).on("end.positions", js_schedule_positions);
+    js_position_listener = func;
+    js_schedule_positions();
+}
+
 function js_node_set_label(node_id, text, label_id) {
     if (greuler_instance.graph.hasNode({id: node_id})) {
         var n = greuler_instance.graph.getNode({id: node_id});
@@ -160,38 +385,37 @@ function js_node_set_label(node_id, text, label_id) {
 function js_node_set_size(node_id, size) {
     if (greuler_instance.graph.hasNode({id: node_id})) {
         greuler_instance.graph.getNode({id: node_id}).r = size;
-        greuler_instance.selector.getNode({id: node_id}).transition("highlight_node_size").duration(0);
-        greuler_instance.selector.getNode({id: node_id}).transition("node_size").duration(500).attr("r", size);
+        pynode_animator.animateAll(greuler_instance.selector.getNode({id: node_id}), PYNODE_NODE_SIZE, size, 500);
         js_update(true);
     }
 }
 
-function js_node_set_color(node_id, color, text_style) {
+function js_node_set_color(node_id, color) {
     if (greuler_instance.graph.hasNode({id: node_id})) {
-        greuler_instance.graph.getNode({id: node_id}).color = color;
-        greuler_instance.graph.getNode({id: node_id}).labelStyle = text_style;
-        greuler_instance.selector.getNode({id: node_id}).transition("highlight_node_color").duration(0);
-        greuler_instance.selector.getNodeOuter({id: node_id}).selectAll("text.label").transition("highlight_node_outline").duration(0);
-        greuler_instance.selector.getNode({id: node_id}).transition("node_color").duration(500).attr("fill", color);
-        if (text_style.toString().split(",")[3] === "False") greuler_instance.selector.getNodeOuter({id: node_id}).selectAll("text.label").transition("node_stroke_color").duration(500).attr("stroke", text_style.toString().split(",")[2]);
+        var n = greuler_instance.graph.getNode({id: node_id});
+        n.color = color;
+        var labels = greuler_instance.selector.getNodeOuter({id: node_id}).selectAll("text.label");
+        pynode_animator.animateAll(greuler_instance.selector.getNode({id: node_id}), PYNODE_NODE_COLOR, color, 500);
+        if (n.labelStyle.outline === null) pynode_animator.animateAll(labels, PYNODE_NODE_OUTLINE, color, 500);
+        else pynode_animator.cancelAll(labels, PYNODE_NODE_OUTLINE);
         js_update(false);
     }
 }
 
-function js_node_set_value_style(node_id, style) {
+function js_node_set_value_style(node_id, style_id) {
     if (greuler_instance.graph.hasNode({id: node_id})) {
-        greuler_instance.graph.getNode({id: node_id}).labelStyle = style;
-        greuler_instance.selector.getNodeOuter({id: node_id}).selectAll("text.label").transition("highlight_node_outline").duration(0);
-        greuler_instance.selector.getNodeOuter({id: node_id}).selectAll("text.label").transition("node_stroke_color").duration(0);
-        if (style.toString().split(",")[3] === "False") greuler_instance.selector.getNodeOuter({id: node_id}).selectAll("text.label").attr("stroke", style.toString().split(",")[2]);
+        var n = greuler_instance.graph.getNode({id: node_id});
+        n.labelStyle = js_styles[style_id];
+        pynode_animator.cancelAll(greuler_instance.selector.getNodeOuter({id: node_id}).selectAll("text.label"), PYNODE_NODE_OUTLINE);
+        if (n.labelStyle.outline === null) greuler_instance.selector.getNodeOuter({id: node_id}).selectAll("text.label").attr("stroke", n.color);
         js_update(false);
     }
 }
 
-function js_node_set_label_style(node_id, style, label_id) {
+function js_node_set_label_style(node_id, style_id, label_id) {
     if (greuler_instance.graph.hasNode({id: node_id})) {
-        if (label_id === 0) greuler_instance.graph.getNode({id: node_id}).topRightLabelStyle = style;
-        else if (label_id === 1) greuler_instance.graph.getNode({id: node_id}).topLeftLabelStyle = style;
+        if (label_id === 0) greuler_instance.graph.getNode({id: node_id}).topRightLabelStyle = js_styles[style_id];
+        else if (label_id === 1) greuler_instance.graph.getNode({id: node_id}).topLeftLabelStyle = js_styles[style_id];
         js_update(false);
     }
 }
@@ -224,8 +448,7 @@ function js_edge_set_directed(edge_id, directed) {
 function js_edge_set_width(edge_id, width) {
     if (greuler_instance.graph.hasEdge({id: edge_id})) {
         greuler_instance.graph.getEdge({id: edge_id}).lineWidth = width;
-        greuler_instance.selector.getEdge({id: edge_id}).transition("highlight_edge_width").duration(0);
-        greuler_instance.selector.getEdge({id: edge_id}).transition("edge_width").duration(500).attr("stroke-width", width);
+        pynode_animator.animateAll(greuler_instance.selector.getEdge({id: edge_id}), PYNODE_EDGE_WIDTH, width, 500);
         js_update(false);
     }
 }
@@ -233,15 +456,13 @@ function js_edge_set_width(edge_id, width) {
 function js_edge_set_color(edge_id, color) {
     if (greuler_instance.graph.hasEdge({id: edge_id})) {
         greuler_instance.graph.getEdge({id: edge_id}).stroke = color;
-        animate_edge = greuler_instance.selector.getEdge({id: edge_id});
-        greuler_instance.selector.getEdge({id: edge_id}).transition("highlight_edge_color").duration(0);
-        animate_edge.transition("edge_color").duration(500).attr("stroke", color);
+        pynode_animator.animateAll(greuler_instance.selector.getEdge({id: edge_id}), PYNODE_EDGE_COLOR, color, 500);
     }
 }
 
-function js_edge_set_weight_style(edge_id, style) {
+function js_edge_set_weight_style(edge_id, style_id) {
     if (greuler_instance.graph.hasEdge({id: edge_id})) {
-        greuler_instance.graph.getEdge({id: edge_id}).weightStyle = style;
+        greuler_instance.graph.getEdge({id: edge_id}).weightStyle = js_styles[style_id];
         js_update(false);
     }
 }
@@ -263,6 +484,99 @@ function js_edge_traverse(edge_id, initial_node_id, color, keep_path) {
     }
 }
 
+function js_index_ids(ids) {
+    var index = {};
+    for (var i = 0; i < ids.length; i++) index[ids[i]] = i;
+    return index;
+}
+
+function js_column(values, i) {
+    return Array.isArray(values) ? values[i] : values;
+}
+
+function js_select_nodes(index) {
+    return greuler_instance.nodeGroup.selectAll("g.node").filter(function (d) { return index.hasOwnProperty(d.id); });
+}
+
+function js_select_edges(index) {
+    return greuler_instance.edgeGroup.selectAll("g.edge").filter(function (d) { return index.hasOwnProperty(d.id); });
+}
+
+function js_set_colors(node_ids, node_colors, edge_ids, edge_colors) {
+    var node_index = js_index_ids(node_ids);
+    var edge_index = js_index_ids(edge_ids);
+    var nodes = greuler_instance.graph.nodes;
+    var edges = greuler_instance.graph.edges;
+    for (var i = 0; i < nodes.length; i++) {
+        if (!node_index.hasOwnProperty(nodes[i].id)) continue;
+        nodes[i].color = js_column(node_colors, node_index[nodes[i].id]);
+    }
+    for (var i = 0; i < edges.length; i++) {
+        if (edge_index.hasOwnProperty(edges[i].id)) edges[i].stroke = js_column(edge_colors, edge_index[edges[i].id]);
+    }
+    if (node_ids.length > 0) {
+        var node_selection = js_select_nodes(node_index);
+        var labels = node_selection.selectAll("text.label");
+        pynode_animator.animateAll(node_selection.select("circle"), PYNODE_NODE_COLOR, function (d) { return d.color; }, 500);
+        pynode_animator.cancelAll(labels.filter(function (d) { return d.labelStyle.outline !== null; }), PYNODE_NODE_OUTLINE);
+        pynode_animator.animateAll(labels.filter(function (d) { return d.labelStyle.outline === null; }), PYNODE_NODE_OUTLINE, function (d) { return d.color; }, 500);
+    }
+    if (edge_ids.length > 0) {
+        pynode_animator.animateAll(js_select_edges(edge_index).selectAll("path.base"), PYNODE_EDGE_COLOR, function (d) { return d.stroke; }, 500);
+    }
+    js_update(false);
+}
+
+function js_nodes_set_size(node_ids, sizes) {
+    var index = js_index_ids(node_ids);
+    var nodes = greuler_instance.graph.nodes;
+    for (var i = 0; i < nodes.length; i++) {
+        if (index.hasOwnProperty(nodes[i].id)) nodes[i].r = js_column(sizes, index[nodes[i].id]);
+    }
+    pynode_animator.animateAll(js_select_nodes(index).select("circle"), PYNODE_NODE_SIZE, function (d) { return d.r; }, 500);
+    js_update(true);
+}
+
+function js_nodes_set_value(node_ids, values) {
+    var index = js_index_ids(node_ids);
+    var nodes = greuler_instance.graph.nodes;
+    for (var i = 0; i < nodes.length; i++) {
+        if (index.hasOwnProperty(nodes[i].id)) nodes[i].label = js_column(values, index[nodes[i].id]);
+    }
+    js_update(false);
+}
+
+function js_edges_set_width(edge_ids, widths) {
+    var index = js_index_ids(edge_ids);
+    var edges = greuler_instance.graph.edges;
+    for (var i = 0; i < edges.length; i++) {
+        if (index.hasOwnProperty(edges[i].id)) edges[i].lineWidth = js_column(widths, index[edges[i].id]);
+    }
+    pynode_animator.animateAll(js_select_edges(index).selectAll("path.base"), PYNODE_EDGE_WIDTH, function (d) { return d.lineWidth; }, 500);
+    js_update(false);
+}
+
+function js_highlight_many(node_ids, edge_ids, color, size) {
+    var options = {color: color};
+    if (node_ids.length > 0) {
+        if (size !== null) options.size = size;
+        else options.size = function (d) { return d.r * 1.5; };
+        greuler_instance.selector.doTemporalHighlightNode(js_select_nodes(js_index_ids(node_ids)), options);
+    }
+    if (edge_ids.length > 0) {
+        greuler_instance.selector.doTemporalHighlightEdges(js_select_edges(js_index_ids(edge_ids)), {color: color, width: function (d) { return d.lineWidth * 2; }});
+    }
+}
+
+function js_animate(calls) {
+    // A whole animation (see Graph.animate_path etc.) as [time, function name, arguments] calls, which are timed here instead of by the event queue
+    var allowed = [];
+    for (var i = 0; i < calls.length; i++) {
+        if (calls[i][1].indexOf("js_") === 0 && typeof window[calls[i][1]] === "function") allowed.push(calls[i]);
+    }
+    pynode_animator.play(allowed);
+}
+
 function js_return_data(name, response_id, args) {
     var result = window[name].apply(null, args);
     console.log("pynode:response:" + response_id + ":" + JSON.stringify(result));
@@ -277,3 +591,10 @@ function js_run_function_with_return(name, args) {
     var data = JSON.parse(args);
     return JSON.stringify(window[name].apply(null, data));
 }
+
+function js_download_file(filename, data_base64) {
+    var binary = atob(data_base64);
+    var bytes = new Uint8Array(binary.length);
+    for (var i = 0; i < binary.length; i++) bytes[i] = binary.charCodeAt(i);
+    saveAs(new Blob([bytes], {type: "application/octet-stream"}), filename);
+}
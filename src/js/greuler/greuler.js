@@ -1455,6 +1455,8 @@
                     });
                     links.enter().append('g').attr('class', 'edge').attr('opacity', 0).attr('id', function (d) {
                         return _utils2['default'].ns(d.id);
+                    }).on('click', function (d) {
+                        clickEdge(d.id);
                     }).transition('enter').attr('opacity', 1);
 
                     // update
@@ -1475,25 +1477,14 @@
 
                     // path enter
                     var paths = links.selectAll('path').data(function (d) {
-                        // 1. real path
-                        // 2. stroke-dasharray helper
-                        return [d, d];
+                        // traversals are drawn with overlay paths (see animation.js)
+                        return [d];
                     });
                     paths.enter().append('path').attr('stroke', function (d) {
                         return d.stroke;
                     }).attr('fill', 'transparent').attr('stroke-width', function (d) {
                         return d.lineWidth;
-                    }).each(function (d, i) {
-                        var el = d3.select(this);
-                        el.attr('opacity', !i ? 1 : 0);
-                        if (i === 0) {
-                            el.classed('base', true);
-                        }
-                        if (i === 1) {
-                            el.attr('stroke-width', 5);
-                            el.classed('traversal', true);
-                        }
-                    });
+                    }).attr('opacity', 1).classed('base', true);
                     // .attr('d', function () {
                     //  var parent = d3.select(this.parentNode).datum()
                     //  return line([parent.source])
@@ -1543,19 +1534,19 @@
                     // weight enter
                     weights.enter().append('text').attr('font-family', 'Oswald').attr('dominant-baseline', 'alphabetic').attr('text-anchor', 'middle').attr('pointer-events', 'none').attr('paint-order', 'stroke').attr('stroke-linecap', 'round').attr('stroke-linejoin', 'round').attr('vector-effect', 'non-scaling-stroke').call(weightPosition);
                     links.selectAll('text').attr('font-size', function (d) {
-                        return String(d.weightStyle).split(',')[0] + 'px'
+                        return d.weightStyle.size + 'px'
                     });
                     links.selectAll('text').attr('fill', function (d) {
-                        return String(d.weightStyle).split(',')[1]
+                        return d.weightStyle.color
                     });
                     links.selectAll('text').attr('stroke', function (d) {
-                        return String(d.weightStyle).split(',')[2]
+                        return (d.weightStyle.outline !== null ? d.weightStyle.outline : d.stroke)
                     });
                     links.selectAll('text').attr('stroke-width', function (d) {
-                        return String(Math.min(Math.floor((parseFloat(String(d.weightStyle).split(',')[0]) / 14.0) * 6.0), 6.0)) + 'px'
+                        return String(Math.min(Math.floor((d.weightStyle.size / 14.0) * 6.0), 6.0)) + 'px'
                     });
                     links.selectAll('text').html(function (d) {
-                        return newLineParser(String(d.weight), parseFloat(String(d.weightStyle).split(',')[0]))
+                        return newLineParser(String(d.weight), d.weightStyle.size)
                     });
 
                     // weight update
@@ -1619,18 +1610,6 @@
                         return _utils2['default'].ns(d.id);
                     }).attr('transform', function (d) {
                         return _utils2['default'].transform({translate: d});
-                    }).on('mouseover', function () {
-                        var el = d3.select(this);
-                        if (!el.over) {
-                            el.style('cursor', 'pointer');
-                        }
-                        el.over = true;
-                    }).on('mouseout', function () {
-                        var el = d3.select(this);
-                        if (!owner.nodeDragging) {
-                            el.over = false;
-                            el.style('cursor', null);
-                        }
                     }).attr('opacity', 0);
                     g.transition('enter').attr('opacity', 1);
                     g.on('mousedown', mouse_down).call(layout.drag);
@@ -1681,24 +1660,24 @@
 
                     // inner label
                     g.append('text').classed('label', true).attr('font-family', 'Oswald').attr('text-anchor', 'middle').attr('paint-order', 'stroke').attr('stroke-linecap', 'round').attr('stroke-linejoin', 'round').attr('vector-effect', 'non-scaling-stroke').attr('stroke', function (d) {
-                        return String(d.labelStyle).split(',')[2]
+                        return (d.labelStyle.outline !== null ? d.labelStyle.outline : d.color)
                     });
                     nodes.selectAll('text.label').attr('font-size', function (d) {
-                        return String(d.labelStyle).split(',')[0] + 'px'
+                        return d.labelStyle.size + 'px'
                     });
                     nodes.selectAll('text.label').attr('fill', function (d) {
-                        return String(d.labelStyle).split(',')[1]
+                        return d.labelStyle.color
                     });
                     nodes.selectAll('text.label').each(function (d) {
-                        if (String(d.labelStyle).split(',')[3] === 'True') {
-                            d3.select(this).attr('stroke', String(d.labelStyle).split(',')[2]);
+                        if (d.labelStyle.outline !== null) {
+                            d3.select(this).attr('stroke', d.labelStyle.outline);
                         }
                     });
                     nodes.selectAll('text.label').attr('stroke-width', function (d) {
-                        return String(Math.min(Math.floor((parseFloat(String(d.labelStyle).split(',')[0]) / 14.0) * 6.0), 6.0)) + 'px'
+                        return String(Math.min(Math.floor((d.labelStyle.size / 14.0) * 6.0), 6.0)) + 'px'
                     });
                     nodes.selectAll('text.label').html(function (d) {
-                        return newLineParser(String(d.label), parseFloat(String(d.labelStyle).split(',')[0]), true)
+                        return newLineParser(String(d.label), d.labelStyle.size, true)
                     });
 
                     // top-right label
@@ -1706,22 +1685,22 @@
                         return getLabelPosition(d, 0)
                     });
                     nodes.selectAll('text.outer-top-right').attr('font-size', function (d) {
-                        return String(d.topRightLabelStyle).split(',')[0] + 'px'
+                        return d.topRightLabelStyle.size + 'px'
                     });
                     nodes.selectAll('text.outer-top-right').attr('fill', function (d) {
-                        return String(d.topRightLabelStyle).split(',')[1]
+                        return d.topRightLabelStyle.color
                     });
                     nodes.selectAll('text.outer-top-right').attr('stroke', function (d) {
-                        return String(d.topRightLabelStyle).split(',')[2]
+                        return (d.topRightLabelStyle.outline !== null ? d.topRightLabelStyle.outline : d.color)
                     });
                     nodes.selectAll('text.outer-top-right').attr('stroke-width', function (d) {
-                        return String(Math.min(Math.floor((parseFloat(String(d.topRightLabelStyle).split(',')[0]) / 15.0) * 6.0), 6.0)) + 'px'
+                        return String(Math.min(Math.floor((d.topRightLabelStyle.size / 15.0) * 6.0), 6.0)) + 'px'
                     });
                     nodes.selectAll('text.outer-top-right').transition(500).attr('transform', function (d) {
                         return getLabelPosition(d, 0)
                     });
                     nodes.selectAll('text.outer-top-right').html(function (d) {
-                        return newLineParser(String(d.topRightLabel), parseFloat(String(d.topRightLabelStyle).split(',')[0]), false)
+                        return newLineParser(String(d.topRightLabel), d.topRightLabelStyle.size, false)
                     });
 
                     // top-left label
@@ -1729,22 +1708,22 @@
                         return getLabelPosition(d, 1)
                     });
                     nodes.selectAll('text.outer-top-left').attr('font-size', function (d) {
-                        return String(d.topLeftLabelStyle).split(',')[0] + 'px'
+                        return d.topLeftLabelStyle.size + 'px'
                     });
                     nodes.selectAll('text.outer-top-left').attr('fill', function (d) {
-                        return String(d.topLeftLabelStyle).split(',')[1]
+                        return d.topLeftLabelStyle.color
                     });
                     nodes.selectAll('text.outer-top-left').attr('stroke', function (d) {
-                        return String(d.topLeftLabelStyle).split(',')[2]
+                        return (d.topLeftLabelStyle.outline !== null ? d.topLeftLabelStyle.outline : d.color)
                     });
                     nodes.selectAll('text.outer-top-left').attr('stroke-width', function (d) {
-                        return String(Math.min(Math.floor((parseFloat(String(d.topLeftLabelStyle).split(',')[0]) / 15.0) * 6.0), 6.0)) + 'px'
+                        return String(Math.min(Math.floor((d.topLeftLabelStyle.size / 15.0) * 6.0), 6.0)) + 'px'
                     });
                     nodes.selectAll('text.outer-top-left').transition(500).attr('transform', function (d) {
                         return getLabelPosition(d, 1)
                     });
                     nodes.selectAll('text.outer-top-left').html(function (d) {
-                        return newLineParser(String(d.topLeftLabel), parseFloat(String(d.topLeftLabelStyle).split(',')[0]), false)
+                        return newLineParser(String(d.topLeftLabel), d.topLeftLabelStyle.size, false)
                     });
 
                     // update
@@ -2375,21 +2354,15 @@
                 }, {
                     key: 'doTemporalHighlightNode',
                     value: function doTemporalHighlightNode(selection, options) {
+                        var half = this.getAnimationTime() / 2;
                         if ('size' in options) {
-                            this.innerNodeSelector(selection).transition('highlight_node_size').duration(this.getAnimationTime() / 2).attr('r', options.size).transition('highlight_node_size').duration(this.getAnimationTime() / 2).attr('r', function (d) {
-                                return d.r
-                            });
+                            pynode_animator.animateAll(this.innerNodeSelector(selection), PYNODE_NODE_SIZE, options.size, half, half);
                         }
                         if ('color' in options) {
-                            this.innerNodeSelector(selection).transition('highlight_node_color').duration(this.getAnimationTime() / 2).attr('fill', options.color).transition('highlight_node_color').duration(this.getAnimationTime() / 2).attr('fill', function (d) {
-                                return d.color
-                            });
-
-                            selection.selectAll('text.label').transition('highlight_node_outline').duration(this.getAnimationTime() / 2).attr('stroke', function (d) {
-                                return String(d.labelStyle).split(',')[3] === 'False' ? options.color : String(d.labelStyle).split(',')[2]
-                            }).transition('highlight_node_outline').duration(this.getAnimationTime() / 2).attr('stroke', function (d) {
-                                return String(d.labelStyle).split(',')[3] === 'False' ? d.color : String(d.labelStyle).split(',')[2]
-                            });
+                            pynode_animator.animateAll(this.innerNodeSelector(selection), PYNODE_NODE_COLOR, options.color, half, half);
+                            pynode_animator.animateAll(selection.selectAll('text.label'), PYNODE_NODE_OUTLINE, function (d) {
+                                return d.labelStyle.outline === null ? options.color : d.labelStyle.outline
+                            }, half, half);
                         }
                         return true;
                     }
@@ -2409,56 +2382,37 @@
                 }, {
                     key: 'doTemporalHighlightEdges',
                     value: function doTemporalHighlightEdges(selection, options) {
+                        var half = this.getAnimationTime() / 2;
                         if ('width' in options) {
-                            this.innerEdgeSelector(selection).transition('highlight_edge_width').duration(this.getAnimationTime() / 2).attr('stroke-width', options.width).transition('highlight_edge_width').duration(this.getAnimationTime() / 2).attr('stroke-width', function (d) {
-                                return d.lineWidth
-                            });
+                            pynode_animator.animateAll(this.innerEdgeSelector(selection), PYNODE_EDGE_WIDTH, options.width, half, half);
                         }
                         if ('color' in options) {
-                            this.innerEdgeSelector(selection).transition('highlight_edge_color').duration(this.getAnimationTime() / 2).attr('stroke', options.color).transition('highlight_edge_color').duration(this.getAnimationTime() / 2).attr('stroke', function (d) {
-                                return d.stroke
-                            });
+                            pynode_animator.animateAll(this.innerEdgeSelector(selection), PYNODE_EDGE_COLOR, options.color, half, half);
                         }
                         return true;
                     }
 
                     /**
-                     * Edge traversal animation, it animates a hidden path giving the impression
+                     * Edge traversal animation, it animates an overlay path (see animation.js) giving the impression
                      * of movement, if source is given then it will always start the animation
                      * from the node `source` even if the edge is an incoming edge
                      *
                      * @param {d3_selection} selection
                      * @param {config} options
                      * @param {number} [source=-1]
-                     * @returns {d3_transition}
+                     * @returns {d3_selection}
                      */
                 }, {
                     key: 'traverseEdgeWithDirection',
                     value: function traverseEdgeWithDirection(selection, options) {
                         var source = arguments.length <= 2 || arguments[2] === undefined ? -1 : arguments[2];
 
-                        return selection.selectAll('path.traversal').each(function () {
-                            var el = d3.select(this);
-                            var l = this.getTotalLength();
-                            el.attr('stroke', options.stroke).attr('stroke-dasharray', l + ' ' + l).attr('stroke-dashoffset', l).attr('opacity', 1);
-                        }).transition('dasharray').duration(options.duration).attr('stroke-dashoffset', function (d) {
-                            var length = this.getTotalLength();
-                            var twiceLength = length * 2;
-                            var lengthToMove = 0;
-                            if (source !== -1) {
-                                if (d.target.id === source) {
-                                    lengthToMove = twiceLength;
-                                }
-                            }
-
+                        return selection.selectAll('path.base').each(function (d) {
+                            var fromTarget = source !== -1 && d.target.id === source;
                             if (options.reverse) {
-                                lengthToMove = twiceLength - lengthToMove;
+                                fromTarget = !fromTarget;
                             }
-
-                            return lengthToMove;
-                        }).attr('opacity', 0).each('end', function () {
-                            var el = d3.select(this);
-                            el.attr('stroke-dasharray', null).attr('stroke-dashoffset', null).attr('opacity', 0);
+                            pynode_animator.traverse(this, options.stroke, options.duration, fromTarget);
                         });
                     }
                 }, {
@@ -2469,9 +2423,9 @@
                             reverse: false
                         }, this.getStyleOptions(), options);
 
-                        selection.call(this.traverseEdgeWithDirection, options, source);
+                        this.traverseEdgeWithDirection(selection, options, source);
                         if (options.keepStroke) {
-                            this.innerEdgeSelector(selection).transition('update').duration(options.duration).attr('stroke', options.stroke);
+                            pynode_animator.animateAll(this.innerEdgeSelector(selection), PYNODE_EDGE_COLOR, options.stroke, options.duration);
                         }
                         return this.innerEdgeSelector(selection);
                     }
@@ -20,9 +20,9 @@ var tlBoundary = {
     label: "",
     topRightLabel: "",
     topLeftLabel: "",
-    labelStyle: "0,transparent,transparent,True",
-    topRightLabelStyle: "0,transparent,transparent,True",
-    topLeftLabelStyle: "0,transparent,transparent,True",
+    labelStyle: {size: 0, color: "transparent", outline: "transparent"},
+    topRightLabelStyle: {size: 0, color: "transparent", outline: "transparent"},
+    topLeftLabelStyle: {size: 0, color: "transparent", outline: "transparent"},
     r: 0
 };
 var brBoundary = {
@@ -34,9 +34,9 @@ var brBoundary = {
     label: "",
     topRightLabel: "",
     topLeftLabel: "",
-    labelStyle: "0,transparent,transparent,True",
-    topRightLabelStyle: "0,transparent,transparent,True",
-    topLeftLabelStyle: "0,transparent,transparent,True",
+    labelStyle: {size: 0, color: "transparent", outline: "transparent"},
+    topRightLabelStyle: {size: 0, color: "transparent", outline: "transparent"},
+    topLeftLabelStyle: {size: 0, color: "transparent", outline: "transparent"},
     r: 0
 };
 var doConstraints = true;
@@ -186,9 +186,17 @@ function refreshLayout() {
     }
 }
 
+var dragStartPosition = null;
 function dragNode(dragging, nodeId) {
-    if (!dragging && draggingNode) {
+    var node = greuler_instance.graph.getNode({id: nodeId});
+    if (dragging) {
+        dragStartPosition = node !== undefined ? [node.x, node.y] : null;
+    }
+    else if (draggingNode) {
         clickNode(nodeId);
+        if (node !== undefined && dragStartPosition !== null && (node.x !== dragStartPosition[0] || node.y !== dragStartPosition[1])) {
+            dragEndNode(nodeId);
+        }
     }
     draggingNode = dragging;
 }
@@ -0,0 +1,75 @@
+// Connection to the local CPython server (pynode_server.py). When the page is served by it, programs run on the server
+// and their events are streamed back here, see pynode_core.server_message
+js_server_socket = null;
+js_server_listener = null;
+js_server_positions_timer = null;
+js_server_positions_pending = null;
+
+function registerServerListener(func) {
+    js_server_listener = func;
+}
+
+function js_server_connect() {
+    // The server adds pynode_server_token to the pages it serves
+    if (typeof pynode_server_token === "undefined" || ["localhost", "127.0.0.1", "[::1]"].indexOf(window.location.hostname) === -1) return;
+    var request = new XMLHttpRequest();
+    request.open("GET", "pynode/status");
+    request.onreadystatechange = function () {
+        if (request.readyState !== 4 || request.status !== 200) return;
+        var socket = new WebSocket((window.location.protocol === "https:" ? "wss://" : "ws://") + window.location.host + "/pynode/ws?token=" + encodeURIComponent(pynode_server_token));
+        socket.onopen = function () {
+            js_server_socket = socket;
+            console.log("pynode: connected to the local server");
+        };
+        socket.onmessage = function (event) {
+            if (js_server_listener !== null) js_server_listener(event.data);
+        };
+        socket.onclose = function () {
+            if (js_server_socket === socket) {
+                js_server_socket = null;
+                // Lets a run in progress finish playing what it already has
+                if (js_server_listener !== null) js_server_listener(JSON.stringify({type: "done"}));
+            }
+        };
+    };
+    request.send();
+}
+
+function js_server_connected() {
+    return js_server_socket !== null && js_server_socket.readyState === WebSocket.OPEN;
+}
+
+function js_server_send(message) {
+    if (js_server_connected()) js_server_socket.send(JSON.stringify(message));
+}
+
+function js_server_run(src, credit) {
+    js_server_send({type: "run", src: src, credit: credit});
+}
+
+function js_server_stop() {
+    js_server_send({type: "stop"});
+}
+
+function js_server_credit(count) {
+    js_server_send({type: "credit", count: count});
+}
+
+function js_server_element_event(event_type, element_id) {
+    js_server_send({type: "element_event", event: event_type, id: element_id});
+}
+
+// Position snapshots are sent at most every 200ms
+function js_server_positions(positions, count, width, height) {
+    if (!js_server_connected()) return;
+    js_server_positions_pending = {type: "positions", positions: Array.prototype.slice.call(positions, 0, count), count: count, width: width, height: height};
+    if (js_server_positions_timer !== null) return;
+    js_server_positions_timer = setTimeout(function () {
+        js_server_positions_timer = null;
+        var message = js_server_positions_pending;
+        js_server_positions_pending = null;
+        if (message !== null) js_server_send(message);
+    }, 200);
+}
+
+window.addEventListener("load", js_server_connect);
@@ -0,0 +1,64 @@
+// A uniform grid over the rendered nodes, the same kind of index pynode_spatial.py keeps for graph.nodes_near etc. It's rebuilt with each
+// position snapshot, and finds the node under the pointer by looking at the cells around it instead of needing handlers on every node
+function PynodeSpatialGrid() {
+    this.cells = new Map();
+    this.size = 1;
+}
+
+PynodeSpatialGrid.prototype.key = function (i, j) {
+    return i + "," + j;
+};
+
+PynodeSpatialGrid.prototype.build = function (nodes, skip) {
+    var cells = new Map();
+    var count = 0, maxR = 0;
+    var minX = Infinity, minY = Infinity, maxX = -Infinity, maxY = -Infinity;
+    for (var n = 0; n < nodes.length; n++) {
+        var node = nodes[n];
+        if (skip(node) || node.x !== node.x || node.y !== node.y) continue;
+        count++;
+        if (node.r > maxR) maxR = node.r;
+        if (node.x < minX) minX = node.x;
+        if (node.x > maxX) maxX = node.x;
+        if (node.y < minY) minY = node.y;
+        if (node.y > maxY) maxY = node.y;
+    }
+    // Cells are at least as wide as the biggest node, so a node that covers a point is always in that point's cell or one next to it
+    var size = count > 0 ? 2 * Math.sqrt(Math.max(maxX - minX, 1) * Math.max(maxY - minY, 1) / count) : 1;
+    size = Math.max(size, 2 * maxR, 1);
+    for (var n = 0; n < nodes.length; n++) {
+        var node = nodes[n];
+        if (skip(node) || node.x !== node.x || node.y !== node.y) continue;
+        var key = this.key(Math.floor(node.x / size), Math.floor(node.y / size));
+        var bucket = cells.get(key);
+        if (bucket === undefined) cells.set(key, [[n, node]]);
+        else bucket.push([n, node]);
+    }
+    this.cells = cells;
+    this.size = size;
+};
+
+PynodeSpatialGrid.prototype.hit = function (x, y) {
+    // The node whose circle contains (x, y), or null. Where nodes overlap, the one drawn last (on top) is chosen
+    var i = Math.floor(x / this.size), j = Math.floor(y / this.size);
+    var best = null, bestIndex = -1;
+    for (var di = -1; di <= 1; di++) {
+        for (var dj = -1; dj <= 1; dj++) {
+            var bucket = this.cells.get(this.key(i + di, j + dj));
+            if (bucket === undefined) continue;
+            for (var b = 0; b < bucket.length; b++) {
+                var node = bucket[b][1];
+                var dx = node.x - x, dy = node.y - y;
+                if (dx * dx + dy * dy <= node.r * node.r && bucket[b][0] > bestIndex) {
+                    best = node;
+                    bestIndex = bucket[b][0];
+                }
+            }
+        }
+    }
+    return best;
+};
+
+PynodeSpatialGrid.prototype.clear = function () {
+    this.cells = new Map();
+};
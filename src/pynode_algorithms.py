@@ -0,0 +1,803 @@
+﻿# Graph algorithms that run over a Graph (or a GraphView), see the Graph methods that call them
+import os
+import sys
+import math
+import heapq
+import bisect
+import random
+import operator
+from array import array
+from collections import deque, OrderedDict
+import pynode_graphlib
+from pynode_columns import numpy
+from pynode_graphlib import Node, Edge, Color
+from typing import List, Dict, Any, Optional, Callable, Tuple, Union
+
+def _node(graph: Any, node: Union[Node, Any]) -> Node:
+    n = graph.node(node)
+    if n is None: raise Exception(f"'{node}' isn't in the graph")
+    return n
+
+def _criterion(criterion: Union[str, Callable[[Edge], Any]]) -> Callable[[Edge], Any]:
+    # A criterion is an edge attribute's name, 'weight' (the edge's weight) or a function of the edge
+    if callable(criterion): return criterion
+    if criterion == "weight": return lambda e: e._weight
+    return lambda e: e.attribute(criterion)
+
+class ParetoPath:
+    # One path on a Pareto front: none of the other paths found is at least as good on every criterion
+    def __init__(self, nodes: List[Node], edges: List[Edge], costs: Tuple[Any, ...], criteria: List[Any]):
+        self._nodes = nodes
+        self._edges = edges
+        self._costs = costs
+        self._criteria = criteria
+
+    def nodes(self) -> List[Node]:
+        return list(self._nodes)
+
+    def edges(self) -> List[Edge]:
+        return list(self._edges)
+
+    def costs(self) -> Tuple[Any, ...]:
+        return self._costs
+
+    def cost(self, criterion: Any) -> Any:
+        if criterion not in self._criteria: raise Exception(f"'{criterion}' isn't one of the path's criteria")
+        return self._costs[self._criteria.index(criterion)]
+
+    def traverse(self, color: Color = Color.RED, keep_path: bool = True, step: int = 500):
+        # Traverses each edge in turn from the start of the path, pausing for step milliseconds after each one
+        for node, edge in zip(self._nodes, self._edges):
+            edge.traverse(node, color, keep_path)
+            pynode_graphlib.pause(step)
+
+    def __len__(self) -> int:
+        return len(self._edges)
+
+    def __repr__(self) -> str:
+        costs = ", ".join(f"{c if isinstance(c, str) else getattr(c, '__name__', c)}={v}" for c, v in zip(self._criteria, self._costs))
+        return f"ParetoPath({' -> '.join(str(n) for n in self._nodes)}, {costs})"
+
+def pareto_paths(graph: Any, source: Union[Node, Any], target: Union[Node, Any], criteria: List[Any], epsilon: float = 0.0, max_paths: Optional[int] = None) -> List[ParetoPath]:
+    # Multi-criteria label setting (Martins' algorithm). Labels are (costs, node, previous label, edge) and are taken from the heap in
+    # lexicographic order of their costs, so a label can only be dominated by the labels already settled at its own node (or the target).
+    # With epsilon > 0 a label is also dropped when a settled one is within a factor of (1 + epsilon) of it on every criterion.
+    source, target = _node(graph, source), _node(graph, target)
+    criteria = list(criteria)
+    if len(criteria) == 0: raise Exception("At least one criterion is needed")
+    if epsilon < 0: raise Exception("epsilon can't be negative")
+    getters = [_criterion(c) for c in criteria]
+    # Edge costs are read once, into the successors of each node
+    successors: Dict[Node, List[Tuple[Node, Edge, Tuple[Any, ...]]]] = {}
+    for e in graph.edges():
+        costs = tuple(get(e) for get in getters)
+        for c, value in zip(criteria, costs):
+            if value is None: raise Exception(f"Edge {e} has no value for '{c}'")
+            if value < 0: raise Exception(f"Edge {e} has a negative value for '{c}'")
+        successors.setdefault(e._source, []).append((e._target, e, costs))
+        if not e._directed: successors.setdefault(e._target, []).append((e._source, e, costs))
+
+    factor = 1.0 + epsilon
+    count = len(criteria)
+    # The labels settled at each node. Each is lexicographically at least as large as the ones before it, so with two criteria a label is
+    # dominated exactly when its second cost isn't below the smallest settled one, and that minimum is all that needs to be kept. With
+    # more criteria the settled labels are kept sorted by their second cost, and only those that aren't above the label's are compared.
+    settled: Dict[Node, Tuple[List[Any], List[Tuple[Any, ...]]]] = {}
+    lowest: Dict[Node, Any] = {}
+
+    def dominated(node: Node, costs: Tuple[Any, ...]) -> bool:
+        if count == 1: return node in lowest
+        if count == 2:
+            low = lowest.get(node)
+            return low is not None and low <= costs[1] * factor
+        entry = settled.get(node)
+        if entry is None: return False
+        limits = [c * factor for c in costs[2:]]
+        seconds, labels = entry
+        for i in range(bisect.bisect_right(seconds, costs[1] * factor)):
+            if all(map(operator.le, labels[i][2:], limits)): return True
+        return False
+
+    start = tuple(0 for c in criteria)
+    heap = [(start, 0, (start, source, None, None))]
+    counter = 0
+    found = []
+    add = operator.add
+    while len(heap) > 0:
+        costs, _, label = heapq.heappop(heap)
+        node = label[1]
+        if dominated(node, costs) or (node is not target and dominated(target, costs)): continue
+        if count > 2:
+            seconds, labels = settled.setdefault(node, ([], []))
+            i = bisect.bisect_right(seconds, costs[1])
+            seconds.insert(i, costs[1])
+            labels.insert(i, costs)
+        if count > 1: lowest[node] = min(lowest[node], costs[1]) if node in lowest else costs[1]
+        else: lowest[node] = costs[0]
+        if node is target:
+            found.append(label)
+            if max_paths is not None and len(found) >= max_paths: break
+            continue
+        for next_node, edge, edge_costs in successors.get(node, ()):
+            next_costs = tuple(map(add, costs, edge_costs))
+            if dominated(next_node, next_costs) or dominated(target, next_costs): continue
+            counter += 1
+            heapq.heappush(heap, (next_costs, counter, (next_costs, next_node, label, edge)))
+
+    paths = []
+    for label in found:
+        nodes, edges = [], []
+        costs = label[0]
+        while label is not None:
+            nodes.append(label[1])
+            if label[3] is not None: edges.append(label[3])
+            label = label[2]
+        nodes.reverse()
+        edges.reverse()
+        paths.append(ParetoPath(nodes, edges, costs, criteria))
+    return paths
+
+def _shortest_paths(offsets: Any, targets: Any, weights: Any, source: int, count: int, weighted: bool) -> Tuple[array, array]:
+    # Distances from one source over the compressed adjacency, and the position (in targets) of the edge that reached each node
+    inf = math.inf
+    dist = array("d", [inf]) * count
+    via = array("q", [-1]) * count
+    dist[source] = 0.0
+    if not weighted:
+        queue = deque([source])
+        while len(queue) > 0:
+            u = queue.popleft()
+            d = dist[u] + 1.0
+            for k in range(offsets[u], offsets[u + 1]):
+                v = targets[k]
+                if dist[v] == inf:
+                    dist[v] = d
+                    via[v] = k
+                    queue.append(v)
+        return dist, via
+    heap = [(0.0, source)]
+    pop, push = heapq.heappop, heapq.heappush
+    while len(heap) > 0:
+        d, u = pop(heap)
+        if d > dist[u]: continue
+        for k in range(offsets[u], offsets[u + 1]):
+            v = targets[k]
+            nd = d + weights[k]
+            if nd < dist[v]:
+                dist[v] = nd
+                via[v] = k
+                push(heap, (nd, v))
+    return dist, via
+
+def _all_pairs_rows(names: List[str], count: int, weighted: bool, start: int, stop: int):
+    # Runs in a worker process: the adjacency and the distance matrix are shared memory blocks created by DistanceOracle.all_pairs
+    from multiprocessing import shared_memory
+    blocks = [shared_memory.SharedMemory(name=name) for name in names]
+    try:
+        offsets, targets = blocks[0].buf.cast("q"), blocks[1].buf.cast("q")
+        weights, matrix = blocks[2].buf.cast("d"), blocks[3].buf.cast("d")
+        for source in range(start, stop):
+            matrix[source * count:(source + 1) * count] = _shortest_paths(offsets, targets, weights, source, count, weighted)[0]
+        for view in (offsets, targets, weights, matrix): view.release()
+    finally:
+        for block in blocks: block.close()
+
+class DistanceOracle:
+    # Shortest path distances over a graph. The tree from a source is computed the first time that source is asked about, and the trees of
+    # the max_sources most recently used sources are kept until the graph's version changes (all_pairs computes every distance up front)
+    def __init__(self, graph: Any, weighted: bool = True, max_sources: int = 64):
+        self._graph = graph
+        self.weighted = weighted
+        self.max_sources = max_sources
+        self._version: Optional[int] = None
+        self._trees: 'OrderedDict[int, Tuple[array, array]]' = OrderedDict()
+        self._matrix: Optional[array] = None
+        self.hits = 0
+        self.misses = 0
+
+    def _update(self):
+        if self._version == self._graph._version: return
+        # The graph is copied into compressed sparse rows: the edges leaving node i are at offsets[i] to offsets[i + 1] in targets and weights
+        nodes = self._graph.nodes()
+        index = {n._internal_id: i for i, n in enumerate(nodes)}
+        outgoing: List[List[Tuple[int, Any, Edge]]] = [[] for n in nodes]
+        integral = True
+        for e in self._graph.edges():
+            w = e._weight if self.weighted and e._weight is not None else 1
+            if not isinstance(w, (int, float)) or isinstance(w, bool): raise Exception(f"Edge {e} has a weight that isn't a number")
+            if w < 0: raise Exception(f"Edge {e} has a negative weight")
+            if type(w) is not int: integral = False
+            s, t = index[e._source._internal_id], index[e._target._internal_id]
+            outgoing[s].append((t, w, e))
+            if not e._directed: outgoing[t].append((s, w, e))
+        self._nodes = nodes
+        self._index = index
+        self._offsets = array("q", [0])
+        self._targets = array("q")
+        self._weights = array("d")
+        self._edges: List[Edge] = []
+        for edges in outgoing:
+            for t, w, e in edges:
+                self._targets.append(t)
+                self._weights.append(w)
+                self._edges.append(e)
+            self._offsets.append(len(self._targets))
+        self._integral = integral
+        self._trees.clear()
+        self._matrix = None
+        self._version = self._graph._version
+
+    def _position(self, node: Union[Node, Any]) -> int:
+        n = _node(self._graph, node)
+        return self._index[n._internal_id]
+
+    def _tree(self, source: int) -> Tuple[array, array]:
+        tree = self._trees.get(source)
+        if tree is not None:
+            self.hits += 1
+            self._trees.move_to_end(source)
+            return tree
+        self.misses += 1
+        tree = self._trees[source] = _shortest_paths(self._offsets, self._targets, self._weights, source, len(self._nodes), self.weighted)
+        while len(self._trees) > max(1, self.max_sources): self._trees.popitem(last=False)
+        return tree
+
+    def _value(self, d: float) -> Any:
+        if d == math.inf: return None
+        return int(d) if self._integral else d
+
+    def distance(self, source: Union[Node, Any], target: Union[Node, Any]) -> Any:
+        self._update()
+        s, t = self._position(source), self._position(target)
+        if self._matrix is not None:
+            self.hits += 1
+            return self._value(self._matrix[s * len(self._nodes) + t])
+        return self._value(self._tree(s)[0][t])
+
+    def distances(self, source: Union[Node, Any]) -> Dict[Node, Any]:
+        # The distance to every node that can be reached from source
+        self._update()
+        dist = self._tree(self._position(source))[0]
+        return {n: self._value(d) for n, d in zip(self._nodes, dist) if d != math.inf}
+
+    def path(self, source: Union[Node, Any], target: Union[Node, Any]) -> Optional[List[Edge]]:
+        # The edges of a shortest path from source to target, or None if there isn't one
+        self._update()
+        s, t = self._position(source), self._position(target)
+        dist, via = self._tree(s)
+        if dist[t] == math.inf: return None
+        edges = []
+        node = self._nodes[t]
+        while via[t] != -1:
+            edge = self._edges[via[t]]
+            edges.append(edge)
+            node = edge.other_node(node)
+            t = self._index[node._internal_id]
+        edges.reverse()
+        return edges
+
+    def all_pairs(self, processes: Optional[int] = None) -> 'DistanceOracle':
+        # Computes the distance between every pair of nodes (count * count values), after which distance() is a lookup. Under Python,
+        # the sources are split between worker processes that share the adjacency and the result through shared memory
+        self._update()
+        count = len(self._nodes)
+        if processes is None: processes = os.cpu_count() or 1
+        if sys.implementation.name == "brython" or processes <= 1 or count < 1000:
+            matrix = array("d")
+            for source in range(count): matrix.extend(_shortest_paths(self._offsets, self._targets, self._weights, source, count, self.weighted)[0])
+            self._matrix = matrix
+            return self
+        from multiprocessing import shared_memory
+        from concurrent.futures import ProcessPoolExecutor
+        sources = [self._offsets, self._targets, self._weights]
+        blocks = []
+        try:
+            for data in sources:
+                block = shared_memory.SharedMemory(create=True, size=max(1, len(data) * data.itemsize))
+                block.buf[:len(data) * data.itemsize] = data.tobytes()
+                blocks.append(block)
+            blocks.append(shared_memory.SharedMemory(create=True, size=max(1, count * count * 8)))
+            names = [block.name for block in blocks]
+            chunk = -(-count // (processes * 4))
+            with ProcessPoolExecutor(processes) as executor:
+                futures = [executor.submit(_all_pairs_rows, names, count, self.weighted, start, min(count, start + chunk)) for start in range(0, count, chunk)]
+                for future in futures: future.result()
+            self._matrix = array("d", bytes(blocks[3].buf[:count * count * 8]))
+        finally:
+            for block in blocks:
+                block.close()
+                block.unlink()
+        return self
+
+    def __repr__(self) -> str:
+        return f"DistanceOracle(weighted={self.weighted}, sources={len(self._trees)}, hits={self.hits}, misses={self.misses})"
+
+def _build_csr(graph: Any, undirected: bool) -> Tuple[List[Node], array, array, array, List[Edge]]:
+    # Compressed sparse rows without the lists of a list per node: the edges leaving node i are at offsets[i] to offsets[i + 1] in targets, and
+    # edge_ids holds each one's index in edges. Undirected edges (and with undirected=True, every edge) are in the rows of both ends
+    nodes = graph.nodes()
+    edges = graph.edges()
+    index = {n._internal_id: i for i, n in enumerate(nodes)}
+    count = len(nodes)
+    sources, targets_of = array("q"), array("q")
+    offsets = array("q", bytes(8 * (count + 1)))
+    for e in edges:
+        s, t = index[e._source._internal_id], index[e._target._internal_id]
+        sources.append(s)
+        targets_of.append(t)
+        offsets[s + 1] += 1
+        if undirected or not e._directed: offsets[t + 1] += 1
+    for i in range(count): offsets[i + 1] += offsets[i]
+    next_slot = array("q", offsets[:count])
+    targets = array("q", bytes(8 * offsets[count]))
+    edge_ids = array("q", bytes(8 * offsets[count]))
+    for k, e in enumerate(edges):
+        s, t = sources[k], targets_of[k]
+        targets[next_slot[s]] = t
+        edge_ids[next_slot[s]] = k
+        next_slot[s] += 1
+        if undirected or not e._directed:
+            targets[next_slot[t]] = s
+            edge_ids[next_slot[t]] = k
+            next_slot[t] += 1
+    return nodes, offsets, targets, edge_ids, edges
+
+def _csr(graph: Any, undirected: bool = False) -> Tuple[List[Node], array, array, array, List[Edge]]:
+    # A Graph keeps its rows until it changes (see Graph.cached), a GraphView's are built for each call
+    if isinstance(graph, pynode_graphlib.Graph): return graph.cached(("_csr", undirected), lambda: _build_csr(graph, undirected))
+    return _build_csr(graph, undirected)
+
+def _positions(graph: Any, nodes: List[Node], sources: Any) -> List[int]:
+    index = {n._internal_id: i for i, n in enumerate(nodes)}
+    if isinstance(sources, (list, tuple, set)): return [index[_node(graph, s)._internal_id] for s in sources]
+    return [index[_node(graph, sources)._internal_id]]
+
+def bfs_layers(graph: Any, sources: Any, visit: Optional[Callable[[Node, Optional[Edge]], Any]] = None) -> List[List[Node]]:
+    # The nodes reachable from the source (or sources), grouped by their number of steps away. visit(node, edge) is called as each node is
+    # reached, with the edge it was reached by (None for the sources)
+    nodes, offsets, targets, edge_ids, edges = _csr(graph)
+    seen = bytearray(len(nodes))
+    layer = []
+    for s in _positions(graph, nodes, sources):
+        if seen[s]: continue
+        seen[s] = 1
+        layer.append(s)
+        if visit is not None: visit(nodes[s], None)
+    layers = []
+    while len(layer) > 0:
+        layers.append([nodes[i] for i in layer])
+        following = []
+        for u in layer:
+            for k in range(offsets[u], offsets[u + 1]):
+                v = targets[k]
+                if seen[v]: continue
+                seen[v] = 1
+                following.append(v)
+                if visit is not None: visit(nodes[v], edges[edge_ids[k]])
+        layer = following
+    return layers
+
+def dfs(graph: Any, source: Any = None, visit: Optional[Callable[[Node, Optional[Edge]], Any]] = None) -> Tuple[List[Node], List[Node]]:
+    # Depth first search with an explicit stack, from the source or (without one) from every node that hasn't been reached yet, in order.
+    # Returns the nodes in preorder (as they're reached) and postorder (once everything reachable from them is done). visit is as for bfs_layers
+    nodes, offsets, targets, edge_ids, edges = _csr(graph)
+    seen = bytearray(len(nodes))
+    preorder, postorder = [], []
+    for root in (_positions(graph, nodes, source) if source is not None else range(len(nodes))):
+        if seen[root]: continue
+        seen[root] = 1
+        preorder.append(root)
+        if visit is not None: visit(nodes[root], None)
+        # Each node on the stack is kept with the position in its row to carry on from
+        stack, resume = [root], [offsets[root]]
+        while len(stack) > 0:
+            u = stack[-1]
+            k, end = resume[-1], offsets[u + 1]
+            while k < end and seen[targets[k]]: k += 1
+            if k < end:
+                v = targets[k]
+                resume[-1] = k + 1
+                seen[v] = 1
+                preorder.append(v)
+                if visit is not None: visit(nodes[v], edges[edge_ids[k]])
+                stack.append(v)
+                resume.append(offsets[v])
+            else:
+                stack.pop()
+                resume.pop()
+                postorder.append(u)
+    return [nodes[i] for i in preorder], [nodes[i] for i in postorder]
+
+def topological_sort(graph: Any, visit: Optional[Callable[[Node], Any]] = None) -> List[Node]:
+    # Kahn's algorithm: nodes with no incoming edges left are taken in turn (in the graph's order among those available at once), and visit(node) is called for each
+    nodes, offsets, targets, edge_ids, edges = _csr(graph)
+    for e in edges:
+        if not e._directed: raise Exception(f"Edge {e} isn't directed, a topological order needs every edge to be directed")
+    count = len(nodes)
+    indegree = array("q", bytes(8 * count))
+    for t in targets: indegree[t] += 1
+    available = deque(i for i in range(count) if indegree[i] == 0)
+    order = []
+    while len(available) > 0:
+        u = available.popleft()
+        order.append(nodes[u])
+        if visit is not None: visit(nodes[u])
+        for k in range(offsets[u], offsets[u + 1]):
+            v = targets[k]
+            indegree[v] -= 1
+            if indegree[v] == 0: available.append(v)
+    if len(order) < count: raise Exception("The graph has a cycle, so it has no topological order")
+    return order
+
+def strongly_connected_components(graph: Any, visit: Optional[Callable[[List[Node]], Any]] = None) -> List[List[Node]]:
+    # Tarjan's algorithm with explicit stacks. Components come out in reverse topological order (a component before any that lead to it), and
+    # visit(component) is called as each one is found. Undirected edges go both ways, so on an undirected graph these are its connected components
+    nodes, offsets, targets, edge_ids, edges = _csr(graph)
+    count = len(nodes)
+    order = array("q", [-1]) * count
+    low = array("q", bytes(8 * count))
+    on_stack = bytearray(count)
+    stack: List[int] = []
+    components = []
+    counter = 0
+    for root in range(count):
+        if order[root] != -1: continue
+        order[root] = low[root] = counter
+        counter += 1
+        stack.append(root)
+        on_stack[root] = 1
+        work, resume = [root], [offsets[root]]
+        while len(work) > 0:
+            u = work[-1]
+            k, end = resume[-1], offsets[u + 1]
+            descended = False
+            while k < end:
+                v = targets[k]
+                k += 1
+                if order[v] == -1:
+                    resume[-1] = k
+                    order[v] = low[v] = counter
+                    counter += 1
+                    stack.append(v)
+                    on_stack[v] = 1
+                    work.append(v)
+                    resume.append(offsets[v])
+                    descended = True
+                    break
+                if on_stack[v] and order[v] < low[u]: low[u] = order[v]
+            if descended: continue
+            work.pop()
+            resume.pop()
+            if len(work) > 0 and low[u] < low[work[-1]]: low[work[-1]] = low[u]
+            if low[u] == order[u]:
+                component = []
+                while True:
+                    w = stack.pop()
+                    on_stack[w] = 0
+                    component.append(nodes[w])
+                    if w == u: break
+                components.append(component)
+                if visit is not None: visit(component)
+    return components
+
+def _low_points(graph: Any) -> Tuple[List[Node], List[Edge]]:
+    # Articulation points and bridges, ignoring edge directions, from the discovery times and low points of an iterative DFS. The edge a node
+    # was reached by is skipped by its index rather than by the parent node, so a pair of parallel edges is never a bridge
+    nodes, offsets, targets, edge_ids, edges = _csr(graph, True)
+    count = len(nodes)
+    discovered = array("q", [-1]) * count
+    low = array("q", bytes(8 * count))
+    is_cut = bytearray(count)
+    bridges = []
+    time = 0
+    for root in range(count):
+        if discovered[root] != -1: continue
+        discovered[root] = low[root] = time
+        time += 1
+        root_children = 0
+        work, resume, via = [root], [offsets[root]], [-1]
+        while len(work) > 0:
+            u = work[-1]
+            k, end, parent_edge = resume[-1], offsets[u + 1], via[-1]
+            descended = False
+            while k < end:
+                v, e = targets[k], edge_ids[k]
+                k += 1
+                if e == parent_edge: continue
+                if discovered[v] == -1:
+                    resume[-1] = k
+                    discovered[v] = low[v] = time
+                    time += 1
+                    work.append(v)
+                    resume.append(offsets[v])
+                    via.append(e)
+                    descended = True
+                    break
+                if discovered[v] < low[u]: low[u] = discovered[v]
+            if descended: continue
+            work.pop()
+            resume.pop()
+            via.pop()
+            if len(work) == 0: continue
+            p = work[-1]
+            if low[u] < low[p]: low[p] = low[u]
+            if low[u] > discovered[p]: bridges.append(edges[parent_edge])
+            if p == root: root_children += 1
+            elif low[u] >= discovered[p]: is_cut[p] = 1
+        if root_children > 1: is_cut[root] = 1
+    return [nodes[i] for i in range(count) if is_cut[i]], bridges
+
+def bridges(graph: Any, visit: Optional[Callable[[Edge], Any]] = None) -> List[Edge]:
+    # Edges whose removal would disconnect their ends (ignoring directions), visit(edge) is called for each
+    found = _low_points(graph)[1]
+    if visit is not None:
+        for e in found: visit(e)
+    return found
+
+def articulation_points(graph: Any, visit: Optional[Callable[[Node], Any]] = None) -> List[Node]:
+    # Nodes whose removal would disconnect some of the others (ignoring directions), in the graph's order, visit(node) is called for each
+    found = _low_points(graph)[0]
+    if visit is not None:
+        for n in found: visit(n)
+    return found
+
+class NodeScores(dict):
+    # A score for each node (in the graph's order), which can be turned straight into the per-node lists that the bulk styling methods take,
+    # e.g. graph.set_sizes(scores.nodes(), scores.scaled(10, 40)) or graph.set_colors(scores.nodes(), scores.colors(Color.BLUE, Color.RED))
+    def __init__(self, scores: Dict[Node, float], error: Optional[float] = 0.0):
+        super().__init__(scores)
+        # How far any score may be from its exact value (with 95% confidence for sampled scores), or None if there's no simple bound
+        self.error = error
+
+    def nodes(self) -> List[Node]:
+        return list(self.keys())
+
+    def top(self, k: int = 10) -> List[Node]:
+        return heapq.nlargest(k, self.keys(), key=self.__getitem__)
+
+    def scaled(self, low: float, high: float) -> List[float]:
+        # The scores mapped linearly onto low (the lowest score) to high (the highest)
+        values = list(self.values())
+        if len(values) == 0: return []
+        smallest, largest = min(values), max(values)
+        if largest == smallest: return [(low + high) / 2] * len(values)
+        factor = (high - low) / (largest - smallest)
+        return [low + (v - smallest) * factor for v in values]
+
+    def colors(self, low: Color, high: Color) -> List[Color]:
+        # The scores as colours between low and high
+        return [Color(round(low._red + (high._red - low._red) * t), round(low._green + (high._green - low._green) * t), round(low._blue + (high._blue - low._blue) * t)) for t in self.scaled(0.0, 1.0)]
+
+    def __repr__(self) -> str:
+        return f"NodeScores({len(self)} nodes, error={self.error})"
+
+# The probability that a sampled score is further from its exact value than NodeScores.error
+_SAMPLING_RISK = 0.05
+
+def _csr_weights(edges: List[Edge], edge_ids: array, weighted: bool) -> Optional[array]:
+    # The weight of each entry in the rows (edges without a weight count as 1), or None when unweighted
+    if not weighted: return None
+    weights = array("d", bytes(8 * len(edge_ids)))
+    for k, i in enumerate(edge_ids):
+        e = edges[i]
+        w = e._weight if e._weight is not None else 1
+        if not isinstance(w, (int, float)) or isinstance(w, bool): raise Exception(f"Edge {e} has a weight that isn't a number")
+        if w < 0: raise Exception(f"Edge {e} has a negative weight")
+        weights[k] = w
+    return weights
+
+def _sample_sources(count: int, k: Optional[int], seed: Any) -> List[int]:
+    if k is None or k >= count: return list(range(count))
+    if k < 1: raise Exception("k must be at least 1")
+    return sorted(random.Random(seed).sample(range(count), k))
+
+def degree_centrality(graph: Any, direction: str = "all") -> NodeScores:
+    # Each node's degree over the most it could have (the number of other nodes). direction is 'in' or 'out' to count only the directed
+    # edges arriving at or leaving each node (undirected edges count either way)
+    if direction not in ("all", "in", "out"): raise Exception(f"direction must be 'all', 'in' or 'out', not '{direction}'")
+    nodes = graph.nodes()
+    index = {n._internal_id: i for i, n in enumerate(nodes)}
+    degrees = [0] * len(nodes)
+    for e in graph.edges():
+        if direction != "in" or not e._directed: degrees[index[e._source._internal_id]] += 1
+        if direction != "out" or not e._directed: degrees[index[e._target._internal_id]] += 1
+    scale = 1 / (len(nodes) - 1) if len(nodes) > 1 else 0.0
+    return NodeScores({n: d * scale for n, d in zip(nodes, degrees)})
+
+def pagerank(graph: Any, damping: float = 0.85, weighted: bool = False, tolerance: float = 1e-6, max_iterations: int = 200) -> NodeScores:
+    # PageRank by power iteration over the compressed rows (with NumPy when it's installed). Nodes without outgoing edges share their rank
+    # with every node. Each step moves the ranks at least 1 - damping of the way to the exact ones, so their total (L1) distance from them
+    # is at most damping / (1 - damping) times the last change: this is error, and iterating stops once it's below tolerance
+    if not 0 <= damping < 1: raise Exception("damping must be at least 0 and less than 1")
+    nodes, offsets, targets, edge_ids, edges = _csr(graph)
+    count = len(nodes)
+    if count == 0: return NodeScores({})
+    weights = _csr_weights(edges, edge_ids, weighted)
+    teleport = (1 - damping) / count
+    change = math.inf
+    if numpy is not None:
+        offs = numpy.frombuffer(offsets, dtype=numpy.int64)
+        tg = numpy.frombuffer(targets, dtype=numpy.int64)
+        rows = numpy.repeat(numpy.arange(count), numpy.diff(offs))
+        w = numpy.frombuffer(weights, dtype=numpy.float64) if weights is not None else numpy.ones(len(tg))
+        out = numpy.bincount(rows, weights=w, minlength=count)
+        dangling = out == 0
+        share = w / numpy.where(dangling, 1.0, out)[rows]
+        rank = numpy.full(count, 1 / count)
+        for _ in range(max_iterations):
+            spread = numpy.bincount(tg, weights=rank[rows] * share, minlength=count)
+            new = damping * (spread + rank[dangling].sum() / count) + teleport
+            change = float(numpy.abs(new - rank).sum())
+            rank = new
+            if damping * change < tolerance * (1 - damping): break
+        return NodeScores(dict(zip(nodes, rank.tolist())), damping / (1 - damping) * change)
+    out = array("d", bytes(8 * count))
+    for u in range(count):
+        out[u] = offsets[u + 1] - offsets[u] if weights is None else sum(weights[offsets[u]:offsets[u + 1]])
+    rank = [1 / count] * count
+    for _ in range(max_iterations):
+        new = [0.0] * count
+        lost = 0.0
+        for u in range(count):
+            if out[u] == 0:
+                lost += rank[u]
+                continue
+            r = rank[u] / out[u]
+            if weights is None:
+                for k in range(offsets[u], offsets[u + 1]): new[targets[k]] += r
+            else:
+                for k in range(offsets[u], offsets[u + 1]): new[targets[k]] += r * weights[k]
+        base = damping * lost / count + teleport
+        new = [damping * x + base for x in new]
+        change = sum(abs(a - b) for a, b in zip(new, rank))
+        rank = new
+        if damping * change < tolerance * (1 - damping): break
+    return NodeScores(dict(zip(nodes, rank)), damping / (1 - damping) * change)
+
+def _levels_numpy(offs: Any, tg: Any, source: int, count: int) -> Tuple[Any, Any, List[Tuple[Any, Any]]]:
+    # Breadth first search a whole level at a time: the distances and numbers of shortest paths from source, and for each level the
+    # (from, to) pairs of the edges that lead to the next one
+    dist = numpy.full(count, -1, dtype=numpy.int64)
+    sigma = numpy.zeros(count)
+    dist[source] = 0
+    sigma[source] = 1
+    frontier = numpy.array([source])
+    levels = []
+    d = 0
+    while len(frontier) > 0:
+        starts = offs[frontier]
+        lengths = offs[frontier + 1] - starts
+        total = int(lengths.sum())
+        if total == 0: break
+        ends = numpy.cumsum(lengths)
+        slots = numpy.repeat(starts - ends + lengths, lengths) + numpy.arange(total)
+        src = numpy.repeat(frontier, lengths)
+        dst = tg[slots]
+        frontier = numpy.unique(dst[dist[dst] < 0])
+        d += 1
+        dist[frontier] = d
+        keep = dist[dst] == d
+        src, dst = src[keep], dst[keep]
+        numpy.add.at(sigma, dst, sigma[src])
+        levels.append((src, dst))
+    return dist, sigma, levels
+
+def _brandes(offsets: Any, targets: Any, weights: Optional[array], source: int, count: int, dist: array, sigma: array, delta: array) -> List[int]:
+    # One source of Brandes' algorithm in pure Python: leaves each reached node's dependency on the source in delta, and returns the reached
+    # nodes. The arrays are shared between sources, and only the reached entries need resetting afterwards
+    order = []
+    dist[source] = 0.0
+    sigma[source] = 1.0
+    if weights is None:
+        queue = deque([source])
+        while len(queue) > 0:
+            u = queue.popleft()
+            order.append(u)
+            d = dist[u] + 1.0
+            for k in range(offsets[u], offsets[u + 1]):
+                v = targets[k]
+                if dist[v] < 0:
+                    dist[v] = d
+                    queue.append(v)
+                if dist[v] == d: sigma[v] += sigma[u]
+    else:
+        heap = [(0.0, source)]
+        pop, push = heapq.heappop, heapq.heappush
+        settled = bytearray(count)
+        while len(heap) > 0:
+            d, u = pop(heap)
+            if settled[u]: continue
+            settled[u] = 1
+            order.append(u)
+            for k in range(offsets[u], offsets[u + 1]):
+                v = targets[k]
+                nd = d + weights[k]
+                if dist[v] < 0 or nd < dist[v]:
+                    dist[v] = nd
+                    sigma[v] = 0.0
+                    push(heap, (nd, v))
+                if nd == dist[v] and not settled[v]: sigma[v] += sigma[u]
+        for u in order: settled[u] = 0
+    # Back through the nodes, furthest first, so each node's successors on shortest paths are finished before it
+    for u in reversed(order):
+        total = 0.0
+        for k in range(offsets[u], offsets[u + 1]):
+            v = targets[k]
+            if dist[v] == dist[u] + (1.0 if weights is None else weights[k]) and sigma[v] > 0 and v != u: total += (1.0 + delta[v]) / sigma[v]
+        delta[u] = sigma[u] * total
+    return order
+
+def betweenness(graph: Any, k: Optional[int] = None, normalized: bool = True, weighted: bool = False, seed: Any = None) -> NodeScores:
+    # Brandes' betweenness centrality: the share of the shortest paths between other nodes that go through each node. With k, only the
+    # shortest paths from k sampled sources are counted (and scaled up), so it takes k searches instead of one per node. The normalized
+    # scores are then within error = sqrt(ln(2 / 0.05) / 2k) * n / (n - 1) of the exact ones with 95% confidence (Hoeffding's
+    # inequality), e.g. about 0.14 for k = 100 and 0.04 for k = 1000, for each node. Unweighted searches use NumPy when it's installed
+    nodes, offsets, targets, edge_ids, edges = _csr(graph)
+    count = len(nodes)
+    if count == 0: return NodeScores({})
+    weights = _csr_weights(edges, edge_ids, weighted)
+    sources = _sample_sources(count, k, seed)
+    if numpy is not None and weights is None:
+        offs = numpy.frombuffer(offsets, dtype=numpy.int64)
+        tg = numpy.frombuffer(targets, dtype=numpy.int64)
+        totals = numpy.zeros(count)
+        for s in sources:
+            dist, sigma, levels = _levels_numpy(offs, tg, s, count)
+            delta = numpy.zeros(count)
+            for src, dst in reversed(levels): numpy.add.at(delta, src, sigma[src] / sigma[dst] * (1 + delta[dst]))
+            delta[s] = 0
+            totals += delta
+        totals = totals.tolist()
+    else:
+        totals = [0.0] * count
+        dist, sigma, delta = array("d", [-1.0]) * count, array("d", bytes(8 * count)), array("d", bytes(8 * count))
+        for s in sources:
+            for u in _brandes(offsets, targets, weights, s, count, dist, sigma, delta):
+                if u != s: totals[u] += delta[u]
+                dist[u], sigma[u], delta[u] = -1.0, 0.0, 0.0
+    # Every ordered pair is counted, so each pair is counted twice when all of the edges are undirected
+    scale = count / len(sources)
+    if normalized: scale /= max(1, (count - 1) * (count - 2))
+    elif all(not e._directed for e in edges): scale /= 2
+    error = 0.0
+    if len(sources) < count:
+        error = math.sqrt(math.log(2 / _SAMPLING_RISK) / (2 * len(sources))) * count / (count - 1)
+        if not normalized: error *= (count - 1) * (count - 2) / (2 if all(not e._directed for e in edges) else 1)
+    return NodeScores({n: t * scale for n, t in zip(nodes, totals)}, error)
+
+def closeness(graph: Any, k: Optional[int] = None, weighted: bool = False, seed: Any = None) -> NodeScores:
+    # How close each node is to the nodes that can reach it: the reciprocal of their average distance to it, multiplied by the share of the
+    # other nodes that can reach it (so nodes that are only reached from a few others don't score highly, as in Wasserman and Faust). With
+    # k, only the distances from k sampled nodes are used. For a connected graph whose longest shortest path is D, each average distance is
+    # then within D * sqrt(ln(2 / 0.05) / 2k) of the exact one with 95% confidence (Eppstein and Wang), e.g. 0.14D for k = 100. The
+    # bound on the scores depends on the distances, so error is None for sampled scores
+    nodes, offsets, targets, edge_ids, edges = _csr(graph)
+    count = len(nodes)
+    if count == 0: return NodeScores({})
+    weights = _csr_weights(edges, edge_ids, weighted)
+    sources = _sample_sources(count, k, seed)
+    if numpy is not None and weights is None:
+        offs = numpy.frombuffer(offsets, dtype=numpy.int64)
+        tg = numpy.frombuffer(targets, dtype=numpy.int64)
+        totals, reached = numpy.zeros(count), numpy.zeros(count)
+        for s in sources:
+            dist = _levels_numpy(offs, tg, s, count)[0]
+            found = dist > 0
+            totals += numpy.where(found, dist, 0)
+            reached += found
+        totals, reached = totals.tolist(), reached.tolist()
+    else:
+        totals, reached = [0.0] * count, [0] * count
+        for s in sources:
+            dist = _shortest_paths(offsets, targets, weights, s, count, weights is not None)[0]
+            for v in range(count):
+                if v != s and dist[v] != math.inf:
+                    totals[v] += dist[v]
+                    reached[v] += 1
+    sampled = set(sources)
+    scores = {}
+    for i, n in enumerate(nodes):
+        # The share of the sampled nodes (other than this one) that reach it, which is an estimate of the share of all of them
+        others = len(sources) - (1 if i in sampled else 0)
+        scores[n] = reached[i] / others * reached[i] / totals[i] if others > 0 and totals[i] > 0 else 0.0
+    return NodeScores(scores, 0.0 if len(sources) == count else None)
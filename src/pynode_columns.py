@@ -0,0 +1,252 @@
+﻿# Columnar attribute storage: an attribute that has a column (see Graph.node_attr and Graph.edge_attr) is kept in one typed array
+# for all of the graph's nodes or edges, indexed by each element's slot, instead of in every element's own dictionary
+import sys
+import operator
+from array import array
+from itertools import compress, repeat
+from typing import List, Dict, Any, Optional, Callable, Iterator, Tuple, Union
+
+# NumPy is used when it's installed, but never looked for in the browser (where a failed import means a request to the server)
+numpy = None
+if sys.implementation.name != "brython":
+    try: import numpy
+    except ImportError: numpy = None
+
+OPERATORS: Dict[str, Callable[[Any, Any], bool]] = {"<": operator.lt, "<=": operator.le, ">": operator.gt, ">=": operator.ge, "==": operator.eq, "!=": operator.ne}
+INT_MIN, INT_MAX = -(1 << 63), (1 << 63) - 1
+TYPES = {"b": bool, "q": int, "d": float}
+
+def _typecode(value: Any) -> str:
+    # Booleans, 64 bit integers and floats are stored in typed arrays, anything else makes the whole column a list of objects
+    if value is True or value is False: return "b"
+    if type(value) is int: return "q" if INT_MIN <= value <= INT_MAX else "o"
+    if type(value) is float: return "d"
+    return "o"
+
+class ColumnStore:
+    # Slots for one kind of element (nodes or edges) of a graph, and the columns that are indexed by them
+    def __init__(self):
+        self.elements: List[Any] = []
+        self.free: List[int] = []
+        self.columns: Dict[str, 'AttributeColumn'] = {}
+
+    def add(self, element: Any):
+        if len(self.free) > 0:
+            slot = self.free.pop()
+            self.elements[slot] = element
+        else:
+            slot = len(self.elements)
+            self.elements.append(element)
+        element._columns = self
+        element._slot = slot
+        if len(self.columns) > 0:
+            for name, column in self.columns.items():
+                if name in element._attributes: column.set_slot(slot, element._attributes.pop(name))
+
+    def remove(self, element: Any):
+        # Values go back to the element's own dictionary, so it keeps its attributes outside of the graph
+        slot = element._slot
+        for name, column in self.columns.items():
+            if column.has_slot(slot):
+                element._attributes[name] = column.get_slot(slot)
+                column.clear_slot(slot)
+        self.elements[slot] = None
+        self.free.append(slot)
+        element._columns = None
+        element._slot = -1
+
+    def clear(self):
+        for element in self.elements:
+            if element is not None: self.remove(element)
+        self.elements = []
+        self.free = []
+
+    def column(self, name: str) -> 'AttributeColumn':
+        column = self.columns.get(name)
+        if column is None:
+            column = self.columns[name] = AttributeColumn(self, name)
+            for slot, element in enumerate(self.elements):
+                if element is not None and name in element._attributes: column.set_slot(slot, element._attributes.pop(name))
+        return column
+
+    def attributes(self, element: Any) -> Dict[str, Any]:
+        # All of an element's attributes, whether they're in columns or not
+        values = dict(element._attributes)
+        for name, column in self.columns.items():
+            if column.has_slot(element._slot): values[name] = column.get_slot(element._slot)
+        return values
+
+class AttributeColumn:
+    # A live view of one attribute across all nodes (or edges) of a graph, with filters and aggregations that don't go through each element
+    def __init__(self, store: ColumnStore, name: str):
+        self._store = store
+        self.name = name
+        self._typecode: Optional[str] = None
+        self._data: Union[array, List[Any]] = []
+        self._present = bytearray()
+
+    def _reserve(self, size: int):
+        missing = size - len(self._present)
+        if missing <= 0: return
+        self._present.extend(bytes(missing))
+        if self._typecode in ("b", "q", "d"): self._data.frombytes(bytes(missing * self._data.itemsize))
+        else: self._data.extend([None] * missing)
+
+    def _convert(self, typecode: str):
+        if self._typecode is None and typecode != "o":
+            self._data = array(typecode, bytes(len(self._present) * array(typecode).itemsize))
+        elif typecode == "o":
+            values = list(self._data)
+            if self._typecode == "b": values = [bool(v) for v in values]
+            self._data = values
+        self._typecode = typecode
+
+    def set_slot(self, slot: int, value: Any):
+        if slot >= len(self._present): self._reserve(slot + 1)
+        typecode = self._typecode
+        if typecode != "o" and (type(value) is not TYPES.get(typecode) or (typecode == "q" and not INT_MIN <= value <= INT_MAX)):
+            self._convert(_typecode(value) if typecode is None else "o")
+        self._data[slot] = value
+        self._present[slot] = 1
+
+    def get_slot(self, slot: int) -> Any:
+        if slot >= len(self._present) or not self._present[slot]: return None
+        return bool(self._data[slot]) if self._typecode == "b" else self._data[slot]
+
+    def has_slot(self, slot: int) -> bool:
+        return slot < len(self._present) and self._present[slot] == 1
+
+    def clear_slot(self, slot: int):
+        if slot < len(self._present):
+            self._present[slot] = 0
+            if self._typecode == "o": self._data[slot] = None
+
+    def _slot(self, element: Any) -> int:
+        if getattr(element, "_columns", None) is not self._store:
+            raise Exception(f"'{element}' isn't in the graph")
+        return element._slot
+
+    def _slots(self, elements: Optional[List[Any]] = None) -> Iterator[int]:
+        # Slots that have a value, out of the given elements or all of them
+        if elements is None: return compress(range(len(self._present)), self._present)
+        present = self._present
+        return (s for s in (self._slot(e) for e in elements) if s < len(present) and present[s])
+
+    def _values(self, elements: Optional[List[Any]] = None) -> Iterator[Any]:
+        if elements is None and self._typecode != "b": return compress(self._data, self._present)
+        get = self.get_slot
+        return (get(s) for s in self._slots(elements))
+
+    def __getitem__(self, element: Any) -> Any:
+        return self.get_slot(self._slot(element))
+
+    def __setitem__(self, element: Any, value: Any):
+        self.set_slot(self._slot(element), value)
+
+    def __delitem__(self, element: Any):
+        self.clear_slot(self._slot(element))
+
+    def __contains__(self, element: Any) -> bool:
+        return getattr(element, "_columns", None) is self._store and self.has_slot(element._slot)
+
+    def __len__(self) -> int:
+        return self._present.count(1)
+
+    def __iter__(self) -> Iterator[Any]:
+        return self.elements()
+
+    def elements(self) -> Iterator[Any]:
+        elements = self._store.elements
+        return (elements[s] for s in self._slots())
+
+    def values(self) -> List[Any]:
+        return list(self._values())
+
+    def items(self) -> List[Tuple[Any, Any]]:
+        elements = self._store.elements
+        get = self.get_slot
+        return [(elements[s], get(s)) for s in self._slots()]
+
+    def fill(self, value: Any, elements: Optional[List[Any]] = None) -> 'AttributeColumn':
+        # Sets the value for every element (or the given ones) in one go
+        if elements is not None:
+            for e in elements: self.set_slot(self._slot(e), value)
+            return self
+        # Every value is replaced, so the column's type starts over
+        count = len(self._store.elements)
+        typecode = _typecode(value)
+        self._typecode = typecode
+        self._data = array(typecode, [value]) * count if typecode != "o" else [value] * count
+        self._present = bytearray(0 if e is None else 1 for e in self._store.elements)
+        if typecode == "o":
+            for s in range(count):
+                if not self._present[s]: self._data[s] = None
+        return self
+
+    def array(self) -> Any:
+        # A copy of the raw values by slot, as a NumPy array when NumPy is installed (slots without a value hold 0 or None, see mask).
+        # It's a copy so the column can still grow or change type while it's held, and so it doesn't change along with the column
+        if numpy is not None: return self._view().copy()
+        return array(self._typecode, self._data) if self._typecode in ("b", "q", "d") else list(self._data)
+
+    def mask(self) -> Any:
+        # Which slots have a value (a copy, like array)
+        return self._mask_view().copy() if numpy is not None else bytearray(self._present)
+
+    def _view(self) -> Any:
+        # NumPy arrays that share the column's memory, only used within one call since the column can't be resized while they exist
+        if self._typecode in ("q", "d"): return numpy.frombuffer(self._data, dtype=numpy.int64 if self._typecode == "q" else numpy.float64)
+        if self._typecode == "b": return numpy.frombuffer(self._data, dtype=numpy.int8).view(numpy.bool_)
+        return numpy.array(self._data, dtype=object)
+
+    def _mask_view(self) -> Any:
+        return numpy.frombuffer(self._present, dtype=numpy.uint8).view(numpy.bool_)
+
+    def where(self, condition: Union[str, Callable[[Any], bool]], value: Any = None, elements: Optional[List[Any]] = None) -> List[Any]:
+        # Elements whose value satisfies a condition, either an operator such as '<' with a value, or a function of the value
+        store_elements = self._store.elements
+        if isinstance(condition, str):
+            if condition not in OPERATORS: raise Exception(f"Unknown operator '{condition}', expected one of {', '.join(OPERATORS.keys())}")
+            if numpy is not None and elements is None and self._typecode in ("b", "q", "d"):
+                matches = numpy.logical_and(OPERATORS[condition](self._view(), value), self._mask_view())
+                return [store_elements[s] for s in numpy.flatnonzero(matches).tolist()]
+            compare = OPERATORS[condition]
+            if elements is None and self._typecode in ("b", "q", "d"):
+                # Compared in C with map(), empty slots hold 0 and are masked out
+                matches = map(operator.and_, self._present, map(compare, self._data, repeat(value)))
+                return [store_elements[s] for s in compress(range(len(self._present)), matches)]
+            return [store_elements[s] for s, v in zip(self._slots(elements), self._values(elements)) if compare(v, value)]
+        return [store_elements[s] for s, v in zip(self._slots(elements), self._values(elements)) if condition(v)]
+
+    def count(self, elements: Optional[List[Any]] = None) -> int:
+        return len(self) if elements is None else sum(1 for s in self._slots(elements))
+
+    def sum(self, elements: Optional[List[Any]] = None) -> Any:
+        if numpy is not None and elements is None and self._typecode in ("q", "d"):
+            return self._view()[self._mask_view()].sum().item()
+        return sum(self._values(elements))
+
+    def mean(self, elements: Optional[List[Any]] = None) -> Optional[float]:
+        count = self.count(elements)
+        return self.sum(elements) / count if count > 0 else None
+
+    def min(self, elements: Optional[List[Any]] = None) -> Any:
+        return min(self._values(elements), default=None)
+
+    def max(self, elements: Optional[List[Any]] = None) -> Any:
+        return max(self._values(elements), default=None)
+
+    def _arg(self, choose: Callable, elements: Optional[List[Any]]) -> Any:
+        get = self._data.__getitem__ if self._typecode in ("q", "d") else self.get_slot
+        slot = choose(self._slots(elements), key=get, default=None)
+        return self._store.elements[slot] if slot is not None else None
+
+    def argmin(self, elements: Optional[List[Any]] = None) -> Any:
+        # The element with the smallest value (the first one, if there's a tie)
+        return self._arg(min, elements)
+
+    def argmax(self, elements: Optional[List[Any]] = None) -> Any:
+        return self._arg(max, elements)
+
+    def __repr__(self) -> str:
+        return f"AttributeColumn('{self.name}', {len(self)} values)"
@@ -1,11 +1,18 @@
 ﻿import sys
 import time
 import traceback
-import javascript
 import random
 import json
-from browser import document, window, alert, timer
-from browser.local_storage import storage
+import base64
+try:
+    import javascript
+    from browser import document, window, alert, timer
+    from browser.local_storage import storage
+    IS_BROWSER = True
+except ImportError:
+    # Running under CPython (see pynode_headless), there's no renderer to talk to
+    javascript = document = window = alert = timer = storage = None
+    IS_BROWSER = False
 
 import pynode_graphlib
 
@@ -21,10 +28,185 @@ class PynodeCoreGlobals():
     fix_layout = True
     did_fix_layout = False
     did_update_layout = False
-    delay_type = {}
-    click_listener_func = {"f": None}
+    registered_styles = set()
+    batch_depth = 0
+    batch_events = []
+    # The graph's _flush_batch, for the outermost batch
+    batch_flush = None
+    listener_funcs = {"node_click": None, "edge_click": None, "node_hover": None, "node_drag_end": None}
     positioning_counter = None
+    positions = []
+    positions_count = 0
+    positions_version = 0
+    # The positions_version that was current the last time the renderer was asked for its positions (see request_positions)
+    positions_requested = -1
+    # Nodes are given a slot in the positions snapshot as they're added, counting from 0 in every run
+    node_slots = 0
+    canvas_size = [None, None]
     error = ""
+    server_session = False
+    server_running = False
+    server_consumed = 0
+    print_buffer = []
+    print_size = 0
+
+# Printed text is held until this many characters have been written (or another event is queued, or the program returns),
+# and is then sent as a single print event
+PRINT_BATCH_SIZE = 4096
+
+class TimerWheel:
+    # Runs the functions passed to delay() from a single tick (an animation frame in the browser, otherwise one timer set for the next
+    # function that's due) on a hierarchical timing wheel. Level L has 64 slots of 64**L ticks: a timer goes in the slot of the level its
+    # remaining time falls into, and moves down a level each time the level below completes a turn. Timers further away than the top level
+    # holds (about 4.6 hours) wait in an overflow list, which is inserted again each time the top level completes a turn. Adding and
+    # cancelling are O(1), and timers that have fired or been cancelled are dropped.
+    TICK = 1 # Milliseconds
+    BITS = 6
+    SLOTS = 1 << BITS
+    LEVELS = 4
+    SPAN = 1 << (BITS * LEVELS) # Ticks in one turn of the top level
+
+    def __init__(self):
+        self.handle = None
+        # Timer id -> [tick it's due, function (None once cancelled), repeat interval in ticks (0 for none), id]
+        self.timers = {}
+        # The clock and ids keep going when the wheel is cleared, since it can be cleared by one of its own functions
+        self.current = 0
+        self.next_id = 1
+        self.clear()
+
+    def clear(self):
+        self._disarm()
+        for entry in self.timers.values(): entry[1] = None
+        self.wheels = [[[] for s in range(TimerWheel.SLOTS)] for l in range(TimerWheel.LEVELS)]
+        self.overflow = []
+        self.timers = {}
+        self.paused = False
+        self.wake = None
+        self.last = 0
+
+    def add(self, func, time, repeat=False):
+        ticks = max(1, -(-int(time) // TimerWheel.TICK))
+        timer_id = self.next_id
+        self.next_id += 1
+        entry = [self.current + ticks, func, ticks if repeat else 0, timer_id]
+        self.timers[timer_id] = entry
+        self._insert(entry)
+        self._arm(entry[0])
+        return timer_id
+
+    def cancel(self, timer_id):
+        entry = self.timers.pop(timer_id, None)
+        if entry is None: return False
+        # It's left in its slot, and skipped when the slot is reached
+        entry[1] = None
+        if len(self.timers) == 0: self._disarm()
+        return True
+
+    def pause(self):
+        self.paused = True
+        self._disarm()
+
+    def resume(self):
+        if not self.paused: return
+        self.paused = False
+        if len(self.timers) > 0: self._arm(self._next_tick())
+
+    def _insert(self, entry):
+        delta = entry[0] - self.current
+        if delta >= TimerWheel.SPAN:
+            self.overflow.append(entry)
+            return
+        level = 0
+        while delta >= 1 << (TimerWheel.BITS * (level + 1)): level += 1
+        self.wheels[level][(entry[0] >> (TimerWheel.BITS * level)) & (TimerWheel.SLOTS - 1)].append(entry)
+
+    def _next_tick(self):
+        # The first tick at which a timer may be due: the next non-empty slot on level 0, or when the next non-empty slot of a higher level moves down
+        best = None
+        for level in range(TimerWheel.LEVELS):
+            shift = TimerWheel.BITS * level
+            base = self.current >> shift
+            slots = self.wheels[level]
+            for k in range(1, TimerWheel.SLOTS + 1):
+                if len(slots[(base + k) & (TimerWheel.SLOTS - 1)]) > 0:
+                    tick = (base + k) << shift
+                    if best is None or tick < best: best = tick
+                    break
+        if len(self.overflow) > 0:
+            tick = (self.current // TimerWheel.SPAN + 1) * TimerWheel.SPAN
+            if best is None or tick < best: best = tick
+        return best
+
+    def _step(self):
+        self.current += 1
+        current = self.current
+        if current % TimerWheel.SPAN == 0 and len(self.overflow) > 0:
+            # Timers that are now within a turn of the top level move into the wheel (before this tick's slot is run, in case one is due now)
+            entries = self.overflow
+            self.overflow = []
+            for entry in entries:
+                if entry[1] is not None: self._insert(entry)
+        level = 1
+        while level < TimerWheel.LEVELS and current & ((1 << (TimerWheel.BITS * level)) - 1) == 0:
+            index = (current >> (TimerWheel.BITS * level)) & (TimerWheel.SLOTS - 1)
+            entries = self.wheels[level][index]
+            if len(entries) > 0:
+                self.wheels[level][index] = []
+                for entry in entries:
+                    if entry[1] is not None: self._insert(entry)
+            level += 1
+        index = current & (TimerWheel.SLOTS - 1)
+        entries = self.wheels[0][index]
+        if len(entries) == 0: return
+        self.wheels[0][index] = []
+        for entry in entries:
+            func = entry[1]
+            if func is None: continue
+            if entry[2] > 0:
+                entry[0] = current + entry[2]
+                self._insert(entry)
+            else:
+                del self.timers[entry[3]]
+            func()
+
+    def _advance(self, target):
+        # Moves on to the target tick, running the timers that are due on the way (ticks with nothing to do are skipped)
+        while self.current < target and len(self.timers) > 0 and not self.paused:
+            self.current = min(self._next_tick(), target) - 1
+            self._step()
+        if self.current < target and not self.paused: self.current = target
+
+    def _arm(self, tick):
+        if self.paused: return
+        if IS_BROWSER:
+            if self.handle is None:
+                self.last = window.performance.now()
+                self.handle = window.requestAnimationFrame(self._frame)
+        elif self.handle is None or tick < self.wake:
+            if self.handle is not None: timer.clear_timeout(self.handle)
+            self.wake = tick
+            self.handle = timer.set_timeout(self._wake, (tick - self.current) * TimerWheel.TICK)
+
+    def _disarm(self):
+        if self.handle is None: return
+        if IS_BROWSER: window.cancelAnimationFrame(self.handle)
+        elif timer is not None: timer.clear_timeout(self.handle)
+        self.handle = None
+
+    def _frame(self, timestamp):
+        self.handle = None
+        elapsed = int((timestamp - self.last) // TimerWheel.TICK)
+        self.last += elapsed * TimerWheel.TICK
+        self._advance(self.current + elapsed)
+        if len(self.timers) > 0 and not self.paused and self.handle is None: self.handle = window.requestAnimationFrame(self._frame)
+
+    def _wake(self):
+        self.handle = None
+        self._advance(self.wake)
+        if len(self.timers) > 0: self._arm(self._next_tick())
+
+delays = TimerWheel()
 
 def enable_events(enable):
     PynodeCoreGlobals.do_events = enable
@@ -53,16 +235,64 @@ class EventPrint(Event):
 class EventPause():
     def __init__(self, time):
         self.time = time
+class EventAnimation(Event):
+    # An event that the renderer plays out over time (see js_animate), so the events after it wait until it's finished, as with a pause
+    def __init__(self, func, args, time):
+        super().__init__(func, args)
+        self.time = time
 
 def add_event(event, source=None):
     if PynodeCoreGlobals.do_events:
         if source is not None:
             if isinstance(source, pynode_graphlib.Node) and not pynode_graphlib.graph.has_node(source): return
             if isinstance(source, pynode_graphlib.Edge) and not pynode_graphlib.graph.has_edge(source): return
-        if isinstance(event, Event) and isinstance(event.func, str) and event.func.startswith("js_"):
-            event.args = [event.func, json.dumps(event.args)]
-            event.func = window["js_run_function"]
-        PynodeCoreGlobals.event_queue.append(event)
+        if PynodeCoreGlobals.batch_depth > 0 and not isinstance(event, EventPrint):
+            # Mutations are collected and sent as one diff when the batch ends. Pauses and animations keep their place: the changes
+            # before them are sent as a diff of their own first, so the changes after them still wait
+            if isinstance(event, (EventPause, EventAnimation)):
+                flush_batch()
+                queue_event(event)
+            elif isinstance(event, Event): PynodeCoreGlobals.batch_events.append(event)
+            return
+        queue_event(event)
+
+def queue_event(event):
+    # Text printed before this event has to be shown before it
+    if len(PynodeCoreGlobals.print_buffer) > 0: flush_print()
+    if IS_BROWSER and isinstance(event, Event) and isinstance(event.func, str) and event.func.startswith("js_"):
+        event.args = [event.func, json.dumps(event.args)]
+        event.func = window["js_run_function"]
+    PynodeCoreGlobals.event_queue.append(event)
+
+def begin_batch(flush):
+    if PynodeCoreGlobals.batch_depth == 0: PynodeCoreGlobals.batch_flush = flush
+    PynodeCoreGlobals.batch_depth += 1
+
+def flush_batch():
+    # Sends what's been collected so far in the batch, outside of it
+    events = PynodeCoreGlobals.batch_events
+    PynodeCoreGlobals.batch_events = []
+    if len(events) == 0: return
+    depth = PynodeCoreGlobals.batch_depth
+    PynodeCoreGlobals.batch_depth = 0
+    try: PynodeCoreGlobals.batch_flush(events)
+    finally: PynodeCoreGlobals.batch_depth = depth
+
+def end_batch():
+    # Returns the collected events once the outermost batch ends, otherwise None
+    PynodeCoreGlobals.batch_depth -= 1
+    if PynodeCoreGlobals.batch_depth > 0: return None
+    events = PynodeCoreGlobals.batch_events
+    PynodeCoreGlobals.batch_events = []
+    return events
+
+def register_style(id_value, size, color, outline):
+    # Styles are registered with the renderer the first time an event refers to them. The registration skips the batch,
+    # so it reaches the renderer before the batched events that use the style
+    if id_value not in PynodeCoreGlobals.registered_styles:
+        PynodeCoreGlobals.registered_styles.add(id_value)
+        queue_event(Event(js_register_style, [id_value, size, color, outline]))
+    return id_value
 
 def get_data(event, source=None):
     if source is not None:
@@ -72,32 +302,72 @@ def get_data(event, source=None):
         return json.loads(window.js_run_function_with_return(event.func, json.dumps(event.args)))
     return None
 
+def update_positions(positions, count, width, height):
+    # Called by the renderer with a flat [x0, y0, x1, y1, ...] snapshot indexed by node slot (see next_node_slot)
+    PynodeCoreGlobals.positions = positions
+    PynodeCoreGlobals.positions_count = count
+    PynodeCoreGlobals.canvas_size = [width, height]
+    PynodeCoreGlobals.positions_version += 1
+
+def request_positions():
+    # Asks the renderer at most once for each snapshot, since a node that's missing from it won't be in a new one until the renderer moves on
+    if PynodeCoreGlobals.positions_requested == PynodeCoreGlobals.positions_version: return
+    try: window.js_push_positions()
+    except: pass
+    PynodeCoreGlobals.positions_requested = PynodeCoreGlobals.positions_version
+
+def next_node_slot():
+    slot = PynodeCoreGlobals.node_slots
+    PynodeCoreGlobals.node_slots += 1
+    return slot
+
+def node_position(slot):
+    i = slot * 2
+    if i < 0 or i + 1 >= PynodeCoreGlobals.positions_count: return None
+    x = PynodeCoreGlobals.positions[i]
+    y = PynodeCoreGlobals.positions[i + 1]
+    if x != x or y != y: return None # NaN marks ids that aren't rendered
+    return x, y
+
+HTML_ESCAPES = str.maketrans({"&": "&amp;", "<": "&lt;", ">": "&gt;", "\n": "<br>", "\"": "&quot;", "'": "&apos;", " ": "&nbsp;"})
+
 def format_string_HTML(s):
-    return s.replace("&", "&amp;").replace("<", "&lt;").replace(">", "&gt;").replace("\n", "<br>").replace("\"", "&quot;").replace("'", "&apos;").replace(" ", "&nbsp;")
+    return s.translate(HTML_ESCAPES)
 
 def do_print(s, color=None):
-    if color is not None: window.writeOutput("<p style='display:inline;color:" + color + ";'>" + format_string_HTML(s) + "</p>", True)
-    else: window.writeOutput("<p style='display:inline;'>" + format_string_HTML(s) + "</p>", True)
+    # The console shows text as it is (see js/console.js), so nothing needs escaping
+    window.writeText(s, color if color is not None else "")
 
 def do_print_formatted(s):
     window.writeOutput(s, True)
 
+def flush_print():
+    buffer = PynodeCoreGlobals.print_buffer
+    if len(buffer) > 0:
+        PynodeCoreGlobals.print_buffer = []
+        PynodeCoreGlobals.print_size = 0
+        queue_event(EventPrint(do_print, ["".join(buffer)]))
+
 class PrintOutput:
     def write(self, data):
-        add_event(EventPrint(do_print, [str(data)]))
-        #do_print(data)
+        if not PynodeCoreGlobals.do_events: return
+        text = str(data)
+        PynodeCoreGlobals.print_buffer.append(text)
+        PynodeCoreGlobals.print_size += len(text)
+        # Batches end on a line break, so lines aren't split between print events
+        if PynodeCoreGlobals.print_size >= PRINT_BATCH_SIZE and "\n" in text: flush_print()
     def flush(self):
-        pass
+        flush_print()
 
 class ErrorOutput:
     def write(self, data):
-        PynodeCoreGlobals.error += "<p style='display:inline;color:red;'>" + format_string_HTML(str(data)) + "</p>"
-        #document["console"].innerHTML += "<p style='display:inline;color:red;'>" + format_string_HTML(str(data)) + "</p>"
+        PynodeCoreGlobals.error += str(data)
     def flush(self):
         pass
 
-sys.stdout = PrintOutput()
-sys.stderr = ErrorOutput()
+if IS_BROWSER:
+    sys.stdout = PrintOutput()
+    sys.stderr = ErrorOutput()
 
 def end_playing():
     if not PynodeCoreGlobals.has_ended:
@@ -117,11 +387,14 @@ def play_events():
                     delay = event.time
                 else:
                     event.execute()
+                    if isinstance(event, EventAnimation): delay = max(event.time, delay)
                 del PynodeCoreGlobals.event_queue[0]
+                server_consumed()
                 PynodeCoreGlobals.event_timer = timer.set_timeout(play_events, delay)
             else:
                 PynodeCoreGlobals.event_timer = timer.set_timeout(play_events, 100)
-                end_playing()
+                # While the server is still running the program, an empty queue just means events haven't arrived yet
+                if not PynodeCoreGlobals.server_running: end_playing()
         except:
             traceback.print_exc(file=sys.stderr)
             handle_exception(False)
@@ -136,7 +409,7 @@ def handle_exception(emptyPrint=True):
             for event in PynodeCoreGlobals.event_queue:
                 if isinstance(event, EventPrint):
                     event.execute()
-        do_print_formatted(PynodeCoreGlobals.error)
+        if PynodeCoreGlobals.error != "": do_print(PynodeCoreGlobals.error, "red")
     except:
         pass
 
@@ -147,25 +420,47 @@ def execute_function(func, args):
         traceback.print_exc(file=sys.stderr)
         handle_exception(False)
 
+def reset_state():
+    # Resets everything a run depends on that doesn't involve the page
+    PynodeCoreGlobals.GLOBAL_USER_ID = 0
+    pynode_graphlib.graph._reset()
+    PynodeCoreGlobals.event_queue = []
+    PynodeCoreGlobals.registered_styles = set()
+    PynodeCoreGlobals.batch_depth = 0
+    PynodeCoreGlobals.batch_events = []
+    PynodeCoreGlobals.batch_flush = None
+    PynodeCoreGlobals.do_events = True
+    PynodeCoreGlobals.fix_layout = True
+    PynodeCoreGlobals.did_fix_layout = False
+    PynodeCoreGlobals.did_update_layout = False
+    PynodeCoreGlobals.has_ended = False
+    delays.clear()
+    PynodeCoreGlobals.positioning_counter = 0
+    PynodeCoreGlobals.positions = []
+    PynodeCoreGlobals.positions_count = 0
+    PynodeCoreGlobals.positions_version += 1
+    PynodeCoreGlobals.node_slots = 0
+    PynodeCoreGlobals.error = ""
+    PynodeCoreGlobals.print_buffer = []
+    PynodeCoreGlobals.print_size = 0
+    PynodeCoreGlobals.listener_funcs = {"node_click": None, "edge_click": None, "node_hover": None, "node_drag_end": None}
+    PynodeCoreGlobals.server_session = False
+    PynodeCoreGlobals.server_running = False
+    PynodeCoreGlobals.server_consumed = 0
+
 def reset(clear_console=True):
     try:
-        PynodeCoreGlobals.GLOBAL_USER_ID = 0
         if clear_console: window.writeOutput("", False)
-        pynode_graphlib.graph._reset()
         window.js_clear()
         if PynodeCoreGlobals.event_timer is not None: timer.clear_timeout(PynodeCoreGlobals.event_timer)
         if PynodeCoreGlobals.update_timer is not None: timer.clear_timeout(PynodeCoreGlobals.update_timer)
+        reset_state()
+        if server_mode(): window.js_server_stop()
         PynodeCoreGlobals.event_queue = [EventPause(100)]
-        PynodeCoreGlobals.fix_layout = True
-        PynodeCoreGlobals.did_fix_layout = False
-        PynodeCoreGlobals.did_update_layout = False
-        PynodeCoreGlobals.has_ended = False
-        PynodeCoreGlobals.delay_type = {}
-        PynodeCoreGlobals.positioning_counter = 0
-        PynodeCoreGlobals.error = ""
-        PynodeCoreGlobals.click_listener_func = {"f": None}
         window.set_layout_type()
         window.registerClickListener(node_click)
+        window.registerEventListener(element_event)
+        window.registerPositionListener(update_positions)
         window.clickListenerFunc = None
     except:
         timer.set_timeout(reset, 20)
@@ -186,8 +481,34 @@ def button_play(event):
     document["run"].bind("click", button_pause)
     timer.set_timeout(do_play, 20)
 
+class ProgramNamespace:
+    # Brython passes instances of Python classes to JS as they are (a dict would be copied), so the program runs in the namespace itself
+    def __init__(self, namespace):
+        self.namespace = namespace
+
+def exec_program(src, namespace):
+    # In the browser the JS that Brython generates for the program is cached in local storage by a hash of the source,
+    # so re-running unchanged code (even after a reload) skips parsing and transpiling it (see js_exec_program in graph_api.js).
+    # That relies on Brython internals, so it's run with exec when they've changed, or when the program doesn't compile
+    if IS_BROWSER and isinstance(src, str) and window.js_exec_program(src, ProgramNamespace(namespace)): return
+    exec(src, namespace)
+
 def do_play():
+    if not window.js_scripts_ready():
+        # Scripts that are loaded lazily (e.g. the standard library) are still downloading
+        timer.set_timeout(do_play, 20)
+        return
     src = window.getCode()
+    if server_mode():
+        # The program runs on the local server (see pynode_server.py), which streams its events back
+        PynodeCoreGlobals.server_session = True
+        PynodeCoreGlobals.server_running = True
+        window.js_server_run(src, SERVER_CREDIT * 2)
+        clear_button_run()
+        document["runPause"].style.display = "inherit"
+        document["run"].bind("click", button_pause)
+        play_events()
+        return
     try:
         success = True
         try:
@@ -211,12 +532,14 @@ def button_pause(event):
     document["run"].bind("click", button_resume)
     if PynodeCoreGlobals.event_timer is not None:
         timer.clear_timeout(PynodeCoreGlobals.event_timer)
+    delays.pause()
 
 def button_resume(event):
     clear_button_run()
     document["runPause"].style.display = "inherit"
     document["run"].bind("click", button_pause)
     PynodeCoreGlobals.event_timer = timer.set_timeout(play_events, 0)
+    delays.resume()
 
 def button_stop(event):
     clear_button_run()
@@ -230,16 +553,65 @@ def button_restart(event):
     button_play(event)
 
 def node_click(node_id):
-    node = None
-    if pynode_graphlib.graph is not None and PynodeCoreGlobals.click_listener_func["f"] is not None:
-        for n in pynode_graphlib.graph.nodes():
-            if n._internal_id == node_id: node = n
-        if node is not None:
-            execute_function(PynodeCoreGlobals.click_listener_func["f"], [node])
+    element_event("node_click", node_id)
+
+def element_event(event_type, element_id):
+    if server_mode():
+        window.js_server_element_event(event_type, element_id)
+        return
+    func = PynodeCoreGlobals.listener_funcs.get(event_type)
+    if func is None or pynode_graphlib.graph is None: return
+    element = pynode_graphlib.graph._element(element_id) if element_id is not None else None
+    expected_type = pynode_graphlib.Edge if event_type == "edge_click" else pynode_graphlib.Node
+    if isinstance(element, expected_type):
+        execute_function(func, [element])
+    elif event_type == "node_hover" and element_id is None:
+        execute_function(func, [None])
+
+# Events are requested from the server in batches of this size, as they're played
+SERVER_CREDIT = 500
+
+def server_mode():
+    if not IS_BROWSER: return False
+    try: return bool(window.js_server_connected())
+    except: return False
+
+def server_consumed():
+    # Played events are handed back to the server as credit, so it never sends more than the page can keep up with
+    if not PynodeCoreGlobals.server_session: return
+    PynodeCoreGlobals.server_consumed += 1
+    if PynodeCoreGlobals.server_consumed >= SERVER_CREDIT:
+        window.js_server_credit(PynodeCoreGlobals.server_consumed)
+        PynodeCoreGlobals.server_consumed = 0
+
+def server_message(data):
+    # Messages from the local server: batches of events (in the form produced by pynode_headless.trace) and the end of a run
+    message = json.loads(data)
+    if message["type"] == "events":
+        for item in message["events"]:
+            if item[0] == "pause": PynodeCoreGlobals.event_queue.append(EventPause(item[1]))
+            elif item[0] == "print": PynodeCoreGlobals.event_queue.append(EventPrint(do_print, [item[1]]))
+            elif item[0] == "error": PynodeCoreGlobals.event_queue.append(EventPrint(do_print, [item[1], "red"]))
+            elif len(item) > 2: PynodeCoreGlobals.event_queue.append(EventAnimation(window["js_run_function"], [item[0], json.dumps(item[1])], item[2]))
+            else: PynodeCoreGlobals.event_queue.append(Event(window["js_run_function"], [item[0], json.dumps(item[1])]))
+    elif message["type"] == "done":
+        PynodeCoreGlobals.server_running = False
 
 def save_code(event):
     window.saveCode()
 
+# Binary files (such as graph snapshots) are kept in local storage as base64
+def store_file(name, data):
+    storage["pynode_file:" + name] = base64.b64encode(bytes(data)).decode("ascii")
+
+def stored_file(name):
+    key = "pynode_file:" + name
+    if key not in storage: return None
+    return base64.b64decode(storage[key])
+
+def download_file(filename, data):
+    if IS_BROWSER: window.js_download_file(filename, base64.b64encode(bytes(data)).decode("ascii"))
+
 def update_instant():
     try: window.greuler_instance.update({"skipLayout": True})
     except: PynodeCoreGlobals.update_timer = timer.set_timeout(update_instant, 20)
@@ -269,16 +641,17 @@ def js_clear():
     js_update(True)
 
 # These functions have been moved over to JavaScript
+js_register_style = "js_register_style"
 js_add_node = "js_add_node"
 js_remove_node = "js_remove_node"
 js_add_edge = "js_add_edge"
 js_remove_edge = "js_remove_edge"
 js_add_all = "js_add_all"
 js_remove_all = "js_remove_all"
+js_batch = "js_batch"
 js_set_spread = "js_set_spread"
 js_node_set_value = "js_node_set_value"
 js_node_set_position = "js_node_set_position"
-js_node_get_position = "js_node_get_position"
 js_node_set_label = "js_node_set_label"
 js_node_set_size = "js_node_set_size"
 js_node_set_color = "js_node_set_color"
@@ -292,3 +665,23 @@ js_edge_set_color = "js_edge_set_color"
 js_edge_set_weight_style = "js_edge_set_weight_style"
 js_edge_highlight = "js_edge_highlight"
 js_edge_traverse = "js_edge_traverse"
+js_set_colors = "js_set_colors"
+js_nodes_set_size = "js_nodes_set_size"
+js_nodes_set_value = "js_nodes_set_value"
+js_edges_set_width = "js_edges_set_width"
+js_highlight_many = "js_highlight_many"
+js_animate = "js_animate"
+
+# Setters that can be collapsed inside a batch, with the indices of any arguments (besides the element id) that are part of the key
+batch_setters = {
+    js_node_set_value: (), js_node_set_position: (), js_node_set_label: (2,), js_node_set_size: (),
+    js_node_set_color: (), js_node_set_value_style: (), js_node_set_label_style: (2,),
+    js_edge_set_weight: (), js_edge_set_directed: (), js_edge_set_width: (), js_edge_set_color: (),
+    js_edge_set_weight_style: ()
+}
+
+# Columnar (bulk) events, as pairs of (ids argument index, values argument index)
+batch_columns = {
+    js_set_colors: ((0, 1), (2, 3)), js_nodes_set_size: ((0, 1),), js_nodes_set_value: ((0, 1),),
+    js_edges_set_width: ((0, 1),)
+}
@@ -1,40 +1,43 @@
 ﻿import pynode_core
+import pynode_columns
 import random
-from typing import List, Dict, Any, Optional, Union, Tuple
+import heapq
+from collections import deque, OrderedDict
+from typing import List, Dict, Set, Any, Optional, Union, Tuple
 
 def pause(time: int):
     pynode_core.add_event(pynode_core.EventPause(time))
 
+def _settle(time: int):
+    # The pause after a change that the renderer animates, which is left out inside a batch (the whole batch is followed by one instead)
+    if pynode_core.PynodeCoreGlobals.batch_depth == 0: pause(time)
+
 def delay(func, time: int, args: List[Any] = [], repeat: bool = False) -> int:
     def execute():
         pynode_core.execute_function(func, args)
-    if repeat:
-        delay_id = pynode_core.timer.set_interval(execute, time)
-        pynode_core.PynodeCoreGlobals.delay_type[delay_id] = 1
-        return delay_id
-    else:
-        delay_id = pynode_core.timer.set_timeout(execute, time)
-        pynode_core.PynodeCoreGlobals.delay_type[delay_id] = 0
-        return delay_id
+    return pynode_core.delays.add(execute, time, repeat)
 
 def cancel_delay(delay_id: int):
-    if delay_id in pynode_core.PynodeCoreGlobals.delay_type:
-        if pynode_core.PynodeCoreGlobals.delay_type[delay_id] == 1:
-            pynode_core.timer.clear_interval(delay_id)
-        else:
-            pynode_core.timer.clear_timeout(delay_id)
-        del pynode_core.PynodeCoreGlobals.delay_type[delay_id]
+    pynode_core.delays.cancel(delay_id)
 
 def clear_delays():
-    delay_ids = list(pynode_core.PynodeCoreGlobals.delay_type.keys())
-    for delay_id in delay_ids:
-        cancel_delay(delay_id)
+    pynode_core.delays.clear()
 
 def print_debug(value: Any):
     pynode_core.do_print(str(value) + "\n")
 
 def register_click_listener(func):
-    pynode_core.PynodeCoreGlobals.click_listener_func["f"] = func
+    pynode_core.PynodeCoreGlobals.listener_funcs["node_click"] = func
+
+def register_edge_click_listener(func):
+    pynode_core.PynodeCoreGlobals.listener_funcs["edge_click"] = func
+
+def register_hover_listener(func):
+    # func receives the hovered node, or None when the pointer leaves it
+    pynode_core.PynodeCoreGlobals.listener_funcs["node_hover"] = func
+
+def register_drag_end_listener(func):
+    pynode_core.PynodeCoreGlobals.listener_funcs["node_drag_end"] = func
 
 class Color:
     RED: 'Color'
@@ -48,19 +51,44 @@ class Color:
     BLACK: 'Color'
     TRANSPARENT: 'Color'
 
-    def __init__(self, red: int, green: int, blue: int, transparent: bool = False):
-        self._red = red
-        self._green = green
-        self._blue = blue
-        self._transparent = transparent
+    INTERN_LIMIT = 4096
+    _interned: Dict[Tuple[int, int, int, bool], 'Color'] = {}
+
+    def __new__(cls, red: int, green: int, blue: int, transparent: bool = False):
+        # Colors are immutable and interned, so the hex string of a repeated color is only formatted once.
+        # The table keeps the most recently created colors, so gradients with many distinct colors don't grow it without limit
+        key = (red, green, blue, transparent)
+        color = Color._interned.get(key)
+        if color is None:
+            if len(Color._interned) >= Color.INTERN_LIMIT: del Color._interned[next(iter(Color._interned))]
+            color = object.__new__(cls)
+            object.__setattr__(color, "_key", key)
+            object.__setattr__(color, "_red", red)
+            object.__setattr__(color, "_green", green)
+            object.__setattr__(color, "_blue", blue)
+            object.__setattr__(color, "_transparent", transparent)
+            object.__setattr__(color, "_hex", "transparent" if transparent else "#%02x%02x%02x" % (red, green, blue))
+            Color._interned[key] = color
+        return color
+
+    def __setattr__(self, name: str, value: Any):
+        raise AttributeError("Color is immutable")
+
+    def __reduce__(self):
+        return Color, (self._red, self._green, self._blue, self._transparent)
+
+    def __eq__(self, other: Any) -> bool:
+        return self is other or (isinstance(other, Color) and self._key == other._key)
+
+    def __hash__(self) -> int:
+        return hash(self._key)
 
     @staticmethod
     def rgb(red: int, green: int, blue: int) -> 'Color':
         return Color(red, green, blue)
 
     def hex_string(self) -> str:
-        if self._transparent: return "transparent"
-        else: return "#%02x%02x%02x" % (self._red, self._green, self._blue)
+        return self._hex
 
     def __str__(self) -> str:
         return f"({self._red},{self._green},{self._blue})"
@@ -87,19 +115,81 @@ Color.BLACK = Color(0, 0, 0)
 Color.TRANSPARENT = Color(0, 0, 0, True)
 
 class CustomStyle:
-    def __init__(self, size: int, color: Color, outline: Optional[Color] = Color.TRANSPARENT):
-        self._size = size
-        self._color = color
-        self._outline = outline
-        self._has_outline = outline is not None
+    INTERN_LIMIT = 4096
+    _interned: Dict[Tuple[Any, Color, Optional[Color]], 'CustomStyle'] = {}
+    _next_id = 0
+
+    def __new__(cls, size: int, color: Color, outline: Optional[Color] = Color.TRANSPARENT):
+        # Styles are immutable and interned (up to INTERN_LIMIT, like Color), and are sent to the renderer once and then referred to by id
+        key = (size, color, outline)
+        style = CustomStyle._interned.get(key)
+        if style is None:
+            if len(CustomStyle._interned) >= CustomStyle.INTERN_LIMIT: del CustomStyle._interned[next(iter(CustomStyle._interned))]
+            style = object.__new__(cls)
+            object.__setattr__(style, "_key", key)
+            object.__setattr__(style, "_size", size)
+            object.__setattr__(style, "_color", color)
+            object.__setattr__(style, "_outline", outline)
+            object.__setattr__(style, "_has_outline", outline is not None)
+            object.__setattr__(style, "_id", CustomStyle._next_id)
+            CustomStyle._next_id += 1
+            CustomStyle._interned[key] = style
+        return style
+
+    def __setattr__(self, name: str, value: Any):
+        raise AttributeError("CustomStyle is immutable")
+
+    def __reduce__(self):
+        return CustomStyle, (self._size, self._color, self._outline)
+
+    def __eq__(self, other: Any) -> bool:
+        return self is other or (isinstance(other, CustomStyle) and self._key == other._key)
+
+    def __hash__(self) -> int:
+        return hash(self._key)
+
+    def data(self) -> int:
+        return self._id
 
-    def data(self, element: Any) -> str:
-        return f"{self._size},{self._color.hex_string()},{element._color.hex_string() if self._outline is None else self._outline.hex_string()},{self._has_outline}"
+    def _register(self) -> int:
+        # Called when building an event that refers to the style, which is sent to the renderer first if it hasn't been yet.
+        # An outline of None follows the element's own color on the renderer side
+        return pynode_core.register_style(self._id, self._size, self._color.hex_string(), self._outline.hex_string() if self._has_outline else None)
 
     def __repr__(self) -> str:
         return f"CustomStyle(size={self._size}, color={self._color}, outline={self._outline})"
 
+class QueryCache:
+    # Results of read-only queries, kept with the version of the graph (or node) they were computed from, and recomputed once it changes
+    hits = 0
+    misses = 0
+    enabled = True
+
+    @staticmethod
+    def get(memo: Dict[Any, Tuple[int, Any]], key: Any, version: int, compute) -> Any:
+        entry = memo.get(key)
+        if entry is not None and entry[0] == version and QueryCache.enabled:
+            QueryCache.hits += 1
+            return entry[1]
+        QueryCache.misses += 1
+        value = compute()
+        memo[key] = (version, value)
+        return value
+
+    @staticmethod
+    def stats() -> Dict[str, Any]:
+        total = QueryCache.hits + QueryCache.misses
+        return {"hits": QueryCache.hits, "misses": QueryCache.misses, "hit_rate": QueryCache.hits / total if total > 0 else 0.0}
+
+    @staticmethod
+    def reset_stats():
+        QueryCache.hits = 0
+        QueryCache.misses = 0
+
 class Node:
+    # Nodes with at least this many edges cache their incoming/outgoing edges and degrees (see QueryCache)
+    CACHE_DEGREE = 32
+
     def __init__(self, id: Optional[Any] = None, value: Optional[Any] = None):
         if id is None:
             self._id = pynode_core.next_user_id()
@@ -108,7 +198,15 @@ class Node:
             
         self._value = value if value is not None else self._id
         self._incident_edges: List['Edge'] = []
+        # Bumped whenever an edge is added to or removed from the node, or one of its edges changes direction (see QueryCache)
+        self._version = 0
+        self._memo: Optional[Dict[Any, Tuple[int, Any]]] = None
         self._attributes: Dict[str, Any] = {}
+        # Set while the node is in a graph, attributes that have a column are kept there (see Graph.node_attr)
+        self._columns: Optional[pynode_columns.ColumnStore] = None
+        self._slot = -1
+        # Where the renderer's position snapshots have this node, given each time it's added to the graph (see pynode_core.next_node_slot)
+        self._position_slot = -1
         self._priority = 0
         self._position: Optional[List[int]] = None
         self._is_pos_relative = False
@@ -136,33 +234,53 @@ class Node:
     def incident_edges(self) -> List['Edge']:
         return list(self._incident_edges)
 
+    def cached(self, name: Any, compute) -> Any:
+        # Note: Returns compute() and keeps its result until an edge is added to or removed from the node, or changes direction
+        if self._memo is None: self._memo = {}
+        return QueryCache.get(self._memo, name, self._version, compute)
+
+    def _incoming(self) -> List['Edge']: return [e for e in self._incident_edges if not e._directed or e._target is self]
+    def _outgoing(self) -> List['Edge']: return [e for e in self._incident_edges if not e._directed or e._source is self]
+
+    # Only nodes with many edges keep their lists in the cache, for the others going through the cache costs more than it saves.
+    # A copy of the cached list is returned, so the cached one can't be changed.
     @property
     def incoming_edges(self) -> List['Edge']:
-        return [e for e in self._incident_edges if not e.directed or e.target == self]
+        if len(self._incident_edges) >= Node.CACHE_DEGREE: return list(self.cached("incoming_edges", self._incoming))
+        return [e for e in self._incident_edges if not e._directed or e._target is self]
 
     @property
     def outgoing_edges(self) -> List['Edge']:
-        return [e for e in self._incident_edges if not e.directed or e.source == self]
+        if len(self._incident_edges) >= Node.CACHE_DEGREE: return list(self.cached("outgoing_edges", self._outgoing))
+        return [e for e in self._incident_edges if not e._directed or e._source is self]
 
     def adjacent_nodes(self) -> List['Node']:
-        return [e.source if e.target is self else e.target for e in self._incident_edges]
+        return [e._source if e._target is self else e._target for e in self._incident_edges]
 
     def predecessor_nodes(self) -> List['Node']:
-        return [e.source if e.target is self else e.target for e in self.incoming_edges]
+        return [e._source if e._target is self else e._target for e in self.incoming_edges]
 
     def successor_nodes(self) -> List['Node']:
-        return [e.source if e.target is self else e.target for e in self.outgoing_edges]
+        return [e._source if e._target is self else e._target for e in self.outgoing_edges]
 
     def degree(self) -> int: return len(self._incident_edges)
-    def indegree(self) -> int: return len(self.incoming_edges)
-    def outdegree(self) -> int: return len(self.outgoing_edges)
+    def indegree(self) -> int: return len(self._incoming()) if len(self._incident_edges) < Node.CACHE_DEGREE else self.cached("indegree", lambda: len(self._incoming()))
+    def outdegree(self) -> int: return len(self._outgoing()) if len(self._incident_edges) < Node.CACHE_DEGREE else self.cached("outdegree", lambda: len(self._outgoing()))
 
     def set_attribute(self, name: str, value: Any) -> 'Node':
-        self._attributes[name] = value
+        if self._columns is not None and name in self._columns.columns: self._columns.columns[name].set_slot(self._slot, value)
+        else: self._attributes[name] = value
         return self
 
     def attribute(self, name: str) -> Any:
-        return self._attributes.get(name)
+        # An attribute is either in the element's own dictionary or in a column, never both
+        value = self._attributes.get(name)
+        if value is not None or self._columns is None: return value
+        column = self._columns.columns.get(name)
+        return column.get_slot(self._slot) if column is not None else None
+
+    def attributes(self) -> Dict[str, Any]:
+        return self._columns.attributes(self) if self._columns is not None else dict(self._attributes)
 
     @property
     def priority(self) -> int:
@@ -178,17 +296,15 @@ class Node:
 
     @property
     def position(self) -> Optional[Tuple[int, int]]:
-        # Note: Function should be used asynchronously in the online version. Call it in delayed and/or click listener functions.
-        data = pynode_core.get_data((pynode_core.Event(pynode_core.js_node_get_position, [self._internal_id])))
-        if graph.has_node(self) and data is not None and data[0] is not None and data[1] is not None:
-            return int(data[0]), int(data[1])
-        elif self._position is None:
-            return None
-        else:
-            if self._is_pos_relative and data is not None and data[2] is not None and data[3] is not None:
-                return int(self._position[0] * data[2]), int(self._position[1] * data[3])
-            else:
-                return int(self._position[0]), int(self._position[1])
+        # Note: Positions come from the renderer's last layout snapshot, so they're only up to date in delayed and/or click listener functions.
+        if graph.has_node(self):
+            pos = pynode_core.node_position(self._position_slot)
+            if pos is None:
+                pynode_core.request_positions()
+                pos = pynode_core.node_position(self._position_slot)
+            if pos is not None:
+                return int(pos[0]), int(pos[1])
+        return self._static_position()
 
     @position.setter
     def position(self, pos: Optional[Tuple[int, int]]):
@@ -201,9 +317,19 @@ class Node:
         self._position = [x, y]
         if x is None or y is None: self._position = None
         self._is_pos_relative = relative
+        pynode_core.PynodeCoreGlobals.positions_version += 1
         pynode_core.add_event(pynode_core.Event(pynode_core.js_node_set_position, [self._internal_id, x, y, relative]), self)
         return self
 
+    def _static_position(self) -> Optional[Tuple[int, int]]:
+        if self._position is None:
+            return None
+        width, height = pynode_core.PynodeCoreGlobals.canvas_size
+        if self._is_pos_relative and width is not None and height is not None:
+            return int(self._position[0] * width), int(self._position[1] * height)
+        else:
+            return int(self._position[0]), int(self._position[1])
+
     def set_label(self, text: str, label_id: int = 0) -> 'Node':
         self._labels[label_id] = text
         pynode_core.add_event(pynode_core.Event(pynode_core.js_node_set_label, [self._internal_id, str(text) if text is not None else "", label_id]), self)
@@ -232,25 +358,25 @@ class Node:
     @color.setter
     def color(self, new_color: Color):
         self._color = new_color
-        pynode_core.add_event(pynode_core.Event(pynode_core.js_node_set_color, [self._internal_id, new_color.hex_string(), self._value_style.data(self)]), self)
+        pynode_core.add_event(pynode_core.Event(pynode_core.js_node_set_color, [self._internal_id, new_color.hex_string()]), self)
 
     def set_color(self, color: Color) -> 'Node':
         self.color = color
         return self
 
     def set_text_size(self, size: int) -> 'Node':
-        self._value_style._size = size
-        pynode_core.add_event(pynode_core.Event(pynode_core.js_node_set_value_style, [self._internal_id, self._value_style.data(self)]), self)
+        self._value_style = CustomStyle(size, self._value_style._color, self._value_style._outline)
+        pynode_core.add_event(pynode_core.Event(pynode_core.js_node_set_value_style, [self._internal_id, self._value_style._register()]), self)
         return self
 
     def set_text_color(self, color: Color) -> 'Node':
-        self._value_style._color = color
-        pynode_core.add_event(pynode_core.Event(pynode_core.js_node_set_value_style, [self._internal_id, self._value_style.data(self)]), self)
+        self._value_style = CustomStyle(self._value_style._size, color, self._value_style._outline)
+        pynode_core.add_event(pynode_core.Event(pynode_core.js_node_set_value_style, [self._internal_id, self._value_style._register()]), self)
         return self
     
     def set_value_style(self, size: int = None, color: Color = None, outline: int = -1) -> 'Node':
         self._value_style = CustomStyle(self._value_style._size if size is None else size, self._value_style._color if color is None else color, self._value_style._outline if outline == -1 else outline)
-        pynode_core.add_event(pynode_core.Event(pynode_core.js_node_set_value_style, [self._internal_id, self._value_style.data(self)]), self)
+        pynode_core.add_event(pynode_core.Event(pynode_core.js_node_set_value_style, [self._internal_id, self._value_style._register()]), self)
         return self
 
     def set_label_style(self, size: int = None, color: Color = None, outline: Color = None, label_id: int = None) -> 'Node':
@@ -259,12 +385,12 @@ class Node:
             style2 = CustomStyle(self._label_styles[1]._size if size is None else size, self._label_styles[1]._color if color is None else color, self._label_styles[1]._outline if outline is None else outline)
             self._label_styles[0] = style1
             self._label_styles[1] = style2
-            pynode_core.add_event(pynode_core.Event(pynode_core.js_node_set_label_style, [self._internal_id, self._label_styles[0].data(self), 0]), self)
-            pynode_core.add_event(pynode_core.Event(pynode_core.js_node_set_label_style, [self._internal_id, self._label_styles[1].data(self), 1]), self)
+            pynode_core.add_event(pynode_core.Event(pynode_core.js_node_set_label_style, [self._internal_id, self._label_styles[0]._register(), 0]), self)
+            pynode_core.add_event(pynode_core.Event(pynode_core.js_node_set_label_style, [self._internal_id, self._label_styles[1]._register(), 1]), self)
         else:
             style = CustomStyle(self._label_styles[label_id]._size if size is None else size,Color.WHITE if color is None else color, outline)
             self._label_styles[label_id] = style
-            pynode_core.add_event(pynode_core.Event(pynode_core.js_node_set_label_style, [self._internal_id, self._label_styles[label_id].data(self), label_id]), self)
+            pynode_core.add_event(pynode_core.Event(pynode_core.js_node_set_label_style, [self._internal_id, self._label_styles[label_id]._register(), label_id]), self)
         return self
 
     def highlight(self, color: Color = None, size: int = None) -> None:
@@ -276,7 +402,7 @@ class Node:
         return self._id
 
     def _data(self) -> Dict[str, Any]:
-        d = {"id": self._internal_id, "label": str(self._value) if self._value is not None else "", "labelStyle": self._value_style.data(self), "topRightLabel": str(self._labels[0]) if self._labels[0] is not None else "", "topLeftLabel": str(self._labels[1]) if self._labels[1] is not None else "", "topRightLabelStyle": self._label_styles[0].data(self), "topLeftLabelStyle": self._label_styles[1].data(self), "r": self._size, "color": self._color.hex_string(), "fixed": (self._position is not None), "static": (self._position is not None), "ax": 0, "ay": 0, "rx": 0.0, "ry": 0.0, "relativePosition": False}
+        d = {"id": self._internal_id, "slot": self._position_slot, "label": str(self._value) if self._value is not None else "", "labelStyle": self._value_style._register(), "topRightLabel": str(self._labels[0]) if self._labels[0] is not None else "", "topLeftLabel": str(self._labels[1]) if self._labels[1] is not None else "", "topRightLabelStyle": self._label_styles[0]._register(), "topLeftLabelStyle": self._label_styles[1]._register(), "r": self._size, "color": self._color.hex_string(), "fixed": (self._position is not None), "static": (self._position is not None), "ax": 0, "ay": 0, "rx": 0.0, "ry": 0.0, "relativePosition": False}
         if self._position is not None:
             if self._is_pos_relative:
                 d["relativePosition"] = True
@@ -312,6 +438,10 @@ class Edge:
         self._weight = weight
         self._directed = directed
         self._attributes: Dict[str, Any] = {}
+        self._columns: Optional[pynode_columns.ColumnStore] = None
+        self._slot = -1
+        # Set while the edge is in a graph, whose version the weight and direction setters bump
+        self._graph: Optional['Graph'] = None
         self._priority = 0
         self._width = 2
         self._color = Color.LIGHT_GREY
@@ -344,6 +474,7 @@ class Edge:
     @weight.setter
     def weight(self, new_weight: Any):
         self._weight = new_weight
+        if self._graph is not None: self._graph._version += 1
         pynode_core.add_event(pynode_core.Event(pynode_core.js_edge_set_weight, [self._internal_id, str(new_weight) if new_weight is not None else ""]), self)
 
     def set_weight(self, weight: Any = None) -> 'Edge':
@@ -357,6 +488,10 @@ class Edge:
     @directed.setter
     def directed(self, is_directed: bool):
         self._directed = is_directed
+        if self._graph is not None: self._graph._version += 1
+        # Before the edge is added its ends can still be ids
+        for n in (self._source, self._target):
+            if isinstance(n, Node): n._version += 1
         pynode_core.add_event(pynode_core.Event(pynode_core.js_edge_set_directed, [self._internal_id, self._directed]), self)
 
     def set_directed(self, directed: bool = True) -> 'Edge':
@@ -369,11 +504,19 @@ class Edge:
         return self._source
 
     def set_attribute(self, name: str, value: Any) -> 'Edge':
-        self._attributes[name] = value
+        if self._columns is not None and name in self._columns.columns: self._columns.columns[name].set_slot(self._slot, value)
+        else: self._attributes[name] = value
         return self
 
     def attribute(self, name: str) -> Any:
-        return self._attributes.get(name)
+        # An attribute is either in the element's own dictionary or in a column, never both
+        value = self._attributes.get(name)
+        if value is not None or self._columns is None: return value
+        column = self._columns.columns.get(name)
+        return column.get_slot(self._slot) if column is not None else None
+
+    def attributes(self) -> Dict[str, Any]:
+        return self._columns.attributes(self) if self._columns is not None else dict(self._attributes)
 
     @property
     def priority(self) -> int:
@@ -415,7 +558,7 @@ class Edge:
 
     def set_weight_style(self, size: int = None, color: Color = None, outline: Color = None) -> 'Edge':
         self._weight_style = CustomStyle(self._weight_style._size if size is None else size, self._weight_style._color if color is None else color, self._weight_style._outline if outline is None else outline)
-        pynode_core.add_event(pynode_core.Event(pynode_core.js_edge_set_weight_style, [self._internal_id, self._weight_style.data(self)]), self)
+        pynode_core.add_event(pynode_core.Event(pynode_core.js_edge_set_weight_style, [self._internal_id, self._weight_style._register()]), self)
         return self
 
     def highlight(self, color: Color = None, width: int = None) -> None:
@@ -430,7 +573,7 @@ class Edge:
         pynode_core.add_event(pynode_core.Event(pynode_core.js_edge_traverse, [self._internal_id, start._internal_id, color.hex_string(), keep_path]), self)
 
     def _data(self) -> Dict[str, Any]:
-        d = {"id": self._internal_id, "source": self._source._internal_id, "target": self._target._internal_id, "weight": str(self._weight) if self._weight is not None else "", "directed": self._directed, "lineWidth": self._width, "weightStyle": self._weight_style.data(self), "stroke": self._color.hex_string()}
+        d = {"id": self._internal_id, "source": self._source._internal_id, "target": self._target._internal_id, "weight": str(self._weight) if self._weight is not None else "", "directed": self._directed, "lineWidth": self._width, "weightStyle": self._weight_style._register(), "stroke": self._color.hex_string()}
         return d
 
     def __hash__(self) -> int:
@@ -457,9 +600,16 @@ class Graph:
         self._nodes: Dict[Any, Node] = {}
         self._edges: List[Edge] = []
         self._has_edge_cache: Dict[Edge, bool] = {}
+        self._elements: Dict[int, Union[Node, Edge]] = {}
+        self._node_columns = pynode_columns.ColumnStore()
+        self._edge_columns = pynode_columns.ColumnStore()
         self._spread = 80
+        # Bumped by every change to the nodes, edges, weights or directions, so anything derived from them can tell when it's out of date
+        self._version = 0
+        self._memo: Dict[Any, Tuple[int, Any]] = {}
+        self._distance_oracles: Dict[bool, Any] = {}
 
-    def add_node(self, node_or_id: Union[Node, Any] = None, **kwds) -> Node:
+    def add_node(self, node_or_id: Union[Node, Any] = None, value: Any = None, **kwds) -> Node:
         # Compatibility with old signature add_node(*args, **kwds)
         # Old: args[0] might be ID, or Node object. kwds["node"] or kwds["id"]
         
@@ -467,34 +617,44 @@ class Graph:
         if isinstance(node_or_id, Node):
             n = node_or_id
         elif node_or_id is not None:
-            n = Node(id=node_or_id, value=kwds.get("value"))
+            n = Node(id=node_or_id, value=value)
         elif "node" in kwds:
             n = kwds["node"]
         elif "id" in kwds:
-             n = Node(id=kwds["id"], value=kwds.get("value"))
+             n = Node(id=kwds["id"], value=value)
         else:
-             n = Node(**kwds)
+             n = Node(value=value, **kwds)
 
         if n.id() in self._nodes:
             raise Exception(f"Duplicate node '{n.id()}'")
             
         self._nodes[n.id()] = n
-        pynode_core.add_event(pynode_core.Event(pynode_core.js_add_node, [n._data()]))
-        pause(25)
+        self._elements[n._internal_id] = n
+        self._node_columns.add(n)
+        n._position_slot = pynode_core.next_node_slot()
+        self._version += 1
+        # add_all turns events off and sends the data itself, so it isn't built twice
+        if pynode_core.PynodeCoreGlobals.do_events:
+            pynode_core.add_event(pynode_core.Event(pynode_core.js_add_node, [n._data()]))
+            _settle(25)
         return n
 
     def remove_node(self, node: Union[Node, Any]) -> Node:
         n = self.node(node)
         if n is None: return None
         
+        events_enabled = pynode_core.PynodeCoreGlobals.do_events
         pynode_core.enable_events(False)
         for e in n.incident_edges:
             self.remove_edge(e)
-        pynode_core.enable_events(True)
+        pynode_core.enable_events(events_enabled)
         
         del self._nodes[n.id()]
+        self._elements.pop(n._internal_id, None)
+        self._node_columns.remove(n)
+        self._version += 1
         pynode_core.add_event(pynode_core.Event(pynode_core.js_remove_node, [n._internal_id]))
-        pause(25)
+        _settle(25)
         return n
 
     def node(self, id: Union[Node, Any]) -> Optional[Node]:
@@ -508,6 +668,9 @@ class Graph:
         else:
             return None
 
+    def _element(self, internal_id: int) -> Optional[Union[Node, Edge]]:
+        return self._elements.get(internal_id)
+
     def nodes(self) -> List[Node]:
         return list(self._nodes.values())
 
@@ -559,10 +722,16 @@ class Graph:
 
         e._source._incident_edges.append(e)
         e._target._incident_edges.append(e)
+        e._source._version += 1
+        e._target._version += 1
         self._edges.append(e)
         self._has_edge_cache[e] = True
+        self._elements[e._internal_id] = e
+        self._edge_columns.add(e)
+        e._graph = self
+        self._version += 1
         
-        pynode_core.add_event(pynode_core.Event(pynode_core.js_add_edge, [e._data()]))
+        if pynode_core.PynodeCoreGlobals.do_events: pynode_core.add_event(pynode_core.Event(pynode_core.js_add_edge, [e._data()]))
         return e
 
     def remove_edge(self, edge: Union[Edge, Node, Any], v: Union[Node, Any] = None, directed: bool = False, **kwds) -> Union[Edge, List[Edge]]:
@@ -592,12 +761,18 @@ class Graph:
                 target_edge._source._incident_edges.remove(target_edge)
             if target_edge._target and target_edge in target_edge._target._incident_edges:
                 target_edge._target._incident_edges.remove(target_edge)
+            if target_edge._source: target_edge._source._version += 1
+            if target_edge._target: target_edge._target._version += 1
             
             if target_edge in self._edges:
                 self._edges.remove(target_edge)
                 
             if target_edge in self._has_edge_cache:
                 del self._has_edge_cache[target_edge]
+            self._elements.pop(target_edge._internal_id, None)
+            if target_edge._columns is self._edge_columns: self._edge_columns.remove(target_edge)
+            if target_edge._graph is self: target_edge._graph = None
+            self._version += 1
                 
             pynode_core.add_event(pynode_core.Event(pynode_core.js_remove_edge, [target_edge._internal_id]))
             return target_edge
@@ -640,7 +815,31 @@ class Graph:
     def edges_between_directed(self, source: Union[Node, Any], target: Union[Node, Any]) -> List[Edge]:
         return self.edges_between(source, target, True)
 
+    def positions(self) -> Dict[Any, Tuple[int, int]]:
+        # Note: Reads the renderer's last layout snapshot, see Node.position
+        positions = {}
+        requested = False
+        for n in self._nodes.values():
+            pos = pynode_core.node_position(n._position_slot)
+            if pos is None and not requested:
+                pynode_core.request_positions()
+                requested = True
+                pos = pynode_core.node_position(n._position_slot)
+            if pos is not None:
+                positions[n.id()] = (int(pos[0]), int(pos[1]))
+            elif n._position is not None:
+                positions[n.id()] = n._static_position()
+        return positions
+
+    def cached(self, name: Any, compute) -> Any:
+        # Note: Returns compute() and keeps its result until a node or edge is added or removed, or an edge's weight or direction changes
+        return QueryCache.get(self._memo, name, self._version, compute)
+
     def adjacency_matrix(self) -> Dict[Any, Dict[Any, int]]:
+        # Rows are copied from the cached matrix, which is much faster than counting the edges again
+        return {r: dict(row) for r, row in self.cached("adjacency_matrix", self._adjacency_matrix).items()}
+
+    def _adjacency_matrix(self) -> Dict[Any, Dict[Any, int]]:
         m = {}
         for r in self._nodes.values():
             row = {}
@@ -655,56 +854,49 @@ class Graph:
     def random(order: int, size: int, connected: bool = True, multigraph: bool = False, initial_id: int = 0) -> List[Union[Node, Edge]]:
         nodes: List[Node] = []
         edges: List[Edge] = []
-        adjacency_matrix = [[0 for c in range(order)] for r in range(order)]
+        # Index pairs that already have an edge, unordered unless it's a multigraph (where each ordered pair is used at most once)
+        used = set()
         edges_remaining = size
         id_list = random.sample(range(initial_id, initial_id + order), order)
-        
+
         for i in range(order):
             node = Node(id_list[i])
             if connected and edges_remaining > 0 and len(nodes) > 0:
-                connected_node = nodes[random.randint(0, len(nodes) - 1)]
+                j = random.randint(0, len(nodes) - 1)
+                connected_node = nodes[j]
                 if random.randint(0, 1) == 0:
                     edges.append(Edge(node, connected_node))
                 else:
                     edges.append(Edge(connected_node, node))
-                
-                # Update adjacency tracking for random generation logic
-                u_idx = id_list[i] - initial_id
-                v_idx = connected_node.id() - initial_id
-                adjacency_matrix[u_idx][v_idx] += 1
-                adjacency_matrix[v_idx][u_idx] += 1
+                if not multigraph: used.add((j, i))
                 edges_remaining -= 1
             nodes.append(node)
-            
-        possible_edges = [(i, j) for i in range(order) for j in range(order)]
-        random.shuffle(possible_edges)
-        
-        for e in possible_edges:
-            if edges_remaining <= 0: break
-            u_idx, v_idx = e[0], e[1]
-            
-            if (adjacency_matrix[u_idx][v_idx] == 0 and u_idx != v_idx) or multigraph:
-                # Need to lookup nodes by index in our local list or create edges by ID?
-                # The original code did `Edge(e[0] + initial_id, ...)` which implied Edge constructor took IDs. 
-                # But Edge constructor takes usage of `node()` which resolves IDs.
-                # However, we have the node objects in `nodes` list corresponding to `id_list`.
-                # Let's find the nodes by index to be safe.
-                # id_list[u_idx] is the ID.
-                # nodes[i] was created in order.
-                
-                # Careful: possible_edges indices are 0..order-1. nodes list is 0..order-1.
-                u_node = nodes[u_idx] 
-                v_node = nodes[v_idx]
-                
-                edges.append(Edge(u_node, v_node))
-                adjacency_matrix[u_idx][v_idx] += 1
-                adjacency_matrix[v_idx][u_idx] += 1
-                edges_remaining -= 1
-                
+
+        def try_add(u: int, v: int):
+            key = (u, v) if multigraph else (min(u, v), max(u, v))
+            if key in used or (u == v and not multigraph): return 0
+            used.add(key)
+            edges.append(Edge(nodes[u], nodes[v]))
+            return 1
+
+        available = order * order if multigraph else order * (order - 1) // 2 - len(used)
+        if edges_remaining * 2 > available:
+            # Dense graphs: going through every pair in a random order is cheaper than sampling
+            possible_edges = [(u, v) for u in range(order) for v in range(order)]
+            random.shuffle(possible_edges)
+            for u, v in possible_edges:
+                if edges_remaining <= 0: break
+                edges_remaining -= try_add(u, v)
+        else:
+            # Sparse graphs: sample pairs until enough new ones have been found
+            while edges_remaining > 0:
+                edges_remaining -= try_add(random.randrange(order), random.randrange(order))
+
         return nodes + edges
 
     def add_all(self, elements: List[Union[Node, Edge, Any]]):
         new_elements = []
+        events_enabled = pynode_core.PynodeCoreGlobals.do_events
         pynode_core.enable_events(False)
         for x in elements:
             if isinstance(x, Node):
@@ -714,12 +906,28 @@ class Graph:
             else:
                 # Assume it's a node ID
                 new_elements.append((0, self.add_node(Node(x))._data()))
-        pynode_core.enable_events(True)
+        pynode_core.enable_events(events_enabled)
         pynode_core.add_event(pynode_core.Event(pynode_core.js_add_all, [new_elements]))
-        pause(55)
+        _settle(55)
+
+    def load(self, source: Any, format: Optional[str] = None, directed: Optional[bool] = None, chunk_size: int = 10000, use_mmap: bool = False, progress=None) -> int:
+        # Note: Streams nodes and edges from a file path or file object into the graph (in add_all chunks), and returns how many were added. See pynode_io for the formats.
+        import pynode_io
+        return pynode_io.load(self, source, format, directed, chunk_size, use_mmap, progress)
+
+    def save_snapshot(self, path: Optional[str] = None, download: bool = False) -> bytes:
+        # Note: Returns the nodes, edges, attributes, styles and positions in a compact binary format. Under CPython path is a file, in the browser it's a name in local storage, and download also saves it as a file.
+        import pynode_io
+        return pynode_io.save_snapshot(self, path, download)
+
+    def load_snapshot(self, source: Any):
+        # Note: Replaces the graph with a snapshot from save_snapshot, given as bytes, a file object, or a path (a local storage name in the browser)
+        import pynode_io
+        pynode_io.load_snapshot(self, source)
 
     def remove_all(self, elements: List[Union[Node, Edge, Any]]):
         new_elements = []
+        events_enabled = pynode_core.PynodeCoreGlobals.do_events
         pynode_core.enable_events(False)
         for x in elements:
             if isinstance(x, Node):
@@ -731,9 +939,307 @@ class Graph:
             else:
                 val = self.remove_node(self.node(x))
                 if val: new_elements.append((0, val._data()))
-        pynode_core.enable_events(True)
+        pynode_core.enable_events(events_enabled)
         pynode_core.add_event(pynode_core.Event(pynode_core.js_remove_all, [new_elements]))
-        pause(55)
+        _settle(55)
+
+    @staticmethod
+    def _bulk_column(values: Any, count: int) -> List[Any]:
+        # A list gives one value per element, anything else is shared by all of them
+        if isinstance(values, list):
+            if len(values) != count: raise Exception(f"Expected {count} values, got {len(values)}.")
+            return values
+        return [values] * count
+
+    def _bulk_nodes(self, nodes: List[Union[Node, Any]], values: Any) -> Tuple[List[Node], List[Any]]:
+        found_nodes, found_values = [], []
+        for x, v in zip(nodes, self._bulk_column(values, len(nodes))):
+            n = self.node(x)
+            if n is not None:
+                found_nodes.append(n); found_values.append(v)
+        return found_nodes, found_values
+
+    def _bulk_edges(self, edges: List[Edge], values: Any) -> Tuple[List[Edge], List[Any]]:
+        found_edges, found_values = [], []
+        for e, v in zip(edges, self._bulk_column(values, len(edges))):
+            if isinstance(e, Edge) and self.has_edge(e):
+                found_edges.append(e); found_values.append(v)
+        return found_edges, found_values
+
+    def set_colors(self, elements: List[Union[Node, Edge, Any]], colors: Union[Color, List[Color]]):
+        column = self._bulk_column(colors, len(elements))
+        nodes, node_colors = self._bulk_nodes([x for x in elements if not isinstance(x, Edge)], [c for x, c in zip(elements, column) if not isinstance(x, Edge)])
+        edges, edge_colors = self._bulk_edges([x for x in elements if isinstance(x, Edge)], [c for x, c in zip(elements, column) if isinstance(x, Edge)])
+        for n, c in zip(nodes, node_colors): n._color = c
+        for e, c in zip(edges, edge_colors): e._color = c
+        node_hex = colors.hex_string() if isinstance(colors, Color) else [c.hex_string() for c in node_colors]
+        edge_hex = colors.hex_string() if isinstance(colors, Color) else [c.hex_string() for c in edge_colors]
+        pynode_core.add_event(pynode_core.Event(pynode_core.js_set_colors, [[n._internal_id for n in nodes], node_hex, [e._internal_id for e in edges], edge_hex]))
+
+    def set_sizes(self, nodes: List[Union[Node, Any]], sizes: Union[int, List[int]]):
+        found_nodes, found_sizes = self._bulk_nodes(nodes, sizes)
+        for n, size in zip(found_nodes, found_sizes): n._size = size
+        pynode_core.add_event(pynode_core.Event(pynode_core.js_nodes_set_size, [[n._internal_id for n in found_nodes], found_sizes if isinstance(sizes, list) else sizes]))
+
+    def set_values(self, nodes: List[Union[Node, Any]], values: Union[Any, List[Any]]):
+        found_nodes, found_values = self._bulk_nodes(nodes, values)
+        for n, value in zip(found_nodes, found_values): n._value = value
+        text = [str(v) if v is not None else "" for v in found_values] if isinstance(values, list) else (str(values) if values is not None else "")
+        pynode_core.add_event(pynode_core.Event(pynode_core.js_nodes_set_value, [[n._internal_id for n in found_nodes], text]))
+
+    def set_widths(self, edges: List[Edge], widths: Union[int, List[int]]):
+        found_edges, found_widths = self._bulk_edges(edges, widths)
+        for e, width in zip(found_edges, found_widths): e._width = width
+        pynode_core.add_event(pynode_core.Event(pynode_core.js_edges_set_width, [[e._internal_id for e in found_edges], found_widths if isinstance(widths, list) else widths]))
+
+    def highlight_many(self, elements: List[Union[Node, Edge, Any]], color: Color = None, size: int = None):
+        # Nodes grow to size (default 1.5x their own size), edges to twice their width
+        if color is None: color = Color.RED
+        nodes, _ = self._bulk_nodes([x for x in elements if not isinstance(x, Edge)], None)
+        edges, _ = self._bulk_edges([x for x in elements if isinstance(x, Edge)], None)
+        pynode_core.add_event(pynode_core.Event(pynode_core.js_highlight_many, [[n._internal_id for n in nodes], [e._internal_id for e in edges], color.hex_string(), size]))
+
+    def _animate(self, steps: List[List[List[Any]]], step_ms: int):
+        # A single event holding every call of the animation with the time it starts at, which the renderer plays out by itself
+        timeline = [[i * step_ms, call[0], call[1]] for i, step in enumerate(steps) for call in step]
+        pynode_core.add_event(pynode_core.EventAnimation(pynode_core.js_animate, [timeline], len(steps) * step_ms))
+
+    def _path_edges(self, path: List[Union[Node, Edge, Any]]) -> List[Tuple[Node, Edge]]:
+        # The edges along a path given as nodes (each one adjacent to the next) or as edges, with the node each edge is traversed from
+        if len(path) == 0: return []
+        if all(isinstance(x, Edge) for x in path):
+            for e in path:
+                if not self.has_edge(e): raise Exception(f"'{e}' isn't in the graph")
+            start = path[0]._source
+            if len(path) > 1 and path[0]._source in (path[1]._source, path[1]._target) and path[0]._target not in (path[1]._source, path[1]._target): start = path[0]._target
+            edges = []
+            for e in path:
+                edges.append((start, e))
+                start = e.other_node(start)
+            return edges
+        nodes = []
+        for x in path:
+            n = self.node(x)
+            if n is None: raise Exception(f"'{x}' isn't in the graph")
+            nodes.append(n)
+        edges = []
+        for a, b in zip(nodes, nodes[1:]):
+            between = self.edges_between_directed(a, b) or self.edges_between(a, b)
+            if len(between) == 0: raise Exception(f"'{a.id()}' and '{b.id()}' aren't adjacent")
+            edges.append((a, between[0]))
+        return edges
+
+    def animate_path(self, path: List[Union[Node, Edge, Any]], color: Color = Color.RED, step_ms: int = 500, keep_path: bool = True):
+        # Note: Traverses the edges of a path (a list of nodes, or of edges) one after the other, step_ms apart. This is sent as one event that the renderer times by itself, rather than an edge.traverse(...) and a pause(...) for each step, and the events after it wait until it has finished.
+        self._animate([[[pynode_core.js_edge_traverse, [e._internal_id, start._internal_id, color.hex_string(), keep_path]]] for start, e in self._path_edges(path)], step_ms)
+
+    def animate_sequence(self, steps: List[Any], color: Color = Color.RED, step_ms: int = 500, keep_path: bool = True):
+        # Note: Each step is a node or edge, or a list of them that are animated together. Nodes are highlighted and edges are traversed, starting from an end that an earlier step reached if there is one (otherwise from the source).
+        reached = set()
+        calls = []
+        for step in steps:
+            actions, arrived = [], []
+            for x in (step if isinstance(step, (list, tuple, set)) else [step]):
+                if isinstance(x, Edge):
+                    if not self.has_edge(x): continue
+                    start = x._target if x._target in reached and x._source not in reached else x._source
+                    actions.append([pynode_core.js_edge_traverse, [x._internal_id, start._internal_id, color.hex_string(), keep_path]])
+                    arrived.append(x.other_node(start))
+                else:
+                    n = self.node(x)
+                    if n is None: continue
+                    actions.append([pynode_core.js_node_highlight, [n._internal_id, n._size * 1.5, color.hex_string()]])
+                    arrived.append(n)
+            reached.update(arrived)
+            calls.append(actions)
+        self._animate(calls, step_ms)
+
+    def animate_bfs_layers(self, layers: List[List[Union[Node, Any]]], color: Color = Color.RED, step_ms: int = 500, keep_path: bool = True):
+        # Note: A wavefront: the first layer's nodes are highlighted, then the edges from each layer to the next are traversed together and the next layer's nodes highlighted, and so on
+        steps = []
+        previous = set()
+        for i, layer in enumerate(layers):
+            nodes = [n for n in (self.node(x) for x in layer) if n is not None]
+            if i > 0: steps.append([e for n in nodes for e in n._incident_edges if e.other_node(n) in previous and (not e._directed or e._target is n)])
+            steps.append(nodes)
+            previous = set(nodes)
+        self.animate_sequence(steps, color, step_ms, keep_path)
+
+    def batch(self) -> 'GraphBatch':
+        # Usage: with graph.batch(): ... Mutations inside are sent to the renderer as a single diff when the outermost batch ends
+        return GraphBatch(self)
+
+    def _flush_batch(self, events: List[Any]):
+        clear = False
+        added: Dict[int, int] = {}
+        removed: Dict[int, int] = {}
+        kept: List[Any] = []
+        setters: Dict[Tuple[Any, ...], int] = {}
+        for event in events:
+            func, args = event.func, event.args
+            if func == pynode_core.js_clear:
+                clear = True; added = {}; removed = {}; kept = []; setters = {}
+            elif func == pynode_core.js_add_node or func == pynode_core.js_add_edge:
+                added[args[0]["id"]] = 0 if func == pynode_core.js_add_node else 1
+            elif func == pynode_core.js_add_all:
+                for kind, data in args[0]: added[data["id"]] = kind
+            elif func == pynode_core.js_remove_node or func == pynode_core.js_remove_edge:
+                self._batch_remove(args[0], 0 if func == pynode_core.js_remove_node else 1, added, removed)
+            elif func == pynode_core.js_remove_all:
+                for kind, data in args[0]: self._batch_remove(data["id"], kind, added, removed)
+            elif func in pynode_core.batch_setters or func == pynode_core.js_set_spread:
+                # Only the latest call of a setter on an element is kept
+                key = (func,) if func == pynode_core.js_set_spread else (func, args[0]) + tuple(args[i] for i in pynode_core.batch_setters[func])
+                if key in setters: kept[setters[key]] = None
+                setters[key] = len(kept)
+                kept.append(event)
+            else:
+                kept.append(event)
+
+        # Elements added in the batch are sent with their final state, so their setters can be dropped
+        added_data = [[kind, self._elements[i]._data()] for i, kind in added.items() if i in self._elements]
+        added_ids = set(i for i, kind in added.items() if i in self._elements)
+        element_events = []
+        other_events = []
+        for event in kept:
+            if event is None: continue
+            func, args = event.func, event.args
+            if not isinstance(func, str):
+                other_events.append(event)
+                continue
+            if func in pynode_core.batch_columns:
+                args = list(args)
+                for ids_index, values_index in pynode_core.batch_columns[func]:
+                    keep = [i for i, x in enumerate(args[ids_index]) if x in self._elements and x not in added_ids]
+                    if isinstance(args[values_index], list): args[values_index] = [args[values_index][i] for i in keep]
+                    args[ids_index] = [args[ids_index][i] for i in keep]
+            elif func.startswith("js_node_") or func.startswith("js_edge_"):
+                if args[0] not in self._elements or (func in pynode_core.batch_setters and args[0] in added_ids): continue
+            element_events.append([func, args])
+
+        for event in other_events: pynode_core.add_event(event)
+        if not clear and len(removed) == 0 and len(added_data) == 0 and len(element_events) == 0: return
+        pynode_core.add_event(pynode_core.Event(pynode_core.js_batch, [clear, [[kind, i] for i, kind in removed.items()], added_data, element_events]))
+        if clear or len(removed) > 0 or len(added_data) > 0: pause(55)
+
+    @staticmethod
+    def _batch_remove(internal_id: int, kind: int, added: Dict[int, int], removed: Dict[int, int]):
+        # Removing an element that was added in the same batch cancels both
+        if internal_id in added: del added[internal_id]
+        else: removed[internal_id] = kind
+
+    @staticmethod
+    def _id_filter(nodes: List[Union[Node, Any]]):
+        ids = set(n.id() if isinstance(n, Node) else n for n in nodes)
+        return lambda n: n._id in ids
+
+    def subgraph(self, nodes: List[Union[Node, Any]]) -> 'GraphView':
+        # Note: A read-only view of the given nodes and the edges between them, see GraphView
+        return GraphView(self, Graph._id_filter(nodes))
+
+    def filter(self, node_filter=None, edge_filter=None, cache: bool = False) -> 'GraphView':
+        # Note: A read-only view of the nodes and edges for which the given functions return True (edges also need both of their nodes to be in the view), see GraphView
+        return GraphView(self, node_filter, edge_filter, cache)
+
+    def _spatial_index(self) -> Any:
+        # A grid over the same positions as positions(), rebuilt once the renderer sends a new snapshot, a position is set, or the nodes change
+        import pynode_spatial
+        if pynode_core.PynodeCoreGlobals.positions_count == 0 and len(self._nodes) > 0: pynode_core.request_positions()
+        def build():
+            points = []
+            for n in self._nodes.values():
+                pos = pynode_core.node_position(n._position_slot)
+                if pos is None and n._position is not None: pos = n._static_position()
+                if pos is not None: points.append((pos[0], pos[1], n))
+            return pynode_spatial.SpatialGrid(points)
+        return QueryCache.get(self._memo, "_spatial_index", (self._version, pynode_core.PynodeCoreGlobals.positions_version), build)
+
+    def nodes_near(self, x: float, y: float, r: float) -> List[Node]:
+        # Note: The nodes within distance r of (x, y), nearest first. Like positions(), this uses the renderer's last layout snapshot (and the positions set on nodes that aren't rendered yet).
+        return self._spatial_index().near(x, y, r)
+
+    def nodes_in_rect(self, x1: float, y1: float, x2: float, y2: float) -> List[Node]:
+        return self._spatial_index().in_rect(x1, y1, x2, y2)
+
+    def nearest_node(self, x: float, y: float) -> Optional[Node]:
+        nearest = self._spatial_index().nearest(x, y, 1)
+        return nearest[0] if len(nearest) > 0 else None
+
+    def nearest_nodes(self, x: float, y: float, k: int) -> List[Node]:
+        return self._spatial_index().nearest(x, y, k)
+
+    def node_attr(self, name: str) -> pynode_columns.AttributeColumn:
+        # Note: From the first call, the attribute is kept in a single column for all nodes (node.attribute() still works as before), which can be filtered and aggregated without a loop over the nodes
+        return self._node_columns.column(name)
+
+    def edge_attr(self, name: str) -> pynode_columns.AttributeColumn:
+        return self._edge_columns.column(name)
+
+    def distance_oracle(self, weighted: bool = True, max_sources: int = 64) -> Any:
+        # Note: Answers shortest path queries from single source trees that are kept (for the max_sources most recently used sources) until the graph changes. The graph keeps one oracle for weighted and one for unweighted (hop count) distances.
+        import pynode_algorithms
+        oracle = self._distance_oracles.get(weighted)
+        if oracle is None: oracle = self._distance_oracles[weighted] = pynode_algorithms.DistanceOracle(self, weighted, max_sources)
+        oracle.max_sources = max_sources
+        return oracle
+
+    def distance(self, source: Union[Node, Any], target: Union[Node, Any], weighted: bool = True) -> Any:
+        # Note: The length of the shortest path from source to target (edges without a weight count as 1), or None if there isn't one
+        return self.distance_oracle(weighted).distance(source, target)
+
+    def shortest_path(self, source: Union[Node, Any], target: Union[Node, Any], weighted: bool = True) -> Optional[List[Edge]]:
+        return self.distance_oracle(weighted).path(source, target)
+
+    def pareto_paths(self, source: Union[Node, Any], target: Union[Node, Any], criteria: List[Any] = ["time", "cost"], epsilon: float = 0.0, max_paths: Optional[int] = None) -> List[Any]:
+        # Note: The paths from source to target that no other path beats on every criterion (edge attribute names, 'weight' or functions of an edge), cheapest first by the first criterion. A small epsilon (e.g. 0.05) drops paths within that fraction of one already found, which is much faster on large graphs.
+        import pynode_algorithms
+        return pynode_algorithms.pareto_paths(self, source, target, criteria, epsilon, max_paths)
+
+    def bfs_layers(self, sources: Union[Node, Any, List[Union[Node, Any]]], visit=None) -> List[List[Node]]:
+        # Note: The traversals below use explicit stacks and queues over a compact copy of the edges (kept until the graph changes), so they work on graphs of millions of edges without recursion. visit is an optional function that's called as they go, e.g. to animate them: visit(node, edge) for bfs_layers and dfs (edge is the one the node was reached by, or None).
+        import pynode_algorithms
+        return pynode_algorithms.bfs_layers(self, sources, visit)
+
+    def dfs(self, source: Union[Node, Any, None] = None, visit=None) -> Tuple[List[Node], List[Node]]:
+        # Note: Returns (preorder, postorder). Without a source, every node is searched from in turn until all of them have been reached.
+        import pynode_algorithms
+        return pynode_algorithms.dfs(self, source, visit)
+
+    def topological_sort(self, visit=None) -> List[Node]:
+        # Note: visit(node) is called in order. Raises an exception if an edge isn't directed or there's a cycle.
+        import pynode_algorithms
+        return pynode_algorithms.topological_sort(self, visit)
+
+    def strongly_connected_components(self, visit=None) -> List[List[Node]]:
+        # Note: visit(component) is called as each list of nodes is found
+        import pynode_algorithms
+        return pynode_algorithms.strongly_connected_components(self, visit)
+
+    def bridges(self, visit=None) -> List[Edge]:
+        import pynode_algorithms
+        return pynode_algorithms.bridges(self, visit)
+
+    def articulation_points(self, visit=None) -> List[Node]:
+        import pynode_algorithms
+        return pynode_algorithms.articulation_points(self, visit)
+
+    def pagerank(self, damping: float = 0.85, weighted: bool = False, tolerance: float = 1e-6, max_iterations: int = 200) -> Dict[Node, float]:
+        # Note: The centrality methods return a dict of scores by node, which can size or colour the nodes by score, e.g. graph.set_sizes(scores.nodes(), scores.scaled(10, 40)) or graph.set_colors(scores.nodes(), scores.colors(Color.BLUE, Color.RED)). scores.error is how far the scores may be from the exact ones (with 95% confidence when sampled), or None if it isn't known.
+        import pynode_algorithms
+        return pynode_algorithms.pagerank(self, damping, weighted, tolerance, max_iterations)
+
+    def betweenness(self, k: Optional[int] = None, normalized: bool = True, weighted: bool = False, seed: Any = None) -> Dict[Node, float]:
+        # Note: With k, only the shortest paths from k randomly chosen nodes are counted, which is much faster on large graphs (e.g. k=100 gives scores within 0.14 of the exact ones).
+        import pynode_algorithms
+        return pynode_algorithms.betweenness(self, k, normalized, weighted, seed)
+
+    def closeness(self, k: Optional[int] = None, weighted: bool = False, seed: Any = None) -> Dict[Node, float]:
+        import pynode_algorithms
+        return pynode_algorithms.closeness(self, k, weighted, seed)
+
+    def degree_centrality(self, direction: str = "all") -> Dict[Node, float]:
+        import pynode_algorithms
+        return pynode_algorithms.degree_centrality(self, direction)
 
     def order(self) -> int: return len(self._nodes)
     def size(self) -> int: return len(self._edges)
@@ -747,16 +1253,362 @@ class Graph:
         pynode_core.add_event(pynode_core.Event(pynode_core.js_clear, []))
 
     def _reset(self):
+        for e in self._edges: e._graph = None
         self._nodes = {}
         self._edges = []
         self._has_edge_cache = {}
+        self._elements = {}
+        self._node_columns.clear()
+        self._edge_columns.clear()
+        self._version += 1
+        self._memo = {}
+
+class GraphBatch:
+    def __init__(self, graph: Graph):
+        self._graph = graph
+
+    def __enter__(self) -> Graph:
+        pynode_core.begin_batch(self._graph._flush_batch)
+        return self._graph
+
+    def __exit__(self, exc_type, exc_value, traceback) -> bool:
+        # Runs even if the block raised, so the renderer always catches up with the graph's state
+        events = pynode_core.end_batch()
+        if events is not None: self._graph._flush_batch(events)
+        return False
+
+class GraphView:
+    # A read-only view of part of a graph. It shares the graph's nodes and edges (nothing is copied, and no events are sent),
+    # and its filters are applied whenever it's used, so it follows changes to the graph. With cache=True, each element's
+    # result is only computed once (call refresh() if the attributes the filters depend on change).
+    def __init__(self, graph: Graph, node_filter=None, edge_filter=None, cache: bool = False):
+        self._graph = graph
+        self._node_filter = node_filter
+        self._edge_filter = edge_filter
+        self._cache: Optional[Dict[Union[Node, Edge], bool]] = {} if cache else None
+
+    def refresh(self):
+        if self._cache is not None: self._cache = {}
+
+    def _includes(self, element: Union[Node, Edge], predicate) -> bool:
+        if predicate is None: return True
+        if self._cache is None: return bool(predicate(element))
+        result = self._cache.get(element)
+        if result is None: result = self._cache[element] = bool(predicate(element))
+        return result
+
+    def _has(self, n: Node) -> bool:
+        return self._graph._nodes.get(n._id) is n and self._includes(n, self._node_filter)
+
+    def _has_edge(self, e: Edge) -> bool:
+        return e in self._graph._has_edge_cache and self._has(e._source) and self._has(e._target) and self._includes(e, self._edge_filter)
+
+    def node(self, id: Union[Node, Any]) -> Optional[Node]:
+        n = self._graph.node(id)
+        return n if n is not None and self._has(n) else None
+
+    def nodes(self) -> List[Node]:
+        return [n for n in self._graph._nodes.values() if self._has(n)]
+
+    def edges(self) -> List[Edge]:
+        return [e for e in self._graph._edges if self._has_edge(e)]
+
+    def __iter__(self):
+        return iter(self.nodes())
+
+    def __contains__(self, item: Union[Node, Edge]) -> bool:
+        if isinstance(item, Node): return self.has_node(item)
+        if isinstance(item, Edge): return self.has_edge(item)
+        return False
+
+    def has_node(self, node: Union[Node, Any]) -> bool:
+        return self.node(node) is not None
+
+    def has_edge(self, edge: Edge) -> bool:
+        return isinstance(edge, Edge) and self._has_edge(edge)
+
+    def order(self) -> int: return len(self.nodes())
+    def size(self) -> int: return len(self.edges())
+
+    def incident_edges(self, node: Union[Node, Any]) -> List[Edge]:
+        n = self.node(node)
+        return [e for e in n._incident_edges if self._has_edge(e)] if n is not None else []
+
+    def incoming_edges(self, node: Union[Node, Any]) -> List[Edge]:
+        n = self.node(node)
+        return [e for e in n._incident_edges if (not e._directed or e._target is n) and self._has_edge(e)] if n is not None else []
+
+    def outgoing_edges(self, node: Union[Node, Any]) -> List[Edge]:
+        n = self.node(node)
+        return [e for e in n._incident_edges if (not e._directed or e._source is n) and self._has_edge(e)] if n is not None else []
+
+    def adjacent_nodes(self, node: Union[Node, Any]) -> List[Node]:
+        n = self.node(node)
+        return [e._source if e._target is n else e._target for e in self.incident_edges(n)] if n is not None else []
+
+    def predecessor_nodes(self, node: Union[Node, Any]) -> List[Node]:
+        n = self.node(node)
+        return [e._source if e._target is n else e._target for e in self.incoming_edges(n)] if n is not None else []
+
+    def successor_nodes(self, node: Union[Node, Any]) -> List[Node]:
+        n = self.node(node)
+        return [e._source if e._target is n else e._target for e in self.outgoing_edges(n)] if n is not None else []
+
+    def degree(self, node: Union[Node, Any]) -> int: return len(self.incident_edges(node))
+    def indegree(self, node: Union[Node, Any]) -> int: return len(self.incoming_edges(node))
+    def outdegree(self, node: Union[Node, Any]) -> int: return len(self.outgoing_edges(node))
+
+    def adjacent(self, node1: Union[Node, Any], node2: Union[Node, Any], directed: bool = False) -> bool:
+        return len(self.edges_between(node1, node2, directed)) > 0
+
+    def adjacent_directed(self, source: Union[Node, Any], target: Union[Node, Any]) -> bool:
+        return self.adjacent(source, target, True)
+
+    def edges_between(self, node1: Union[Node, Any], node2: Union[Node, Any], directed: bool = False) -> List[Edge]:
+        n1 = self.node(node1)
+        n2 = self.node(node2)
+        if n1 is None or n2 is None: return []
+        edge_list = self.outgoing_edges(n1) if directed else self.incident_edges(n1)
+        return [e for e in edge_list if (e._target if e._source is n1 else e._source) is n2]
+
+    def edges_between_directed(self, source: Union[Node, Any], target: Union[Node, Any]) -> List[Edge]:
+        return self.edges_between(source, target, True)
+
+    def adjacency_matrix(self) -> Dict[Any, Dict[Any, int]]:
+        nodes = self.nodes()
+        m = {r.id(): {c.id(): 0 for c in nodes} for r in nodes}
+        for r in nodes:
+            for c in self.successor_nodes(r): m[r.id()][c.id()] += 1
+        return m
+
+    def subgraph(self, nodes: List[Union[Node, Any]]) -> 'GraphView':
+        return self.filter(Graph._id_filter(nodes))
+
+    def filter(self, node_filter=None, edge_filter=None, cache: bool = False) -> 'GraphView':
+        # Views of views keep the filters of the view they come from
+        parent_node_filter, parent_edge_filter = self._node_filter, self._edge_filter
+        if parent_node_filter is not None and node_filter is not None:
+            inner_node_filter = node_filter
+            node_filter = lambda n: parent_node_filter(n) and inner_node_filter(n)
+        elif node_filter is None:
+            node_filter = parent_node_filter
+        if parent_edge_filter is not None and edge_filter is not None:
+            inner_edge_filter = edge_filter
+            edge_filter = lambda e: parent_edge_filter(e) and inner_edge_filter(e)
+        elif edge_filter is None:
+            edge_filter = parent_edge_filter
+        return GraphView(self._graph, node_filter, edge_filter, cache)
+
+    def pareto_paths(self, source: Union[Node, Any], target: Union[Node, Any], criteria: List[Any] = ["time", "cost"], epsilon: float = 0.0, max_paths: Optional[int] = None) -> List[Any]:
+        import pynode_algorithms
+        return pynode_algorithms.pareto_paths(self, source, target, criteria, epsilon, max_paths)
+
+    def __repr__(self) -> str:
+        return f"GraphView(order={self.order()}, size={self.size()})"
+
+def _freeze(state: Any) -> Any:
+    # The default state key: lists (and lists of lists, such as grids) become tuples so they can be hashed
+    if isinstance(state, list): return tuple(_freeze(x) for x in state)
+    if isinstance(state, set): return frozenset(state)
+    return state
+
+class StateExplorer:
+    # Explores a state space given by a start state and a function returning the states that follow a state. Nothing is
+    # generated until it's needed: each step() expands one state (in 'bfs', 'dfs', 'best' first or 'iddfs' order), and
+    # only expanded states become nodes on the graph, which are added in batches. States that have already been seen are
+    # recognised by their key, in a table that forgets the least recently seen states once it holds max_states of them (along
+    # with their nodes, so a state that's reached again after being forgotten gets a new node). Nodes are given fresh ids, so
+    # they never clash with the graph's other nodes: use node(state) and state(node) to go between the two.
+    STRATEGIES = ["bfs", "dfs", "best", "iddfs"]
+
+    def __init__(self, start: Any, successors, key=None, strategy: str = "bfs", heuristic=None, goal=None, label=None,
+                 max_states: Optional[int] = None, max_depth: Optional[int] = None, materialise: bool = True, batch_size: int = 50, graph: Optional[Graph] = None):
+        if strategy not in StateExplorer.STRATEGIES: raise Exception(f"Unknown strategy '{strategy}', expected one of {', '.join(StateExplorer.STRATEGIES)}")
+        if strategy == "best" and heuristic is None: raise Exception("The 'best' strategy needs a heuristic function")
+        self._start = start
+        self._successors = successors
+        self._key = key if key is not None else _freeze
+        self._strategy = strategy
+        self._heuristic = heuristic
+        self._goal = goal
+        self._label = label
+        self._max_states = max_states
+        self._max_depth = max_depth
+        self._materialise = materialise
+        self._batch_size = batch_size
+        self._graph = graph if graph is not None else globals()["graph"]
+        # Transposition table: key -> [depth it was first reached at, keys of other states that lead to it]
+        self._table: 'OrderedDict[Any, List[Any]]' = OrderedDict()
+        self._frontier: Any = [] if strategy in ("dfs", "iddfs", "best") else deque()
+        self._counter = 0
+        self._depth_limit = 0
+        self._cut_off = False
+        # Key -> node, and the node's internal id -> key
+        self._nodes: 'OrderedDict[Any, Node]' = OrderedDict()
+        self._keys: Dict[int, Any] = {}
+        # Key -> internal ids of the nodes its node has an edge to
+        self._links: Dict[Any, Set[int]] = {}
+        self._parent_edges: Dict[Any, Edge] = {}
+        self._pending: List[Union[Node, Edge]] = []
+        self.expanded = 0
+        self.done = False
+        self.goal: Optional[Node] = None
+        self.goal_state: Any = None
+        self._push(start, self._key(start), 0, None)
+
+    def _push(self, state: Any, key: Any, depth: int, parent_key: Any):
+        self._table[key] = [depth, None]
+        if self._max_states is not None and len(self._table) > self._max_states: self._forget(self._table.popitem(last=False)[0])
+        item = (state, key, depth, parent_key)
+        if self._strategy == "bfs": self._frontier.append(item)
+        elif self._strategy == "best":
+            heapq.heappush(self._frontier, (self._heuristic(state), self._counter, item))
+            self._counter += 1
+        else: self._frontier.append(item)
+
+    def _pop(self) -> Optional[Tuple[Any, Any, int, Any]]:
+        if len(self._frontier) == 0:
+            if self._strategy != "iddfs" or not self._cut_off: return None
+            if self._max_depth is not None and self._depth_limit >= self._max_depth: return None
+            # Iterative deepening: start again from the start state with a deeper limit
+            self._depth_limit += 1
+            self._cut_off = False
+            self._table.clear()
+            self._push(self._start, self._key(self._start), 0, None)
+        if self._strategy == "bfs": return self._frontier.popleft()
+        if self._strategy == "best": return heapq.heappop(self._frontier)[2]
+        return self._frontier.pop()
+
+    def _forget(self, key: Any):
+        node = self._nodes.pop(key, None)
+        if node is not None: del self._keys[node._internal_id]
+        self._links.pop(key, None)
+        self._parent_edges.pop(key, None)
+
+    def _node(self, state: Any, key: Any) -> Node:
+        node = self._nodes.get(key)
+        if node is None:
+            node_id = pynode_core.next_user_id()
+            while node_id in self._graph._nodes: node_id = pynode_core.next_user_id()
+            node = Node(node_id, self._label(state) if self._label is not None else key).set_attribute("state", state)
+            self._nodes[key] = node
+            self._keys[node._internal_id] = key
+            self._pending.append(node)
+            # Iterative deepening clears the table without forgetting the nodes, so they're also limited here
+            if self._max_states is not None and len(self._nodes) > self._max_states: self._forget(next(iter(self._nodes)))
+        return node
+
+    def _link(self, source_key: Any, target_key: Any) -> Optional[Edge]:
+        source, target = self._nodes.get(source_key), self._nodes.get(target_key)
+        if source is None or target is None: return None
+        links = self._links.get(source_key)
+        if links is None: links = self._links[source_key] = set()
+        if target._internal_id in links: return None
+        links.add(target._internal_id)
+        edge = Edge(source, target, directed=True)
+        self._pending.append(edge)
+        return edge
+
+    def flush(self):
+        # Adds the nodes and edges that haven't been added to the graph yet
+        if len(self._pending) > 0:
+            pending = self._pending
+            self._pending = []
+            self._graph.add_all(pending)
+
+    def step(self) -> Optional[Union[Node, Any]]:
+        # Expands the next state, returning its node (or the state itself when materialise is False), or None once there's nothing left to explore
+        if self.done: return None
+        while True:
+            item = self._pop()
+            if item is None:
+                self.done = True
+                self.flush()
+                return None
+            state, key, depth, parent_key = item
+            entry = self._table.get(key)
+            # A state that was reached again by a shorter path is only expanded from there
+            if entry is not None and entry[0] < depth: continue
+            break
+
+        node = None
+        if self._materialise:
+            node = self._node(state, key)
+            if parent_key is not None:
+                edge = self._link(parent_key, key)
+                if edge is not None and key not in self._parent_edges: self._parent_edges[key] = edge
+            if entry is not None and entry[1] is not None:
+                for other_key in entry[1]: self._link(other_key, key)
+                entry[1] = None
+        self.expanded += 1
+        if self._goal is not None and self._goal(state):
+            self.goal = node
+            self.goal_state = state
+            self.done = True
+        else:
+            limit = self._depth_limit if self._strategy == "iddfs" else self._max_depth
+            if limit is not None and depth >= limit:
+                self._cut_off = True
+            else:
+                for next_state in self._successors(state):
+                    next_key = self._key(next_state)
+                    next_entry = self._table.get(next_key)
+                    if next_entry is not None and next_entry[0] <= depth + 1:
+                        self._table.move_to_end(next_key)
+                        # Already seen: only an edge is needed, which is added now or when that state is expanded
+                        if self._materialise:
+                            if next_key in self._nodes: self._link(key, next_key)
+                            elif next_entry[1] is None: next_entry[1] = [key]
+                            else: next_entry[1].append(key)
+                        continue
+                    self._push(next_state, next_key, depth + 1, key)
+        if self.done or len(self._pending) >= self._batch_size: self.flush()
+        return node if self._materialise else state
+
+    def run(self, max_steps: Optional[int] = None) -> Optional[Node]:
+        # Expands states until the goal is found, the space is exhausted or max_steps states have been expanded, and returns the goal's node
+        steps = 0
+        while not self.done and (max_steps is None or steps < max_steps):
+            self.step()
+            steps += 1
+        self.flush()
+        return self.goal
+
+    def node(self, state: Any) -> Optional[Node]:
+        return self._nodes.get(self._key(state))
+
+    def state(self, node: Node) -> Any:
+        return node.attribute("state")
+
+    def path(self, node: Optional[Union[Node, Any]] = None) -> List[Edge]:
+        # The edges from the start to a node or state (the goal by default), following the first edge that reached each state. States
+        # that have been forgotten (see max_states) end the path early
+        if node is None: node = self.goal
+        if node is None: return []
+        key = self._keys.get(node._internal_id) if isinstance(node, Node) else self._key(node)
+        edges = []
+        while key in self._parent_edges:
+            edge = self._parent_edges[key]
+            edges.append(edge)
+            key = self._keys.get(edge._source._internal_id)
+        edges.reverse()
+        return edges
+
+    def frontier_size(self) -> int:
+        return len(self._frontier)
+
+    def __repr__(self) -> str:
+        return f"StateExplorer(strategy={self._strategy}, expanded={self.expanded}, frontier={len(self._frontier)}, done={self.done})"
 
 def _exec_code(src):
     namespace = globals().copy()
     namespace["__name__"] = "__main__"
-    exec(src, namespace)
+    try: pynode_core.exec_program(src, namespace)
+    finally: pynode_core.flush_print()
+    return namespace
 
 def _execute_function(func, args):
-    func(*args)
+    try: func(*args)
+    finally: pynode_core.flush_print()
 
 graph = Graph()
@@ -0,0 +1,230 @@
+﻿# Runs PyNode programs under CPython, without a browser or renderer, so they can be benchmarked and scripted
+import re
+import os
+import sys
+import ast
+import csv
+import json
+import time
+import heapq
+import random
+import argparse
+import itertools
+from concurrent.futures import ProcessPoolExecutor
+import pynode_core
+import pynode_graphlib
+from typing import List, Dict, Any, Optional, Callable
+
+PROJECT_FILENAME = "<pynode_project>"
+
+class HeadlessTimer:
+    # Stands in for browser.timer, delayed functions run on a virtual clock when run_timers() is called
+    def __init__(self):
+        self.reset()
+
+    def reset(self):
+        self.now = 0
+        self._next_id = 1
+        self._pending = []
+        self._cancelled = set()
+
+    def set_timeout(self, func: Callable, time: int) -> int:
+        return self._schedule(func, time, None)
+
+    def set_interval(self, func: Callable, time: int) -> int:
+        return self._schedule(func, time, max(1, time))
+
+    def clear_timeout(self, timer_id: int):
+        self._cancelled.add(timer_id)
+
+    def clear_interval(self, timer_id: int):
+        self._cancelled.add(timer_id)
+
+    def _schedule(self, func: Callable, time: int, interval: Optional[int], timer_id: Optional[int] = None) -> int:
+        if timer_id is None:
+            timer_id = self._next_id
+            self._next_id += 1
+        heapq.heappush(self._pending, (self.now + max(0, time), timer_id, func, interval))
+        return timer_id
+
+    def run(self, max_calls: int = 10000) -> int:
+        # Runs pending functions in time order, intervals are rescheduled until cancelled or max_calls is reached
+        calls = 0
+        while len(self._pending) > 0 and calls < max_calls:
+            when, timer_id, func, interval = heapq.heappop(self._pending)
+            if timer_id in self._cancelled: continue
+            self.now = when
+            calls += 1
+            if interval is not None: self._schedule(func, interval, interval, timer_id)
+            func()
+        return calls
+
+class EventCounter(list):
+    # Null backend: events are counted and dropped instead of being kept for playback
+    def __init__(self):
+        super().__init__()
+        self.count = 0
+
+    def append(self, event: Any):
+        self.count += 1
+
+    def __len__(self) -> int:
+        return self.count
+
+timer = HeadlessTimer()
+
+def reset(record: bool = True):
+    if pynode_core.IS_BROWSER: raise Exception("pynode_headless can't be used in the browser")
+    pynode_core.timer = timer
+    timer.reset()
+    pynode_core.reset_state()
+    pynode_core.PynodeCoreGlobals.event_queue = [] if record else EventCounter()
+
+def events() -> List[Any]:
+    return pynode_core.PynodeCoreGlobals.event_queue
+
+def event_count() -> int:
+    return len(pynode_core.PynodeCoreGlobals.event_queue)
+
+def run(src: str, record: bool = True, run_timers: bool = True) -> Dict[str, Any]:
+    # Executes a program from a clean state and returns its namespace, prints are queued as events like they are in the browser
+    reset(record)
+    stdout = sys.stdout
+    sys.stdout = pynode_core.PrintOutput()
+    try:
+        namespace = pynode_graphlib._exec_code(compile(src, PROJECT_FILENAME, "exec"))
+        if run_timers: timer.run()
+    finally:
+        sys.stdout = stdout
+    return namespace
+
+def click(node: pynode_graphlib.Node, run_timers: bool = True):
+    # Simulates the user clicking on a node, followed by any delayed functions it schedules
+    stdout = sys.stdout
+    sys.stdout = pynode_core.PrintOutput()
+    try:
+        pynode_core.element_event("node_click", node._internal_id)
+        if run_timers: timer.run()
+    finally:
+        sys.stdout = stdout
+
+def set_constants(src: str, values: Dict[str, Any]) -> str:
+    # Replaces top-level assignments such as 'NUM_NODES = 10' in a program's source
+    for name, value in values.items():
+        pattern = re.compile(r"^" + re.escape(name) + r"\s*=.*$", re.MULTILINE)
+        if pattern.search(src) is None: raise Exception(f"'{name}' isn't assigned at the top level of the program")
+        src = pattern.sub(lambda m: f"{name} = {value!r}", src, count=1)
+    return src
+
+def trace(event: Any) -> List[Any]:
+    # A JSON-friendly representation of a queued event
+    if isinstance(event, pynode_core.EventPause): return ["pause", event.time]
+    if isinstance(event, pynode_core.EventPrint): return ["print", event.args[0]]
+    if isinstance(event, pynode_core.EventAnimation) and isinstance(event.func, str): return [event.func, event.args, event.time]
+    if isinstance(event, pynode_core.Event) and isinstance(event.func, str): return [event.func, event.args]
+    return [getattr(event.func, "__name__", str(event.func)), []]
+
+def _plain(value: Any) -> Any:
+    if value is None or isinstance(value, (bool, int, float, str)): return value
+    if isinstance(value, (list, tuple)): return [_plain(x) for x in value]
+    if isinstance(value, dict): return {str(k): _plain(v) for k, v in value.items()}
+    return str(value)
+
+def run_experiment(task: Dict[str, Any]) -> Dict[str, Any]:
+    # Runs one seed/parameter combination. Each worker process has its own graph, and every run starts from a clean state
+    result = {"seed": task["seed"]}
+    result.update(task["params"])
+    error = ""
+    namespace = {}
+    random.seed(task["seed"])
+    start = time.perf_counter()
+    try:
+        namespace = run(set_constants(task["src"], task["params"]), record=task["trace"])
+    except Exception as exc:
+        error = f"{type(exc).__name__}: {exc}"
+    result["exec_ms"] = round((time.perf_counter() - start) * 1000, 3)
+    result["events"] = event_count()
+    result["nodes"] = pynode_graphlib.graph.order()
+    result["edges"] = pynode_graphlib.graph.size()
+    for name in task["collect"]:
+        result[name] = _plain(namespace.get(name))
+    result["error"] = error
+    if task["trace"]: result["trace"] = [trace(e) for e in events()]
+    return result
+
+def _parse_value(text: str) -> Any:
+    try: return ast.literal_eval(text)
+    except (ValueError, SyntaxError): return text
+
+def _parse_seeds(text: str) -> List[int]:
+    # Accepts '0-99', '1,5,9' or a mix of both
+    seeds = []
+    for part in text.split(","):
+        if "-" in part:
+            first, last = part.split("-", 1)
+            seeds.extend(range(int(first), int(last) + 1))
+        elif part != "":
+            seeds.append(int(part))
+    return seeds
+
+def _write_results(results: List[Dict[str, Any]], output: Optional[str]):
+    if output is not None and output.endswith(".json"):
+        with open(output, "w", encoding="utf-8") as f: json.dump(results, f, indent=2)
+        return
+    columns = []
+    for r in results:
+        for key in r:
+            if key not in columns: columns.append(key)
+    f = open(output, "w", encoding="utf-8", newline="") if output is not None else sys.stdout
+    try:
+        writer = csv.DictWriter(f, columns)
+        writer.writeheader()
+        for r in results:
+            writer.writerow({k: json.dumps(v) if isinstance(v, (list, dict)) else v for k, v in r.items()})
+    finally:
+        if output is not None: f.close()
+
+def main(argv: List[str] = None) -> int:
+    parser = argparse.ArgumentParser(description="Run a PyNode program without a browser, across many seeds and parameter values.",
+                                     epilog="example: %(prog)s src/pynode_projects/dijkstra.py --seeds 0-99 --param NUM_NODES:NUM_EDGES=100:150,1000:1500 --collect path --output results.csv")
+    parser.add_argument("program", help="path to the PyNode program")
+    parser.add_argument("--seeds", default="0", help="random seeds to run, e.g. '0-99' or '1,2,3'")
+    parser.add_argument("--param", action="append", default=[], metavar="NAME=V1,V2", help="values for a top-level constant of the program, can be repeated (every combination is run). "
+                        "Constants that have to change together are given as NAME1:NAME2=A1:A2,B1:B2")
+    parser.add_argument("--collect", action="append", default=[], metavar="NAME", help="a variable from the program to include in the results, can be repeated")
+    parser.add_argument("--trace", action="store_true", help="include each run's events in the results")
+    parser.add_argument("--workers", type=int, default=os.cpu_count() or 1, help="number of processes (defaults to the number of CPUs)")
+    parser.add_argument("--output", help="file to write the results to, .json for JSON and CSV otherwise (defaults to CSV on stdout)")
+    args = parser.parse_args(argv)
+
+    with open(args.program, encoding="utf-8-sig") as f: src = f.read()
+    params = []
+    for p in args.param:
+        if "=" not in p: raise Exception(f"Expected NAME=V1,V2 but got '{p}'")
+        names, values = p.split("=", 1)
+        names = [name.strip() for name in names.split(":")]
+        choices = []
+        for value in values.split(","):
+            parts = value.split(":")
+            if len(parts) != len(names): raise Exception(f"Expected a value for each of {', '.join(names)} in '{value}'")
+            choices.append([(name, _parse_value(v.strip())) for name, v in zip(names, parts)])
+        params.append(choices)
+    tasks = []
+    for combination in itertools.product(*params):
+        for seed in _parse_seeds(args.seeds):
+            tasks.append({"src": src, "seed": seed, "params": dict(pair for choice in combination for pair in choice), "collect": args.collect, "trace": args.trace})
+
+    if args.workers <= 1:
+        results = [run_experiment(t) for t in tasks]
+    else:
+        # Tasks are handed out in chunks so small runs aren't dominated by inter-process overhead
+        chunk_size = max(1, len(tasks) // (args.workers * 4))
+        with ProcessPoolExecutor(max_workers=args.workers) as executor:
+            results = list(executor.map(run_experiment, tasks, chunksize=chunk_size))
+    _write_results(results, args.output)
+    failed = sum(1 for r in results if r["error"] != "")
+    if failed > 0: print(f"{failed} of {len(results)} run(s) failed", file=sys.stderr)
+    return 1 if failed > 0 else 0
+
+if __name__ == "__main__":
+    sys.exit(main())
@@ -0,0 +1,556 @@
+﻿# Streaming readers that load graphs from edge lists, CSV, node-link JSON and GraphML files (see Graph.load), and binary graph snapshots (see Graph.save_snapshot)
+import io
+import os
+import csv
+import json
+import struct
+import codecs
+import pynode_core
+import pynode_graphlib
+from pynode_graphlib import Node, Edge, Color, CustomStyle
+from typing import List, Dict, Any, Optional, Callable, Iterator, Tuple
+
+# Formats guessed from file extensions, when no format is given
+EXTENSIONS = {
+    ".txt": "edgelist", ".edges": "edgelist", ".edgelist": "edgelist", ".el": "edgelist",
+    ".csv": "csv", ".tsv": "csv", ".json": "json", ".graphml": "graphml", ".xml": "graphml"
+}
+BLOCK_SIZE = 1 << 16
+
+# Readers yield ("node", id, attributes), ("edge", source, target, attributes) and ("directed", bool) records,
+# so only the elements of the chunk being added are ever held in memory
+
+def _parse(text: str) -> Any:
+    try: return int(text)
+    except ValueError: pass
+    try: return float(text)
+    except ValueError: return text
+
+def _boolean(value: Any) -> bool:
+    if isinstance(value, str): return value.strip().lower() in ("true", "1", "yes")
+    return bool(value)
+
+def _color(value: Any) -> Color:
+    if isinstance(value, Color): return value
+    text = str(value).strip().lower()
+    if text == "transparent": return Color.TRANSPARENT
+    text = text.lstrip("#")
+    if len(text) != 6: raise Exception(f"Invalid color '{value}', expected '#rrggbb'")
+    return Color(int(text[0:2], 16), int(text[2:4], 16), int(text[4:6], 16))
+
+def _hashable(value: Any) -> Any:
+    return tuple(_hashable(x) for x in value) if isinstance(value, list) else value
+
+def read_edgelist(stream: Any, name: Optional[str] = None) -> Iterator[Tuple]:
+    # One 'source target [weight]' edge per line (or a lone node ID), lines starting with '#' or '%' are comments
+    for line in stream:
+        tokens = line.split()
+        if len(tokens) == 0 or tokens[0][0] in "#%": continue
+        if len(tokens) == 1: yield ("node", _parse(tokens[0]), {})
+        else: yield ("edge", _parse(tokens[0]), _parse(tokens[1]), {"weight": _parse(tokens[2])} if len(tokens) > 2 else {})
+
+def read_csv(stream: Any, name: Optional[str] = None) -> Iterator[Tuple]:
+    # Edges if there are 'source' and 'target' columns, nodes if there's an 'id' column, other columns become attributes
+    rows = csv.reader(stream, delimiter="\t" if name is not None and str(name).lower().endswith(".tsv") else ",")
+    header = next(rows, None)
+    if header is None: return
+    columns = [c.strip() for c in header]
+    lower = [c.lower() for c in columns]
+    if "source" in lower and "target" in lower:
+        source, target = lower.index("source"), lower.index("target")
+        others = [i for i in range(len(columns)) if i not in (source, target)]
+        for row in rows:
+            if len(row) == 0: continue
+            yield ("edge", _parse(row[source]), _parse(row[target]), {columns[i]: _parse(row[i]) for i in others if i < len(row) and row[i] != ""})
+    elif "id" in lower:
+        key = lower.index("id")
+        others = [i for i in range(len(columns)) if i != key]
+        for row in rows:
+            if len(row) == 0: continue
+            yield ("node", _parse(row[key]), {columns[i]: _parse(row[i]) for i in others if i < len(row) and row[i] != ""})
+    else:
+        raise Exception("CSV files need 'source' and 'target' columns (for edges) or an 'id' column (for nodes)")
+
+class _JSONScanner:
+    # Decodes one value at a time from a stream, keeping only a block or so of the text in memory
+    def __init__(self, stream: Any):
+        self.stream = stream
+        self.buffer = ""
+        self.pos = 0
+        self.eof = False
+        self.decoder = json.JSONDecoder()
+
+    def _fill(self) -> bool:
+        if self.eof: return False
+        data = self.stream.read(BLOCK_SIZE)
+        if not data:
+            self.eof = True
+            return False
+        self.buffer = self.buffer[self.pos:] + data
+        self.pos = 0
+        return True
+
+    def peek(self) -> str:
+        while True:
+            while self.pos < len(self.buffer) and self.buffer[self.pos] in " \t\r\n": self.pos += 1
+            if self.pos < len(self.buffer) or not self._fill(): break
+        return self.buffer[self.pos] if self.pos < len(self.buffer) else ""
+
+    def expect(self, char: str):
+        if self.peek() != char: raise Exception(f"Invalid JSON, expected '{char}' at '{self.buffer[self.pos:self.pos + 20]}'")
+        self.pos += 1
+
+    def value(self) -> Any:
+        self.peek()
+        while True:
+            try:
+                value, end = self.decoder.raw_decode(self.buffer, self.pos)
+                # A number at the end of the buffer might continue in the next block
+                if end < len(self.buffer) or self.eof:
+                    self.pos = end
+                    return value
+            except json.JSONDecodeError:
+                if self.eof: raise
+            self._fill()
+
+def read_json(stream: Any, name: Optional[str] = None) -> Iterator[Tuple]:
+    # Node-link JSON ({"directed": ..., "nodes": [{"id": ...}], "links": [{"source": ..., "target": ...}]}), items are decoded one at a time
+    scanner = _JSONScanner(stream)
+    scanner.expect("{")
+    while scanner.peek() != "}":
+        key = scanner.value()
+        scanner.expect(":")
+        if key in ("nodes", "links", "edges") and scanner.peek() == "[":
+            scanner.expect("[")
+            while scanner.peek() != "]":
+                item = scanner.value()
+                if key == "nodes":
+                    yield ("node", _hashable(item.pop("id")), item)
+                else:
+                    yield ("edge", _hashable(item.pop("source")), _hashable(item.pop("target")), item)
+                if scanner.peek() == ",": scanner.expect(",")
+            scanner.expect("]")
+        else:
+            value = scanner.value()
+            if key == "directed": yield ("directed", _boolean(value))
+        if scanner.peek() == ",": scanner.expect(",")
+    scanner.expect("}")
+
+def _graphml_value(text: str, kind: str) -> Any:
+    if kind == "boolean": return _boolean(text)
+    if kind in ("int", "long"): return int(text)
+    if kind in ("float", "double"): return float(text)
+    return text
+
+def read_graphml(stream: Any, name: Optional[str] = None) -> Iterator[Tuple]:
+    import xml.etree.ElementTree as ElementTree
+    keys: Dict[str, Tuple[str, str]] = {}
+    attributes: Optional[Dict[str, Any]] = None
+    graph_element = None
+    for event, element in ElementTree.iterparse(stream, events=("start", "end")):
+        tag = element.tag.rsplit("}", 1)[-1]
+        if event == "start":
+            if tag in ("node", "edge"): attributes = {}
+            elif tag == "graph" and graph_element is None:
+                graph_element = element
+                yield ("directed", element.get("edgedefault") == "directed")
+            continue
+        if tag == "key":
+            keys[element.get("id")] = (element.get("attr.name", element.get("id")), element.get("attr.type", "string"))
+        elif tag == "data" and attributes is not None:
+            attr_name, kind = keys.get(element.get("key"), (element.get("key"), "string"))
+            attributes[attr_name] = _graphml_value((element.text or "").strip(), kind)
+        elif tag in ("node", "edge"):
+            if tag == "node":
+                yield ("node", element.get("id"), attributes)
+            else:
+                if element.get("directed") is not None: attributes["directed"] = _boolean(element.get("directed"))
+                yield ("edge", element.get("source"), element.get("target"), attributes)
+            attributes = None
+            # Elements that have been read are dropped, so the tree doesn't grow with the file
+            if graph_element is not None: graph_element.clear()
+
+READERS: Dict[str, Callable] = {"edgelist": read_edgelist, "csv": read_csv, "json": read_json, "graphml": read_graphml}
+
+class _MappedText:
+    # Text view of a memory-mapped file, decoded as it's read
+    def __init__(self, path: str):
+        import mmap
+        self._file = open(path, "rb")
+        self._map = mmap.mmap(self._file.fileno(), 0, access=mmap.ACCESS_READ)
+        self._decoder = codecs.getincrementaldecoder("utf-8-sig")()
+
+    def read(self, size: int = -1) -> str:
+        data = self._map.read(size if size is not None and size >= 0 else None)
+        return self._decoder.decode(data, self._map.tell() >= self._map.size())
+
+    def readline(self) -> str:
+        data = self._map.readline()
+        return self._decoder.decode(data, self._map.tell() >= self._map.size())
+
+    def __iter__(self):
+        return iter(self.readline, "")
+
+    def tell(self) -> int:
+        return self._map.tell()
+
+    def close(self):
+        self._map.close()
+        self._file.close()
+
+def _open(source: Any, use_mmap: bool) -> Tuple[Any, Optional[int], Callable[[], None]]:
+    # Returns a text stream, its size in bytes (if known) and a function that closes it
+    if isinstance(source, (str, os.PathLike)):
+        size = os.path.getsize(source)
+        if use_mmap and size > 0:
+            stream = _MappedText(source)
+            return stream, size, stream.close
+        stream = open(source, encoding="utf-8-sig", newline="")
+        return stream, size, stream.close
+    if use_mmap: raise Exception("use_mmap needs a file path")
+    if isinstance(source, (io.RawIOBase, io.BufferedIOBase)):
+        stream = io.TextIOWrapper(source, encoding="utf-8-sig", newline="")
+        return stream, None, stream.detach
+    return source, None, lambda: None
+
+def _fraction(stream: Any, size: Optional[int]) -> Optional[float]:
+    if size is None or size == 0: return None
+    try: return min(1.0, getattr(stream, "buffer", stream).tell() / size)
+    except (OSError, ValueError, AttributeError): return None
+
+def _node(graph: 'pynode_graphlib.Graph', pending: Dict[Any, Node], chunk: List[Any], id: Any) -> Node:
+    # Nodes are created the first time they're mentioned, edges can refer to nodes that haven't been declared
+    n = graph._nodes.get(id)
+    if n is None: n = pending.get(id)
+    if n is None:
+        n = Node(id)
+        pending[id] = n
+        chunk.append(n)
+    return n
+
+def _set_node_attributes(n: Node, attributes: Dict[str, Any]):
+    for name, value in attributes.items():
+        if name in ("value", "label"): n.value = value
+        elif name == "size": n.size = value
+        elif name == "color": n.color = _color(value)
+        elif name == "priority": n.priority = value
+        elif name not in ("x", "y"): n.set_attribute(name, value)
+    if "x" in attributes and "y" in attributes: n.set_position(attributes["x"], attributes["y"])
+
+def _set_edge_attributes(e: Edge, attributes: Dict[str, Any]):
+    for name, value in attributes.items():
+        if name == "width": e.width = value
+        elif name == "color": e.color = _color(value)
+        elif name == "priority": e.priority = value
+        else: e.set_attribute(name, value)
+
+def load(graph: 'pynode_graphlib.Graph', source: Any, format: Optional[str] = None, directed: Optional[bool] = None, chunk_size: int = 10000,
+         use_mmap: bool = False, progress: Optional[Callable[[int, Optional[float]], Any]] = None) -> int:
+    name = source if isinstance(source, (str, os.PathLike)) else getattr(source, "name", None)
+    if format is None:
+        extension = os.path.splitext(str(name))[1].lower() if name is not None else ""
+        if extension not in EXTENSIONS: raise Exception(f"Can't tell the format of '{name}', use format='edgelist', 'csv', 'json' or 'graphml'")
+        format = EXTENSIONS[extension]
+    if format not in READERS: raise Exception(f"Unknown format '{format}', expected one of {', '.join(READERS.keys())}")
+
+    stream, size, close = _open(source, use_mmap)
+    count = 0
+    chunk: List[Any] = []
+    pending: Dict[Any, Node] = {}
+    edges_directed = bool(directed)
+    try:
+        for record in READERS[format](stream, str(name) if name is not None else None):
+            if record[0] == "edge":
+                attributes = record[3]
+                e = Edge(_node(graph, pending, chunk, record[1]), _node(graph, pending, chunk, record[2]), attributes.pop("weight", None),
+                         _boolean(attributes.pop("directed", edges_directed)))
+                _set_edge_attributes(e, attributes)
+                chunk.append(e)
+            elif record[0] == "node":
+                _set_node_attributes(_node(graph, pending, chunk, record[1]), record[2])
+            elif record[0] == "directed" and directed is None:
+                edges_directed = record[1]
+            if len(chunk) >= chunk_size:
+                graph.add_all(chunk)
+                count += len(chunk)
+                chunk, pending = [], {}
+                if progress is not None: progress(count, _fraction(stream, size))
+        if len(chunk) > 0:
+            graph.add_all(chunk)
+            count += len(chunk)
+        if progress is not None: progress(count, 1.0 if size else None)
+    finally:
+        close()
+    return count
+
+# Snapshots: the whole graph in a compact binary format (a table of distinct values, followed by packed arrays that refer to it)
+SNAPSHOT_MAGIC = b"PYNS"
+SNAPSHOT_VERSION = 2
+SNAPSHOT_EXTENSION = ".pynodegraph"
+
+class _ValueTable:
+    # Each distinct value is stored once, and elements refer to it by index. Attributes can also hold the graph's nodes and edges (stored
+    # by their index in the snapshot), and lists, tuples and dicts of any of these values
+    def __init__(self, node_index: Dict[int, int], edge_index: Dict[int, int]):
+        self.node_index = node_index
+        self.edge_index = edge_index
+        self.refs: Dict[Tuple[type, Any], int] = {}
+        self.tags = bytearray()
+        self.ints: List[int] = []
+        self.floats: List[float] = []
+        self.strings: List[str] = []
+
+    def ref(self, value: Any, elements: bool = False) -> int:
+        # elements allows nodes and edges, which can only be restored in attributes
+        key = (type(value), value._internal_id if isinstance(value, (Node, Edge)) else value)
+        try:
+            index = self.refs.get(key)
+            if index is not None: return index
+        except TypeError:
+            key = None
+        if value is None: self.tags.append(0)
+        elif value is False: self.tags.append(1)
+        elif value is True: self.tags.append(2)
+        elif type(value) is int and -(1 << 63) <= value < (1 << 63):
+            self.tags.append(3); self.ints.append(value)
+        elif type(value) is float:
+            self.tags.append(4); self.floats.append(value)
+        elif type(value) is str:
+            self.tags.append(5); self.strings.append(value)
+        elif isinstance(value, (Node, Edge)) and elements:
+            index = (self.node_index if isinstance(value, Node) else self.edge_index).get(value._internal_id)
+            if index is None: raise Exception(f"{value!r} can't be saved in a snapshot, since it isn't in the graph")
+            self.tags.append(7 if isinstance(value, Node) else 8); self.ints.append(index)
+        elif type(value) in (list, tuple, dict):
+            # The items are stored first, so they're always read back before the value that holds them
+            items = [self.ref(x, elements) for pair in value.items() for x in pair] if type(value) is dict else [self.ref(x, elements) for x in value]
+            self.tags.append(9 if type(value) is list else 10 if type(value) is tuple else 11); self.ints.append(len(items)); self.ints += items
+        elif _literal(repr(value)) == value and type(_literal(repr(value))) is type(value):
+            # Other values are kept as their repr, when ast.literal_eval gives them back as they were (e.g. sets or very large ints)
+            self.tags.append(6); self.strings.append(repr(value))
+        else:
+            raise Exception(f"{value!r} can't be saved in a snapshot (values can be None, booleans, numbers, strings, nodes and edges, or lists, tuples and dicts of them)")
+        index = len(self.tags) - 1
+        if key is not None: self.refs[key] = index
+        return index
+
+class _Reference:
+    # A node or edge in a restored value, which is replaced once the elements have been created
+    def __init__(self, edge: bool, index: int):
+        self.edge = edge
+        self.index = index
+
+def _resolve(value: Any, nodes: List[Node], edges: List[Edge]) -> Any:
+    if type(value) is _Reference: return edges[value.index] if value.edge else nodes[value.index]
+    if type(value) is list: return [_resolve(x, nodes, edges) for x in value]
+    if type(value) is tuple: return tuple(_resolve(x, nodes, edges) for x in value)
+    if type(value) is dict: return {_resolve(k, nodes, edges): _resolve(v, nodes, edges) for k, v in value.items()}
+    return value
+
+def _pack(code: str, values: List[Any]) -> bytes:
+    return struct.pack(f"<I{len(values)}{code}", len(values), *values)
+
+class _SnapshotReader:
+    def __init__(self, data: bytes):
+        self.data = data
+        self.offset = 0
+
+    def array(self, code: str) -> Tuple[Any, ...]:
+        count = struct.unpack_from("<I", self.data, self.offset)[0]
+        values = struct.unpack_from(f"<{count}{code}", self.data, self.offset + 4)
+        self.offset += 4 + struct.calcsize(f"<{count}{code}")
+        return values
+
+    def raw(self) -> bytes:
+        count = struct.unpack_from("<I", self.data, self.offset)[0]
+        self.offset += 4 + count
+        return bytes(self.data[self.offset - count:self.offset])
+
+def encode_snapshot(graph: 'pynode_graphlib.Graph') -> bytes:
+    nodes = graph.nodes()
+    edges = graph.edges()
+    node_index = {n._internal_id: i for i, n in enumerate(nodes)}
+    values = _ValueTable(node_index, {e._internal_id: i for i, e in enumerate(edges)})
+    ref = values.ref
+    styles: Dict[Any, int] = {}
+    def style(s: Any) -> int:
+        index = styles.get(s)
+        if index is None: index = styles[s] = len(styles)
+        return index
+
+    node_refs, position_kinds, static_positions, layout_positions, node_attributes, node_attribute_counts = [], bytearray(), [], [], [], []
+    requested = False
+    nan = float("nan")
+    for n in nodes:
+        node_refs += [ref(n._id), ref(n._value), ref(n._size), ref(n._color.hex_string()), ref(n._priority), ref(n._labels[0]), ref(n._labels[1]),
+                      style(n._value_style), style(n._label_styles[0]), style(n._label_styles[1])]
+        if n._position is None:
+            position_kinds.append(0); static_positions += [0.0, 0.0]
+        else:
+            position_kinds.append(2 if n._is_pos_relative else 1); static_positions += [float(n._position[0]), float(n._position[1])]
+        # Where the renderer last placed the node, so the layout doesn't start over when the snapshot is restored
+        pos = pynode_core.node_position(n._position_slot)
+        if pos is None and not requested and pynode_core.IS_BROWSER:
+            pynode_core.request_positions()
+            requested = True
+            pos = pynode_core.node_position(n._position_slot)
+        layout_positions += [float(pos[0]), float(pos[1])] if pos is not None else [nan, nan]
+        attributes = n.attributes()
+        node_attribute_counts.append(len(attributes))
+        for name, value in attributes.items(): node_attributes += [ref(name), ref(value, True)]
+
+    endpoints, edge_refs, edge_directed, edge_attributes, edge_attribute_counts = [], [], bytearray(), [], []
+    for e in edges:
+        endpoints += [node_index[e._source._internal_id], node_index[e._target._internal_id]]
+        edge_refs += [ref(e._weight), ref(e._width), ref(e._color.hex_string()), ref(e._priority), style(e._weight_style)]
+        edge_directed.append(1 if e._directed else 0)
+        attributes = e.attributes()
+        edge_attribute_counts.append(len(attributes))
+        for name, value in attributes.items(): edge_attributes += [ref(name), ref(value, True)]
+
+    style_refs = []
+    for s in styles.keys():
+        style_refs += [ref(s._size), ref(s._color.hex_string()), ref(s._outline.hex_string() if s._has_outline else None)]
+    spread = ref(graph._spread)
+
+    encoded = [s.encode("utf-8") for s in values.strings]
+    parts = [
+        SNAPSHOT_MAGIC, struct.pack("<BII", SNAPSHOT_VERSION, len(nodes), len(edges)),
+        _pack("B", values.tags), _pack("q", values.ints), _pack("d", values.floats), _pack("I", [len(s) for s in encoded]), _pack("B", b"".join(encoded)),
+        _pack("I", style_refs), _pack("I", [spread]),
+        _pack("I", node_refs), _pack("B", position_kinds), _pack("d", static_positions), _pack("d", layout_positions),
+        _pack("I", node_attribute_counts), _pack("I", node_attributes),
+        _pack("I", endpoints), _pack("I", edge_refs), _pack("B", edge_directed), _pack("I", edge_attribute_counts), _pack("I", edge_attributes)
+    ]
+    return b"".join(parts)
+
+def _literal(text: str) -> Any:
+    import ast
+    try: return ast.literal_eval(text)
+    except (ValueError, SyntaxError): return text
+
+def _attributes(counts: Tuple[int, ...], refs: Tuple[int, ...], values: List[Any]) -> Iterator[Dict[str, Any]]:
+    i = 0
+    for count in counts:
+        if count == 0:
+            yield {}
+            continue
+        yield {values[refs[j]]: values[refs[j + 1]] for j in range(i, i + count * 2, 2)}
+        i += count * 2
+
+def restore_snapshot(graph: 'pynode_graphlib.Graph', data: bytes):
+    if bytes(data[:4]) != SNAPSHOT_MAGIC: raise Exception("Not a PyNode graph snapshot")
+    version, node_count, edge_count = struct.unpack_from("<BII", data, 4)
+    if version not in (1, SNAPSHOT_VERSION): raise Exception(f"Unsupported snapshot version {version}")
+    reader = _SnapshotReader(memoryview(data))
+    reader.offset = 4 + struct.calcsize("<BII")
+
+    tags, ints, floats, lengths, blob = reader.array("B"), iter(reader.array("q")), iter(reader.array("d")), reader.array("I"), reader.raw()
+    strings = []
+    start = 0
+    for length in lengths:
+        strings.append(blob[start:start + length].decode("utf-8"))
+        start += length
+    strings = iter(strings)
+    values: List[Any] = []
+    references = False
+    for tag in tags:
+        if tag == 0: values.append(None)
+        elif tag == 1: values.append(False)
+        elif tag == 2: values.append(True)
+        elif tag == 3: values.append(next(ints))
+        elif tag == 4: values.append(next(floats))
+        elif tag == 5: values.append(next(strings))
+        elif tag == 6: values.append(_literal(next(strings)))
+        elif tag == 7 or tag == 8:
+            values.append(_Reference(tag == 8, next(ints)))
+            references = True
+        else:
+            items = [values[next(ints)] for _ in range(next(ints))]
+            values.append(items if tag == 9 else tuple(items) if tag == 10 else dict(zip(items[0::2], items[1::2])))
+
+    style_refs = reader.array("I")
+    styles = [CustomStyle(values[style_refs[i]], _color(values[style_refs[i + 1]]), _color(values[style_refs[i + 2]]) if values[style_refs[i + 2]] is not None else None)
+              for i in range(0, len(style_refs), 3)]
+    spread = values[reader.array("I")[0]]
+    node_refs, position_kinds, static_positions, layout_positions = reader.array("I"), reader.array("B"), reader.array("d"), reader.array("d")
+    node_attributes = _attributes(reader.array("I"), reader.array("I"), values)
+    endpoints, edge_refs, edge_directed = reader.array("I"), reader.array("I"), reader.array("B")
+    edge_attributes = _attributes(reader.array("I"), reader.array("I"), values)
+
+    graph.clear()
+    if graph._spread != spread: graph.set_spread(spread)
+    # Elements are made by their constructors and filled in here, rather than by add_node/add_edge, which would send an event for each one
+    nodes: List[Node] = []
+    colors: Dict[str, Color] = {}
+    for i in range(node_count):
+        r = node_refs[i * 10:i * 10 + 10]
+        n = Node(values[r[0]])
+        color = values[r[3]]
+        if color not in colors: colors[color] = _color(color)
+        n._value = values[r[1]]; n._size = values[r[2]]; n._color = colors[color]; n._priority = values[r[4]]
+        n._labels = [values[r[5]], values[r[6]]]
+        n._value_style = styles[r[7]]; n._label_styles = [styles[r[8]], styles[r[9]]]
+        n._attributes = next(node_attributes)
+        n._position = [static_positions[i * 2], static_positions[i * 2 + 1]] if position_kinds[i] != 0 else None
+        n._is_pos_relative = position_kinds[i] == 2
+        nodes.append(n)
+    edges: List[Edge] = []
+    for i in range(edge_count):
+        r = edge_refs[i * 5:i * 5 + 5]
+        e = Edge(nodes[endpoints[i * 2]], nodes[endpoints[i * 2 + 1]], values[r[0]], edge_directed[i] == 1)
+        color = values[r[2]]
+        if color not in colors: colors[color] = _color(color)
+        e._width = values[r[1]]; e._color = colors[color]; e._priority = values[r[3]]; e._weight_style = styles[r[4]]
+        e._attributes = next(edge_attributes)
+        e._source._incident_edges.append(e)
+        e._target._incident_edges.append(e)
+        edges.append(e)
+    if references:
+        for x in nodes + edges: x._attributes = {name: _resolve(value, nodes, edges) for name, value in x._attributes.items()}
+
+    new_elements = []
+    send = pynode_core.PynodeCoreGlobals.do_events
+    for i, n in enumerate(nodes):
+        graph._nodes[n._id] = n
+        graph._elements[n._internal_id] = n
+        graph._node_columns.add(n)
+        n._position_slot = pynode_core.next_node_slot()
+        if send:
+            node_data = n._data()
+            x, y = layout_positions[i * 2], layout_positions[i * 2 + 1]
+            if n._position is None and x == x and y == y: node_data["x"] = x; node_data["y"] = y
+            new_elements.append((0, node_data))
+    for e in edges:
+        graph._edges.append(e)
+        graph._has_edge_cache[e] = True
+        graph._elements[e._internal_id] = e
+        graph._edge_columns.add(e)
+        e._graph = graph
+        if send: new_elements.append((1, e._data()))
+    graph._version += 1
+
+    # Everything is sent to the renderer as one add_all
+    pynode_core.add_event(pynode_core.Event(pynode_core.js_add_all, [new_elements]))
+    pynode_graphlib._settle(55)
+
+def save_snapshot(graph: 'pynode_graphlib.Graph', path: Optional[str] = None, download: bool = False) -> bytes:
+    data = encode_snapshot(graph)
+    if path is not None:
+        if pynode_core.IS_BROWSER: pynode_core.store_file(path, data)
+        else:
+            with open(path, "wb") as f: f.write(data)
+    if download: pynode_core.download_file(os.path.basename(path) if path is not None else "graph" + SNAPSHOT_EXTENSION, data)
+    return data
+
+def load_snapshot(graph: 'pynode_graphlib.Graph', source: Any):
+    if isinstance(source, (bytes, bytearray, memoryview)): data = source
+    elif isinstance(source, (str, os.PathLike)):
+        if pynode_core.IS_BROWSER:
+            data = pynode_core.stored_file(str(source))
+            if data is None: raise Exception(f"No snapshot named '{source}' has been saved")
+        else:
+            with open(source, "rb") as f: data = f.read()
+    else:
+        data = source.read()
+    restore_snapshot(graph, data)
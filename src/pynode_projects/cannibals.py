@@ -79,7 +79,7 @@ pause(500)
 path = []
 node = end
 while node is not start:
-    edge = node.incoming_edges()[random.randint(0, len(node.incoming_edges()) - 1)]
+    edge = node.incoming_edges[random.randint(0, len(node.incoming_edges) - 1)]
     path.append(edge)
     node = edge.source()
 
@@ -22,7 +22,7 @@ def dfs(node):
     if node is not start:
         node.set_color(Color.BLUE)
     pause(500)
-    for e in node.outgoing_edges():
+    for e in node.outgoing_edges:
         n = e.other_node(node)
         if n.attribute("seen"):
             continue
@@ -32,18 +32,18 @@ while not pq.empty():
     if seen[node]:
         continue
     seen[node] = True
-    node.set_size(node.size()*1.5)
+    node.set_size(node.size*1.5)
     node.set_color(Color.RED)
     pause(400)
     # Update adjacent nodes
-    for edge in node.outgoing_edges():
+    for edge in node.outgoing_edges:
         edge.traverse(node, keep_path=True)
     pause(750)
-    node.set_size(node.size()/1.5)
-    for edge in node.outgoing_edges():
+    node.set_size(node.size/1.5)
+    for edge in node.outgoing_edges:
         target = edge.other_node(node)
         if not seen[target]:
-            new_dist = node.attribute("dist") + edge.weight()
+            new_dist = node.attribute("dist") + edge.weight
             # Only update if new distance is better than the previous one
             if new_dist < target.attribute("dist"):
                 target.set_attribute("dist", new_dist)
@@ -81,6 +81,4 @@ while node is not start:
     path.append((node, edge))
 
 # Animate the path
-for n, e in reversed(path):
-    e.traverse(n, Color.GREEN)
-    pause(500)
+graph.animate_path([e for n, e in reversed(path)], Color.GREEN)
@@ -13,7 +13,7 @@ for element in random_graph:
     if isinstance(element, Edge):
         # Assign a random weight to each edge
         element.set_weight(random.randint(1, 32))
-        element.set_priority(element.weight())
+        element.set_priority(element.weight)
         element.set_attribute("selected", False)
     element.set_attribute("seen", False)
 graph.add_all(random_graph)
@@ -30,7 +30,7 @@ def visit_node(n):
     n.highlight()
     n.set_attribute("seen", True)
     pause(500)
-    for e in n.incident_edges():
+    for e in n.incident_edges:
         if not e.attribute("seen"):
             e.set_color(Color.GREY)
             e.set_attribute("seen", True)
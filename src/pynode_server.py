@@ -0,0 +1,373 @@
+﻿# Serves PyNode on localhost and runs programs in CPython instead of Brython, streaming their events to the page over a WebSocket
+# Usage: python src/pynode_server.py [--port 8765] [--open]
+# NumPy is optional (pip install numpy), graph attribute columns and some algorithms use it when it's installed
+import os
+import sys
+import hmac
+import json
+import heapq
+import queue
+import base64
+import struct
+import asyncio
+import hashlib
+import secrets
+import argparse
+import mimetypes
+import traceback
+import webbrowser
+import urllib.parse
+import multiprocessing
+from time import monotonic
+import pynode_core
+import pynode_graphlib
+import pynode_headless
+from typing import List, Dict, Any, Optional, Callable
+
+ROOT = os.path.dirname(os.path.abspath(__file__))
+WEBSOCKET_GUID = "258EAFA5-E914-47DA-95CA-C5AB0DC85B11"
+# The server only listens on the loopback interface, and only answers requests addressed to it by one of these names
+LOOPBACK_NAMES = ["localhost", "127.0.0.1", "[::1]"]
+
+# Events held on the server before the program has to wait for the page to play them
+BUFFER_SIZE = 10000
+# Largest number of events sent in one message
+BATCH_SIZE = 256
+# Largest message accepted from the page (a program's source, or a snapshot of the node positions)
+MAX_MESSAGE_SIZE = 64 * 1024 * 1024
+# Pages served by this run of the server include this token, and the WebSocket (which runs whatever it's sent) isn't opened without it
+TOKEN = secrets.token_urlsafe(32)
+
+class MessageTooLarge(Exception):
+    pass
+
+class EventStream(list):
+    # Takes the place of the event queue in a program's process, events are passed on to the server instead of being kept
+    def __init__(self, items: Any):
+        super().__init__()
+        self.items = items
+
+    def append(self, event: Any):
+        self.put(pynode_headless.trace(event))
+
+    def put(self, item: Any):
+        # Blocks the program while the buffer is full, which is how the page's credit reaches it
+        self.items.put(item)
+
+class ErrorOutput:
+    def __init__(self, stream: EventStream):
+        self.stream = stream
+    def write(self, data):
+        self.stream.put(["error", str(data)])
+    def flush(self):
+        pass
+
+class ProcessTimer:
+    # Stands in for browser.timer in a program's process, delayed functions are run between the page's events
+    def __init__(self):
+        self.pending = []
+        self.cancelled = set()
+        self.next_id = 1
+
+    def set_timeout(self, func: Callable, time: int) -> int:
+        return self._schedule(func, time, None)
+
+    def set_interval(self, func: Callable, time: int) -> int:
+        return self._schedule(func, time, max(1, time))
+
+    def clear_timeout(self, timer_id: int):
+        self.cancelled.add(timer_id)
+
+    def clear_interval(self, timer_id: int):
+        self.cancelled.add(timer_id)
+
+    def _schedule(self, func: Callable, time: int, interval: Optional[int], timer_id: Optional[int] = None) -> int:
+        if timer_id is None:
+            timer_id = self.next_id
+            self.next_id += 1
+        heapq.heappush(self.pending, (monotonic() + max(0, time) / 1000, timer_id, func, interval))
+        return timer_id
+
+    def wait(self) -> Optional[float]:
+        # Seconds until the next function is due, or None if there aren't any
+        while len(self.pending) > 0 and self.pending[0][1] in self.cancelled: self.cancelled.discard(heapq.heappop(self.pending)[1])
+        return max(0.0, self.pending[0][0] - monotonic()) if len(self.pending) > 0 else None
+
+    def run_due(self, call: Callable):
+        now = monotonic()
+        while len(self.pending) > 0 and self.pending[0][0] <= now:
+            when, timer_id, func, interval = heapq.heappop(self.pending)
+            if timer_id in self.cancelled:
+                self.cancelled.discard(timer_id)
+                continue
+            if interval is not None: self._schedule(func, interval, interval, timer_id)
+            call(func)
+
+def call(stream: EventStream, func: Callable, *args):
+    # Runs a function of the program, with any exception sent to the page
+    try:
+        func(*args)
+    except Exception as exc:
+        # The traceback is sent as a single item, without the server's own frame
+        stream.put(["error", "".join(traceback.format_exception(type(exc), exc, exc.__traceback__.tb_next))])
+
+def program_process(commands: Any, items: Any):
+    # The body of a program's process: the program itself, followed by the page's events and delayed functions, until the server ends it.
+    # Every program has a process of its own, so one that never returns can still be stopped, and pynode_core's global state is never shared
+    src = commands.get()
+    stream = EventStream(items)
+    pynode_core.reset_state()
+    pynode_core.PynodeCoreGlobals.event_queue = stream
+    timer = ProcessTimer()
+    pynode_core.timer = timer
+    sys.stdout = pynode_core.PrintOutput()
+    sys.stderr = ErrorOutput(stream)
+    call(stream, lambda: pynode_graphlib._exec_code(compile(src, "<string>", "exec")))
+    stream.put(None)
+    while True:
+        try: command = commands.get(timeout=timer.wait())
+        except queue.Empty: command = None
+        # Listeners and delayed functions can still add events after the program itself has finished
+        if command is not None and command[0] == "element_event": call(stream, pynode_core.element_event, command[1], command[2])
+        elif command is not None and command[0] == "positions": pynode_core.update_positions(*command[1:])
+        timer.run_due(lambda func: call(stream, func))
+
+class ProgramProcess:
+    # A process that runs one program. The next one is always started in advance, so a run doesn't wait for Python to start up.
+    # Processes are started on the loop's executor, since starting one blocks for a while
+    spare: Optional['ProgramProcess'] = None
+    spare_starting = False
+
+    def __init__(self):
+        context = multiprocessing.get_context("spawn")
+        self.commands = context.Queue()
+        self.items = context.Queue(BUFFER_SIZE)
+        self.process = context.Process(target=program_process, args=(self.commands, self.items), daemon=True)
+        self.process.start()
+
+    @staticmethod
+    async def start(loop: asyncio.AbstractEventLoop, src: str) -> 'ProgramProcess':
+        program = ProgramProcess.spare
+        ProgramProcess.spare = None
+        if program is None or not program.process.is_alive(): program = await loop.run_in_executor(None, ProgramProcess)
+        program.commands.put(src)
+        # The replacement is started once the program is running
+        ProgramProcess.start_spare(loop)
+        return program
+
+    @staticmethod
+    def start_spare(loop: asyncio.AbstractEventLoop):
+        if ProgramProcess.spare is not None or ProgramProcess.spare_starting: return
+        ProgramProcess.spare_starting = True
+
+        def started(future: asyncio.Future):
+            ProgramProcess.spare_starting = False
+            if not future.cancelled() and future.exception() is None: ProgramProcess.spare = future.result()
+        loop.run_in_executor(None, ProgramProcess).add_done_callback(started)
+
+    def send(self, command: Any):
+        self.commands.put(command)
+
+    def kill(self):
+        self.process.kill()
+        self.process.join()
+        self.commands.cancel_join_thread()
+        self.items.cancel_join_thread()
+
+class Session:
+    # One connected page. Only one program runs at a time, whichever page started it: a new run ends the one before it
+    active: Optional['Session'] = None
+
+    def __init__(self, loop: asyncio.AbstractEventLoop, send: Callable):
+        self.loop = loop
+        self.send = send
+        self.program: Optional[ProgramProcess] = None
+        self.sender: Optional[asyncio.Task] = None
+        self.credit = 0
+        self.credit_changed = asyncio.Event()
+
+    async def run(self, src: str, credit: int):
+        if Session.active is not None: Session.active.stop()
+        Session.active = self
+        program = await ProgramProcess.start(self.loop, src)
+        if Session.active is not self:
+            # Another page started a program while this one's process was starting
+            program.kill()
+            return
+        self.program = program
+        self.credit = credit
+        self.sender = self.loop.create_task(self.send_events(self.program))
+
+    def stop(self):
+        if self.sender is not None: self.sender.cancel()
+        self.sender = None
+        if self.program is not None: self.program.kill()
+        self.program = None
+
+    def close(self):
+        self.stop()
+        if Session.active is self: Session.active = None
+
+    def add_credit(self, count: int):
+        self.credit += count
+        self.credit_changed.set()
+
+    def element_event(self, event_type: str, element_id: Optional[int]):
+        if self.program is not None: self.program.send(("element_event", event_type, element_id))
+
+    def positions(self, positions: List[Optional[float]], count: int, width: int, height: int):
+        # NaN (slots of nodes that aren't rendered) arrives as null
+        positions = [float("nan") if x is None else x for x in positions]
+        if self.program is not None: self.program.send(("positions", positions, count, width, height))
+
+    async def send_events(self, program: ProgramProcess):
+        done = False
+        while True:
+            while self.credit <= 0:
+                self.credit_changed.clear()
+                await self.credit_changed.wait()
+            try: item = await self.loop.run_in_executor(None, program.items.get, True, 0.5)
+            except queue.Empty: continue
+            batch = []
+            while True:
+                if item is None: done = True
+                else: batch.append(item)
+                if item is None or len(batch) >= min(self.credit, BATCH_SIZE): break
+                try: item = program.items.get_nowait()
+                except queue.Empty: break
+            if len(batch) > 0:
+                self.credit -= len(batch)
+                await self.send({"type": "events", "events": batch})
+            if done:
+                await self.send({"type": "done"})
+                done = False
+
+async def read_frame(reader: asyncio.StreamReader):
+    head = await reader.readexactly(2)
+    fin, opcode = head[0] & 0x80, head[0] & 0x0F
+    length = head[1] & 0x7F
+    if length == 126: length = struct.unpack("!H", await reader.readexactly(2))[0]
+    elif length == 127: length = struct.unpack("!Q", await reader.readexactly(8))[0]
+    if length > MAX_MESSAGE_SIZE: raise MessageTooLarge()
+    mask = await reader.readexactly(4) if head[1] & 0x80 else None
+    data = await reader.readexactly(length)
+    if mask is not None and length > 0:
+        data = (int.from_bytes(data, "big") ^ int.from_bytes((mask * (length // 4 + 1))[:length], "big")).to_bytes(length, "big")
+    return fin, opcode, data
+
+def write_frame(writer: asyncio.StreamWriter, opcode: int, data: bytes):
+    length = len(data)
+    if length < 126: header = struct.pack("!BB", 0x80 | opcode, length)
+    elif length < 65536: header = struct.pack("!BBH", 0x80 | opcode, 126, length)
+    else: header = struct.pack("!BBQ", 0x80 | opcode, 127, length)
+    writer.write(header + data)
+
+def allowed_hosts(port: int) -> List[str]:
+    # The Host header of requests to the server. Anything else (such as a name that now resolves to 127.0.0.1) is refused
+    return [f"{name}:{port}" for name in LOOPBACK_NAMES] + (LOOPBACK_NAMES if port == 80 else [])
+
+async def websocket(reader: asyncio.StreamReader, writer: asyncio.StreamWriter, headers: Dict[str, str]):
+    accept = base64.b64encode(hashlib.sha1((headers["sec-websocket-key"] + WEBSOCKET_GUID).encode()).digest()).decode()
+    writer.write(("HTTP/1.1 101 Switching Protocols\r\nUpgrade: websocket\r\nConnection: Upgrade\r\n"
+                  f"Sec-WebSocket-Accept: {accept}\r\n\r\n").encode())
+
+    async def send(message: Dict[str, Any]):
+        write_frame(writer, 1, json.dumps(message).encode())
+        await writer.drain()
+
+    session = Session(asyncio.get_running_loop(), send)
+    message = b""
+    try:
+        while True:
+            fin, opcode, data = await read_frame(reader)
+            if opcode == 8:
+                write_frame(writer, 8, data[:2])
+                break
+            if opcode == 9:
+                write_frame(writer, 10, data)
+                continue
+            if opcode not in (0, 1, 2): continue
+            message += data
+            if len(message) > MAX_MESSAGE_SIZE: raise MessageTooLarge()
+            if not fin: continue
+            request = json.loads(message.decode())
+            message = b""
+            if request["type"] == "run": await session.run(request["src"], int(request.get("credit", 1000)))
+            elif request["type"] == "stop": session.stop()
+            elif request["type"] == "credit": session.add_credit(int(request["count"]))
+            elif request["type"] == "element_event": session.element_event(request["event"], request["id"])
+            elif request["type"] == "positions": session.positions(request["positions"], request["count"], request["width"], request["height"])
+    except MessageTooLarge:
+        write_frame(writer, 8, struct.pack("!H", 1009))
+    except (asyncio.IncompleteReadError, ConnectionError):
+        pass
+    finally:
+        session.close()
+
+def respond(writer: asyncio.StreamWriter, status: str, content_type: str, body: bytes, head: bool = False):
+    writer.write((f"HTTP/1.1 {status}\r\nContent-Type: {content_type}\r\nContent-Length: {len(body)}\r\n"
+                  "Cache-Control: no-cache\r\nConnection: close\r\n\r\n").encode() + (b"" if head else body))
+
+async def handle(reader: asyncio.StreamReader, writer: asyncio.StreamWriter):
+    port = writer.get_extra_info("sockname")[1]
+    try:
+        request = (await reader.readuntil(b"\r\n\r\n")).decode("latin-1").split("\r\n")
+        method, target = request[0].split(" ")[:2]
+        headers = {}
+        for line in request[1:]:
+            if ":" in line:
+                name, value = line.split(":", 1)
+                headers[name.strip().lower()] = value.strip()
+        path = urllib.parse.unquote(urllib.parse.urlsplit(target).path)
+
+        query = urllib.parse.parse_qs(urllib.parse.urlsplit(target).query)
+
+        if headers.get("host") not in allowed_hosts(port):
+            respond(writer, "403 Forbidden", "text/plain", b"Forbidden", method == "HEAD")
+        elif path == "/pynode/ws" and headers.get("upgrade", "").lower() == "websocket":
+            # Only this server's own pages can connect: other sites can't read the token, and their Origin differs
+            if headers.get("origin") != "http://" + headers["host"] or not hmac.compare_digest(query.get("token", [""])[0], TOKEN):
+                respond(writer, "403 Forbidden", "text/plain", b"Forbidden")
+            else: await websocket(reader, writer, headers)
+        elif method not in ("GET", "HEAD"):
+            respond(writer, "405 Method Not Allowed", "text/plain", b"Method not allowed")
+        elif path == "/pynode/status":
+            respond(writer, "200 OK", "application/json", json.dumps({"server": "pynode", "python": sys.version.split()[0]}).encode(), method == "HEAD")
+        else:
+            if path.endswith("/"): path += "index.html"
+            file_path = os.path.normpath(os.path.join(ROOT, path.lstrip("/")))
+            if not file_path.startswith(ROOT + os.sep) or not os.path.isfile(file_path):
+                respond(writer, "404 Not Found", "text/plain", b"Not found", method == "HEAD")
+            else:
+                with open(file_path, "rb") as f: body = f.read()
+                if file_path.endswith(".html"): body = body.replace(b"</head>", f"<script>var pynode_server_token = \"{TOKEN}\";</script></head>".encode(), 1)
+                respond(writer, "200 OK", mimetypes.guess_type(file_path)[0] or "application/octet-stream", body, method == "HEAD")
+        await writer.drain()
+    except (asyncio.IncompleteReadError, asyncio.LimitOverrunError, ConnectionError, ValueError):
+        pass
+    finally:
+        writer.close()
+
+async def serve(port: int, open_browser: bool):
+    # Programs are run with the permissions of whoever started the server, so it's never reachable from other machines
+    server = await asyncio.start_server(handle, "127.0.0.1", port)
+    ProgramProcess.start_spare(asyncio.get_running_loop())
+    url = f"http://localhost:{port}/"
+    print(f"PyNode is running at {url} (press Ctrl+C to stop)", file=sys.__stdout__)
+    if open_browser: webbrowser.open(url)
+    async with server:
+        await server.serve_forever()
+
+def main(argv: List[str] = None) -> int:
+    parser = argparse.ArgumentParser(description="Run PyNode locally, with programs executed by this Python instead of in the browser.")
+    parser.add_argument("--port", type=int, default=8765)
+    parser.add_argument("--open", action="store_true", help="open PyNode in the default web browser")
+    args = parser.parse_args(argv)
+    try:
+        asyncio.run(serve(args.port, args.open))
+    except KeyboardInterrupt:
+        pass
+    return 0
+
+if __name__ == "__main__":
+    sys.exit(main())
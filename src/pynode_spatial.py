@@ -0,0 +1,113 @@
+﻿# A uniform grid over points in the plane, behind graph.nodes_near, graph.nodes_in_rect and graph.nearest_node
+# (js/spatial.js keeps the same grid over the rendered nodes for the renderer's hit testing)
+import math
+import heapq
+from typing import List, Dict, Any, Optional, Tuple
+
+class SpatialGrid:
+    # Points are bucketed into square cells sized to hold a few points each, so a query only looks at the cells around it
+    def __init__(self, points: List[Tuple[float, float, Any]], cell_size: Optional[float] = None):
+        self._points = points
+        self._cells: Dict[Tuple[int, int], List[int]] = {}
+        if len(points) == 0:
+            self.cell_size = 1.0 if cell_size is None else cell_size
+            self._bounds = (0, 0, -1, -1)
+            return
+        xs = [p[0] for p in points]
+        ys = [p[1] for p in points]
+        min_x, max_x, min_y, max_y = min(xs), max(xs), min(ys), max(ys)
+        if cell_size is None: cell_size = max(2.0 * math.sqrt(max(max_x - min_x, 1.0) * max(max_y - min_y, 1.0) / len(points)), 1.0)
+        self.cell_size = cell_size
+        cells = self._cells
+        for i in range(len(points)):
+            key = (int(xs[i] // cell_size), int(ys[i] // cell_size))
+            bucket = cells.get(key)
+            if bucket is None: cells[key] = [i]
+            else: bucket.append(i)
+        self._bounds = (int(min_x // cell_size), int(min_y // cell_size), int(max_x // cell_size), int(max_y // cell_size))
+
+    def __len__(self) -> int:
+        return len(self._points)
+
+    def _box(self, x1: float, y1: float, x2: float, y2: float) -> List[int]:
+        # Indices of the points in the cells that overlap a box, looking up each cell or, if there are more cells than buckets, each bucket
+        size = self.cell_size
+        bx0, by0, bx1, by1 = self._bounds
+        i0, j0 = max(int(x1 // size), bx0), max(int(y1 // size), by0)
+        i1, j1 = min(int(x2 // size), bx1), min(int(y2 // size), by1)
+        if i0 > i1 or j0 > j1: return []
+        found = []
+        if (i1 - i0 + 1) * (j1 - j0 + 1) > len(self._cells):
+            for (i, j), bucket in self._cells.items():
+                if i0 <= i <= i1 and j0 <= j <= j1: found.extend(bucket)
+        else:
+            cells = self._cells
+            for i in range(i0, i1 + 1):
+                for j in range(j0, j1 + 1):
+                    bucket = cells.get((i, j))
+                    if bucket is not None: found.extend(bucket)
+        return found
+
+    def near(self, x: float, y: float, r: float) -> List[Any]:
+        # Items within distance r of (x, y), nearest first
+        points = self._points
+        r2 = r * r
+        found = []
+        for i in self._box(x - r, y - r, x + r, y + r):
+            px, py, _ = points[i]
+            d2 = (px - x) * (px - x) + (py - y) * (py - y)
+            if d2 <= r2: found.append((d2, i))
+        found.sort()
+        return [points[i][2] for _, i in found]
+
+    def in_rect(self, x1: float, y1: float, x2: float, y2: float) -> List[Any]:
+        # Items inside a rectangle (including its edges), in the order they were given
+        if x1 > x2: x1, x2 = x2, x1
+        if y1 > y2: y1, y2 = y2, y1
+        points = self._points
+        found = [i for i in self._box(x1, y1, x2, y2) if x1 <= points[i][0] <= x2 and y1 <= points[i][1] <= y2]
+        found.sort()
+        return [points[i][2] for i in found]
+
+    def _ring(self, ci: int, cj: int, r: int) -> List[Tuple[int, int]]:
+        # The cells at distance r (in cells) from cell (ci, cj), leaving out the ones outside the points' bounds
+        if r == 0: return [(ci, cj)]
+        bx0, by0, bx1, by1 = self._bounds
+        keys = []
+        i0, i1 = max(ci - r, bx0), min(ci + r, bx1)
+        for j in (cj - r, cj + r):
+            if by0 <= j <= by1: keys.extend((i, j) for i in range(i0, i1 + 1))
+        j0, j1 = max(cj - r + 1, by0), min(cj + r - 1, by1)
+        for i in (ci - r, ci + r):
+            if bx0 <= i <= bx1: keys.extend((i, j) for j in range(j0, j1 + 1))
+        return keys
+
+    def nearest(self, x: float, y: float, k: int = 1) -> List[Any]:
+        # The k items nearest to (x, y), nearest first, searching rings of cells outwards until no closer item can be left
+        if k <= 0 or len(self._points) == 0: return []
+        points, cells, size = self._points, self._cells, self.cell_size
+        ci, cj = int(x // size), int(y // size)
+        bx0, by0, bx1, by1 = self._bounds
+        # Rings nearer than the bounds are empty, and rings past them don't need to be searched
+        r = max(bx0 - ci, ci - bx1, by0 - cj, cj - by1, 0)
+        last = max(ci - bx0, bx1 - ci, cj - by0, by1 - cj)
+        best: List[Tuple[float, int]] = []
+        while r <= last:
+            for key in self._ring(ci, cj, r):
+                bucket = cells.get(key)
+                if bucket is None: continue
+                for i in bucket:
+                    px, py, _ = points[i]
+                    entry = (-((px - x) * (px - x) + (py - y) * (py - y)), -i)
+                    if len(best) < k: heapq.heappush(best, entry)
+                    elif entry > best[0]: heapq.heapreplace(best, entry)
+            if len(best) == k:
+                # Items in the next ring are at least as far away as the edge of the cells searched so far
+                edge = min(x - (ci - r) * size, (ci + r + 1) * size - x, y - (cj - r) * size, (cj + r + 1) * size - y)
+                if edge * edge > -best[0][0]: break
+            r += 1
+        best.sort(reverse=True)
+        return [points[-i][2] for _, i in best]
+
+    def __repr__(self) -> str:
+        return f"SpatialGrid({len(self._points)} points, {len(self._cells)} cells)"
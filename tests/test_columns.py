@@ -0,0 +1,35 @@
+# Attribute columns (see pynode_columns), run with: python -m pytest tests
+import os
+import sys
+
+sys.path.insert(0, os.path.normpath(os.path.join(os.path.dirname(os.path.abspath(__file__)), "..", "src")))
+
+import pynode_headless
+from pynode_graphlib import graph
+
+def setup_function():
+    pynode_headless.reset(record=False)
+
+def test_array_and_mask_survive_changes_to_the_column():
+    for i in range(10): graph.add_node(i).set_attribute("d", i)
+    column = graph.node_attr("d")
+    values, mask = column.array(), column.mask()
+
+    # Growing the column, adding an element with an existing column, changing its type and refilling it all work while the copies are held
+    graph.add_node(10).set_attribute("d", 5)
+    graph.add_node(11).set_attribute("d", 2.5)
+    column.fill(7)
+
+    assert graph.has_node(10) and graph.node(10).attribute("d") == 7
+    assert column.values() == [7] * 12
+    assert list(values) == list(range(10))
+    assert list(mask) == [1] * 10
+
+def test_array_is_a_copy():
+    for i in range(4): graph.add_node(i).set_attribute("d", float(i))
+    column = graph.node_attr("d")
+    values = column.array()
+    values[0] = 100.0
+    assert column[graph.node(0)] == 0.0
+    assert column.where(">", 1.5) == [graph.node(2), graph.node(3)]
+    assert column.sum() == 6.0
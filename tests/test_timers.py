@@ -0,0 +1,29 @@
+# The timing wheel behind delay() (see pynode_core.TimerWheel), run with: python -m pytest tests
+import os
+import sys
+
+sys.path.insert(0, os.path.normpath(os.path.join(os.path.dirname(os.path.abspath(__file__)), "..", "src")))
+
+import pynode_core
+import pynode_headless
+
+HOUR = 60 * 60 * 1000
+
+def setup_function():
+    pynode_headless.reset(record=False)
+
+def test_delays_longer_than_the_wheel_run_on_time():
+    fired = []
+    times = [5 * HOUR, 30 * HOUR, pynode_core.TimerWheel.SPAN, pynode_core.TimerWheel.SPAN + 1, 1000]
+    for time in times: pynode_core.delays.add(lambda time=time: fired.append((time, pynode_headless.timer.now)), time)
+    pynode_headless.timer.run()
+    assert fired == [(time, time) for time in sorted(times)]
+
+def test_long_repeats_and_cancelling():
+    fired = []
+    timer_id = pynode_core.delays.add(lambda: fired.append(pynode_headless.timer.now), 20 * HOUR, repeat=True)
+    cancelled = pynode_core.delays.add(lambda: fired.append(-1), 10 * HOUR)
+    pynode_core.delays.cancel(cancelled)
+    pynode_core.delays.add(lambda: pynode_core.delays.cancel(timer_id), 61 * HOUR)
+    pynode_headless.timer.run()
+    assert fired == [20 * HOUR, 40 * HOUR, 60 * HOUR]